@@ -82,6 +82,7 @@ if not _ASTROPY_SETUP_:
     # Create various singleton instances:
     known_archives = fidia.archive.archive.KnownArchives()
     dal_host = fidia.dal.DataAccessLayerHost(config)
+    column_cache = fidia.column.column_cache.ColumnDataCache.from_config(config)
 
     # from fidia.database_tools import is_sane_database
     # if not is_sane_database(Session()):
@@ -20,9 +20,10 @@ import fidia
 # Python Standard Library Imports
 # from collections import OrderedDict, Mapping
 from copy import deepcopy
+import threading
 
 # Other Library Imports
-# import pandas as pd
+import pandas as pd
 
 import sqlalchemy as sa
 from sqlalchemy.sql import and_
@@ -284,6 +285,21 @@ class Archive(SampleLikeMixin, MappingMixin, bases.Archive, bases.Sample, bases.
         column_id = fidia.column.ColumnID.as_column_id(column_id)
         return self.columns[column_id]
 
+    def _object_ids_in_archive(self, archive):
+        # type: (fidia.Archive) -> pd.Series
+        # Part of the "sample-like interface
+        if archive is not self:
+            raise FIDIAException("Object in Archive cannot get id's for other archives.")
+        contents = self.contents
+        return pd.Series(contents, index=contents)
+
+    def _sub_sample(self, object_ids):
+        # type: (List[str]) -> fidia.Sample
+        # Part of the "sample-like interface
+        sample = fidia.Sample.new_from_archive(self)
+        sample._id_cross_matches = sample._id_cross_matches.loc[object_ids]
+        return sample
+
     def validate(self, raise_exception=False):
 
         self._validate_mapping_column_ids(raise_exception=raise_exception)
@@ -398,9 +414,20 @@ class BasePathArchive(Archive):
 
 
 class DatabaseArchive(Archive):
+    """An Archive whose data is in an SQL database (e.g. for `SQLColumn`).
+
+    The database is accessed through an SQLAlchemy engine (and its pool of
+    connections), which is created once for each `database_url` and shared by
+    all archives and columns using that database (see :meth:`get_engine`).
+
+    """
 
     __mapper_args__ = {'polymorphic_identity': 'DatabaseArchive'}
 
+    # SQLAlchemy engines by database URL, see `get_engine`.
+    _engines = dict()  # type: Dict[str, sa.engine.Engine]
+    _engines_lock = threading.Lock()
+
     def __init__(self, **kwargs):
         """Initializer.
 
@@ -412,6 +439,33 @@ class DatabaseArchive(Archive):
         self.database_url = kwargs['database_url']
         super(DatabaseArchive, self).__init__(**kwargs)
 
+    @property
+    def engine(self):
+        # type: () -> sa.engine.Engine
+        """The SQLAlchemy engine (and connection pool) for this archive's database."""
+        return self.get_engine(self.database_url)
+
+    @classmethod
+    def get_engine(cls, database_url):
+        # type: (str) -> sa.engine.Engine
+        """Return the SQLAlchemy engine for `database_url`, creating it on first use."""
+        with cls._engines_lock:
+            try:
+                return cls._engines[database_url]
+            except KeyError:
+                log.debug("Creating SQLAlchemy engine for database %s", database_url)
+                engine = sa.create_engine(database_url)
+                cls._engines[database_url] = engine
+                return engine
+
+    @classmethod
+    def dispose_engines(cls):
+        """Close all pooled connections, and discard the engines."""
+        with cls._engines_lock:
+            for engine in cls._engines.values():
+                engine.dispose()
+            cls._engines.clear()
+
 def replace_aliases_trait_mappings(mappings, alias_mappings):
     for mapping in mappings:
         if isinstance(mapping, fidia.traits.TraitPropertyMapping):
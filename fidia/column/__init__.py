@@ -29,8 +29,14 @@ of data themselves (based on :class:`.FIDIAColumn`).
 # You should have received a copy of the GNU Affero General Public License along
 # with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from .columns import FIDIAColumn, FIDIAArrayColumn, ColumnID
+from .columns import FIDIAColumn, FIDIAArrayColumn, FIDIADerivedColumn, ColumnID
+from . import column_cache
+from . import column_statistics
+from . import fits_headers
+from . import directory_snapshot
+from . import fits_tables
+from . import csv_tables
 
 from .column_definitions import *
 
-__all__ = ['FIDIAColumn', 'FIDIAArrayColumn', 'ColumnID'] + column_definitions.__all__
\ No newline at end of file
+__all__ = ['FIDIAColumn', 'FIDIAArrayColumn', 'FIDIADerivedColumn', 'ColumnID'] + column_definitions.__all__
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Process-wide cache of whole columns of data.
+
+Columns which can only retrieve their data for all objects at once (those
+defined with an `array_getter`, such as catalog columns) keep the result of
+that retrieval for future requests. Rather than each column holding its data
+indefinitely, the data is held by a single :class:`ColumnDataCache`
+(`fidia.column_cache`), which limits the memory used by all columns of all
+archives together, discarding the least recently used data when required.
+
+The memory budget can be set in the FIDIA config::
+
+    [ColumnCache]
+    max_bytes = 2000000000
+
+or changed at any time with :meth:`ColumnDataCache.resize`.
+
+"""
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, Tuple, Hashable, Union
+import fidia
+
+# Python Standard Library Imports
+import sys
+import threading
+import configparser
+from collections import OrderedDict, Counter
+
+# Other Library Imports
+import pandas as pd
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['ColumnDataCache', 'data_size']
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def data_size(data):
+    # type: (Any) -> int
+    """Estimate the memory used by `data` in bytes (including the contents of any Python objects it holds)."""
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        size = data.memory_usage(index=True, deep=True)
+        if isinstance(data, pd.DataFrame):
+            size = size.sum()
+        return int(size)
+    size = getattr(data, 'nbytes', None)
+    if size is None:
+        size = sys.getsizeof(data)
+    return int(size)
+
+
+class ColumnDataCache(object):
+    """A memory limited, least recently used cache of column data shared by all columns.
+
+    Entries are stored under a key whose first element is the ColumnID of the
+    column, so that memory use and hit rates can be reported per column (see
+    :meth:`stats`).
+
+    Parameters
+    ----------
+    max_bytes: int
+        The maximum total size (as estimated by :func:`data_size`) of the data held.
+
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # type: OrderedDict[Tuple[str, Hashable], Tuple[Any, int]]
+        self._hits = Counter()  # type: Counter
+        self._misses = Counter()  # type: Counter
+        self._evictions = Counter()  # type: Counter
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        # type: (configparser.ConfigParser) -> ColumnDataCache
+        """Create a cache using the `[ColumnCache]` section of the FIDIA config (if present)."""
+        if config is not None and 'ColumnCache' in config:
+            return cls(max_bytes=int(config['ColumnCache'].get('max_bytes', DEFAULT_MAX_BYTES)))
+        return cls()
+
+    def __repr__(self):
+        return "ColumnDataCache(%d of %d bytes used, %d entries)" % (
+            self.current_bytes, self.max_bytes, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        # type: (Tuple[str, Hashable]) -> Union[Any, None]
+        """Return the data stored under `key`, or None if there is none (counted as a miss)."""
+        with self._lock:
+            try:
+                data, _ = self._entries[key]
+            except KeyError:
+                self._misses[key[0]] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits[key[0]] += 1
+        return data
+
+    def put(self, key, data):
+        # type: (Tuple[str, Hashable], Any) -> bool
+        """Store `data` under `key`, discarding the least recently used data as required.
+
+        Returns False if the data is larger than the whole cache (and so was not stored).
+
+        """
+        size = data_size(data)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                log.info("Data for column %s (%d bytes) is larger than the column cache", key[0], size)
+                return False
+            self._evict(self.max_bytes - size)
+            self._entries[key] = (data, size)
+            self.current_bytes += size
+        return True
+
+    def discard(self, key):
+        # type: (Tuple[str, Hashable]) -> None
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """Discard all data, and reset the statistics."""
+        with self._lock:
+            self._entries = OrderedDict()
+            self.current_bytes = 0
+            self._hits.clear()
+            self._misses.clear()
+            self._evictions.clear()
+
+    def resize(self, max_bytes):
+        # type: (int) -> None
+        """Change the memory budget, discarding data immediately if it is reduced below the current use."""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict(self.max_bytes)
+
+    def _evict(self, target_bytes):
+        # type: (int) -> None
+        """Discard least recently used data until at most `target_bytes` are used. Caller must hold the lock."""
+        while self.current_bytes > target_bytes and self._entries:
+            (column_id, _), (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self._evictions[column_id] += 1
+            log.debug("Evicted data for column %s (%d bytes) from the column cache", column_id, size)
+
+    def stats(self):
+        # type: () -> pd.DataFrame
+        """Report the memory used and the cache performance for each column.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by ColumnID, with the `bytes` currently held, the number
+            of `hits`, `misses` and `evictions`, and the `hit_rate`.
+
+        """
+        with self._lock:
+            nbytes = Counter()
+            for (column_id, _), (_, size) in self._entries.items():
+                nbytes[column_id] += size
+            column_ids = sorted(set(nbytes) | set(self._hits) | set(self._misses) | set(self._evictions))
+            stats = pd.DataFrame({
+                'bytes': [nbytes[c] for c in column_ids],
+                'hits': [self._hits[c] for c in column_ids],
+                'misses': [self._misses[c] for c in column_ids],
+                'evictions': [self._evictions[c] for c in column_ids]},
+                index=pd.Index(column_ids, name='column_id'),
+                columns=['bytes', 'hits', 'misses', 'evictions'])
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] / requests.where(requests > 0)).fillna(0.0)
+        return stats
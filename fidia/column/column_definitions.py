@@ -68,13 +68,14 @@ optimized.
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from typing import Union, Tuple, Dict, Type
+from typing import Union, Tuple, Dict, Type, List
 import fidia
 
 # Python Standard Library Imports
 import os
 import re
 import time
+import pickle
 from collections import OrderedDict
 import inspect
 from contextlib import contextmanager
@@ -83,13 +84,16 @@ from contextlib import contextmanager
 import numpy as np
 import pandas as pd
 from astropy.io import fits
-from astropy.io import ascii
 from astropy import units
 from cached_property import cached_property
 
 # FIDIA Imports
 from ..exceptions import FIDIAException, DataNotAvailable
-from .columns import FIDIAColumn, FIDIAArrayColumn, PathBasedColumn, ColumnID
+from .columns import FIDIAColumn, FIDIAArrayColumn, FIDIADerivedColumn, PathBasedColumn, ColumnID
+from .fits_headers import keyword_values
+from .directory_snapshot import snapshot as directory_snapshot
+from .fits_tables import read_table, string_index
+from .csv_tables import CSVTable, read_csv_table
 from ..utilities import is_list_or_set
 
 # Set up logging
@@ -103,7 +107,8 @@ __all__ = ['ColumnDefinitionList', 'ColumnDefinition',
            'CSVTableColumn',
            'SQLColumn',
            'RawFileColumn',
-           'SourcelessColumn', 'FixedValueColumn']
+           'SourcelessColumn', 'FixedValueColumn',
+           'DerivedColumn']
 
 class ColumnDefinitionList(object):
     def __init__(self, column_definitions=()):
@@ -202,6 +207,12 @@ class ColumnDefinition(object):
 
     column_type = None  # type: Type[FIDIAColumn]
 
+    # Number of threads used by `FIDIAColumn.get_array` (and `.stack`) of the
+    # columns of this type, for definitions whose getters are known to be
+    # safe to call from several threads at once. None leaves the default of
+    # `FIDIAColumn` (one thread).
+    get_array_workers = None  # type: Union[int, None]
+
     _id_string = ""
     _id_param_re = None
 
@@ -446,10 +457,13 @@ class ColumnDefinition(object):
             # Bake in parameters to object_getter function and associate:
             sig = inspect.signature(self.object_getter)
             baked_args = dict()
-            for archive_attr in sig.parameters.keys():
+            for archive_attr, parameter in sig.parameters.items():
                 if archive_attr is 'object_id':
                     # Don't process the object_id parameter as an archive attribute.
                     continue
+                if parameter.default is not inspect.Parameter.empty:
+                    # Optional parameters are for the caller (e.g. `section`), not archive attributes.
+                    continue
                 baked_args[archive_attr] = getattr(archive, archive_attr)
 
             column._object_getter = self.object_getter
@@ -460,7 +474,9 @@ class ColumnDefinition(object):
             # Bake in parameters to object_getter function and associate:
             sig = inspect.signature(self.array_getter)
             baked_args = dict()
-            for archive_attr in sig.parameters.keys():
+            for archive_attr, parameter in sig.parameters.items():
+                if parameter.default is not inspect.Parameter.empty:
+                    continue
                 baked_args[archive_attr] = getattr(archive, archive_attr)
             column._array_getter = self.array_getter
             column._array_getter_args = baked_args
@@ -493,13 +509,34 @@ def get_fits_extension_by_name_or_index(hdulist, extension):
 
 # noinspection PyUnresolvedReferences
 class FITSDataColumn(ColumnDefinition, PathBasedColumn):
+    """The data of an extension (HDU) of a FITS file for each object.
+
+    Files are memory mapped. The data returned is a read-only array backed by
+    the memory map, so only the parts of it that are used are read from disk.
+    It remains valid after the file has been closed (the map is released when
+    the array is no longer referenced); use `.copy()` on the result if a copy
+    in memory is required. (If the HDU has scaling keywords, e.g. BSCALE,
+    astropy must instead read and scale the whole of the data.)
+
+    If a `section` (e.g. `numpy.s_[0, 10:20, 10:20]`) is given to the
+    `object_getter`, only that part of the data is read (using astropy's
+    `ImageHDU.section`), and the result is an ordinary array. See
+    :meth:`FIDIAArrayColumn.get_section`.
+
+    """
 
     column_type = FIDIAArrayColumn
     _id_string = "{filename_pattern}[{extension}]"
     _parameters = ("filename_pattern", "extension")
 
-    def object_getter(self, object_id, basepath):
+    # Each object is read from its own file.
+    get_array_workers = 8
+
+    def object_getter(self, object_id, basepath, section=None):
         with self.prepare_context(object_id, basepath) as context:
+            if section is not None:
+                hdu = get_fits_extension_by_name_or_index(context, self.extension)
+                return np.asarray(hdu.section[section])
             return self.object_getter_from_context(object_id, context, basepath)
 
     @property
@@ -510,27 +547,56 @@ class FITSDataColumn(ColumnDefinition, PathBasedColumn):
     def prepare_context(self, object_id, basepath):
         try:
             full_path_pattern = os.path.join(basepath, self.filename_pattern)
-            with fits.open(full_path_pattern.format(object_id=object_id)) as hdulist:
+            with fits.open(full_path_pattern.format(object_id=object_id), memmap=True) as hdulist:
                 yield hdulist
         except FileNotFoundError as e:
             raise DataNotAvailable(str(e))
 
     def object_getter_from_context(self, object_id, context, basepath):
         hdu = get_fits_extension_by_name_or_index(context, self.extension)
-        return hdu.data
+        data = hdu.data
+        if data is None:
+            raise DataNotAvailable("FITS extension %s for object_id %s contains no data" %
+                                   (self.extension, object_id))
+        # A view, so that the array astropy holds is not affected.
+        data = data.view()
+        data.flags.writeable = False
+        return data
 
 # noinspection PyUnresolvedReferences
 class FITSHeaderColumn(ColumnDefinition, PathBasedColumn):
+    """The value of a keyword in the header of an extension of a FITS file for each object.
+
+    Values for many objects at once (`FIDIAColumn.get_array`) are read by the
+    `array_getter`, which reads only the header blocks of each file (see
+    :mod:`fidia.column.fits_headers`). The parsed headers are cached, so
+    other keywords of the same files are then retrieved without reading them
+    again.
+
+    """
 
     column_type = FIDIAColumn
     _id_string = "{filename_pattern}[{fits_extension_id}].header[{keyword_name}]"
     _parameters = ('filename_pattern', 'fits_extension_id', 'keyword_name')
 
+    # Each object is read from its own file (also used by `array_getter` to read headers).
+    get_array_workers = 8
+
     # noinspection PyMethodOverriding
     def object_getter(self, object_id, basepath):
         with self.prepare_context(object_id, basepath) as ctx:
             return self.object_getter_from_context(object_id, ctx, basepath)
 
+    def array_getter(self, basepath, object_ids=None):
+        """Return the keyword value for each of `object_ids` which has the file, extension and keyword."""
+        if object_ids is None:
+            raise ValueError("FITSHeaderColumn.array_getter requires the object_ids to read")
+        full_path_pattern = os.path.join(basepath, self.filename_pattern)
+        paths = OrderedDict((object_id, full_path_pattern.format(object_id=object_id)) for object_id in object_ids)
+        values = keyword_values(paths, self.keyword_name, self.fits_extension_id, workers=self.get_array_workers)
+        values.name = self._id
+        return values
+
     @property
     def grouping_context(self):
         return self.filename_pattern
@@ -556,18 +622,13 @@ class FITSHeaderColumn(ColumnDefinition, PathBasedColumn):
     def _timestamp_helper(self, archive):
         if archive is None:
             return None
-        timestamp = 0
         log.debug("archive.basepath: %s, filename_pattern: %s", archive.basepath, self.filename_pattern)
         full_path_pattern = os.path.join(archive.basepath, self.filename_pattern)
-        for object_id in archive.contents:
-            try:
-                stats = os.stat(full_path_pattern.format(object_id=object_id))
-            except FileNotFoundError:
-                # Ignore objects where this file is not available (in effect handle as though "DataNotAvailable")
-                pass
-            else:
-                if stats.st_mtime > timestamp:
-                    timestamp = stats.st_mtime
+        # Objects where this file is not available are ignored (in effect handled as though "DataNotAvailable")
+        timestamp = directory_snapshot.latest_modification_time(
+            full_path_pattern.format(object_id=object_id) for object_id in archive.contents)
+        if timestamp is None:
+            return 0
         return timestamp
 
 # noinspection PyUnresolvedReferences
@@ -578,8 +639,13 @@ class FITSBinaryTableColumn(ColumnDefinition, PathBasedColumn):
     _parameters = ("filename_pattern", "fits_extension_id", "column_name", "index_column_name")
 
     def array_getter(self, basepath):
-        with self.prepare_context(basepath) as hdulist:
-            return self.array_getter_from_context(hdulist, basepath)
+        # The table is read once and shared by all columns defined on the file (see `fidia.column.fits_tables`).
+        full_path_pattern = os.path.join(basepath, self.filename_pattern)
+        try:
+            table = read_table(full_path_pattern, self.fits_extension_id)
+        except FileNotFoundError as e:
+            raise DataNotAvailable(str(e))
+        return table.series(self.column_name, self.index_column_name, name=self._id)
 
     @property
     def grouping_context(self):
@@ -597,11 +663,12 @@ class FITSBinaryTableColumn(ColumnDefinition, PathBasedColumn):
     def array_getter_from_context(self, context, basepath):
         hdulist = context
         hdu = get_fits_extension_by_name_or_index(hdulist, self.fits_extension_id)
-        column_data = hdu.data[self.column_name]
         # force native byteorder (https://pandas.pydata.org/pandas-docs/stable/gotchas.html#byte-ordering-issues)
-        native_column_data = column_data.byteswap().newbyteorder()
-        index = [str(item) for item in hdu.data[self.index_column_name]]
-        return pd.Series(native_column_data, index=index, name=self._id, copy=True)
+        # `astype` copies the data, which is required as the file is closed when the context ends.
+        column_data = np.asarray(hdu.data[self.column_name])
+        native_column_data = column_data.astype(column_data.dtype.newbyteorder('='))
+        index = string_index(hdu.data[self.index_column_name])
+        return pd.Series(native_column_data, index=index, name=self._id)
 
     def _timestamp_helper(self, archive):
         if archive is None:
@@ -629,26 +696,26 @@ class CSVTableColumn(ColumnDefinition, PathBasedColumn):
 
     @contextmanager
     def prepare_context(self, basepath):
+        # The parsed file is shared by all columns defined on it (see `fidia.column.csv_tables`).
         full_path_pattern = os.path.join(basepath, self.filename_pattern)
-        table = ascii.read(full_path_pattern, format="csv", comment=self.comment)
+        table = read_csv_table(full_path_pattern, comment=self.comment)
 
         yield table
 
     def array_getter_from_context(self, table, basepath):
-        assert self.column_name in table.colnames, "Data column \"%s\" not in table %s with columns [%s]" % (
+        # type: (CSVTable, str) -> pd.Series
+        assert self.column_name in table.column_names, "Data column \"%s\" not in table %s with columns [%s]" % (
             self.column_name,
             self.filename_pattern,
-            ", ".join(table.colnames)
+            ", ".join(table.column_names)
         )
-        assert self.index_column_name in table.colnames, "Index column \"%s\" not in table %s with columns [%s]" % (
+        assert self.index_column_name in table.column_names, "Index column \"%s\" not in table %s with columns [%s]" % (
             self.index_column_name,
             self.filename_pattern,
-            ", ".join(table.colnames)
+            ", ".join(table.column_names)
         )
 
-        column_data = table[self.column_name].data
-        index = table[self.index_column_name].data
-        return pd.Series(column_data, index=index, name=self._id, copy=True)
+        return table.series(self.column_name, self.index_column_name, name=self._id)
 
 
     def _timestamp_helper(self, archive):
@@ -668,10 +735,13 @@ class SQLColumn(ColumnDefinition):
     columns: a column called 'id' containing the object ID and a column called
     'data' containing data.
 
-    """
+    Connections are taken from the pool of the engine shared by all columns
+    on the same database (see `DatabaseArchive.get_engine`). The
+    `array_getter` retrieves the whole result set in one query, or, for a
+    small number of objects, only their rows using `IN` queries of up to
+    `sql_in_chunk_size` object IDs each.
 
-    # @TODO: This Column type needs tests, which require SQL data be added to the test data.
-    # Note there is an example in `poc/fidia/gama_archive_poc.py`
+    """
 
     column_type = FIDIAColumn
 
@@ -680,33 +750,57 @@ class SQLColumn(ColumnDefinition):
 
     _parameters = ['select_stmt']
 
-    def object_getter(self, object_id, database_url):
+    # Maximum number of object IDs in each `IN` query (SQLite allows at most 999 parameters).
+    sql_in_chunk_size = 500
 
-        # Requires SQLAlchemy
-        from sqlalchemy.sql import column, text, select, Select
-        from sqlalchemy import create_engine
+    # Requests for more objects than this retrieve the whole result set.
+    sql_in_max_objects = 5000
 
-
-        # Note, it would be preferrable to store a single connection on the
-        # Archive instance, rather than recreating it here. This can be fixed
-        # after ASVO-1089 has been implemented.
-        # @TODO: Change to use connection associated with the archive.
-
-        engine = create_engine(database_url)
-
-        connection = engine.connect()
+    def _select(self):
+        # Requires SQLAlchemy
+        from sqlalchemy.sql import column, text, select
 
         stmt = text(self.select_stmt).columns(column('id'), column('data')).alias('st')
+        return stmt, select([stmt], from_obj=stmt)
 
-        # query = select(stmt).where(stmt.c.id == object_id)
-        query = select([stmt], from_obj=stmt).where(stmt.c.id == object_id)
+    def object_getter(self, object_id, database_url):
+        from ..archive.archive import DatabaseArchive
 
-        result = connection.execute(query)
+        stmt, query = self._select()
+        query = query.where(stmt.c.id == object_id)
 
-        row = result.fetchone()
+        with DatabaseArchive.get_engine(database_url).connect() as connection:
+            row = connection.execute(query).fetchone()
 
+        if row is None or row["data"] is None:
+            raise DataNotAvailable("No data for id %s returned by %s" % (object_id, self.select_stmt))
         return row["data"]
 
+    def array_getter(self, database_url, object_ids=None):
+        """Return the data for `object_ids` (or all objects returned by the SQL), indexed by object ID."""
+        from ..archive.archive import DatabaseArchive
+
+        stmt, query = self._select()
+        if object_ids is None or len(object_ids) > self.sql_in_max_objects:
+            queries = [query]
+        else:
+            object_ids = list(object_ids)
+            queries = [query.where(stmt.c.id.in_(object_ids[start:start + self.sql_in_chunk_size]))
+                       for start in range(0, len(object_ids), self.sql_in_chunk_size)]
+
+        ids = []
+        data = []
+        with DatabaseArchive.get_engine(database_url).connect() as connection:
+            for chunk_query in queries:
+                for row_id, value in connection.execute(chunk_query).fetchall():
+                    if value is None:
+                        # As for objects with no row, so that e.g. integer columns are not converted to float.
+                        continue
+                    ids.append(row_id)
+                    data.append(value)
+
+        return pd.Series(data, index=pd.Index(ids).astype(str), name=self._id)
+
 # noinspection PyUnresolvedReferences
 class RawFileColumn(ColumnDefinition, PathBasedColumn):
     """RawFileColumns provides access to the raw bytes of a set of files.
@@ -763,3 +857,85 @@ class FixedValueColumn(ColumnDefinition):
 
     def object_getter(self, object_id):
         return self.value
+
+
+# noinspection PyUnresolvedReferences
+class DerivedColumn(ColumnDefinition):
+    """A column computed from other columns of the same archive.
+
+    The data are computed for all objects at once by calling `function` with
+    the whole of each input column (as returned by `FIDIAColumn.get_array`,
+    so from the DAL if available) as `pandas.Series` aligned to the contents
+    of the archive. The function should return a `pandas.Series` or array of
+    the same length, e.g.::
+
+        DerivedColumn("StellarMassSN",
+                      ["FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]",
+                       "FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMassError]"],
+                      np.divide)
+
+    Input columns can be given by full or short (type and name only)
+    ColumnIDs, and must be defined earlier in the archive than the derived
+    column. The function must be pickleable (e.g. a numpy ufunc or a
+    module-level function) so that the column can be persisted. Only
+    single-valued (not array) data is supported.
+
+    The timestamp of the column is the latest of those of its inputs (unless
+    given explicitly). Computed data is memoized in the column cache (see
+    :mod:`fidia.column.column_cache`) keyed on the IDs, and so timestamps, of
+    the input columns. Like any other column, it can be ingested into the DAL.
+
+    """
+
+    column_type = FIDIADerivedColumn
+    _id_string = "{name}"
+    _parameters = ('name',)
+
+    def __init__(self, name, input_columns=(), function=None, **kwargs):
+        if function is not None:
+            try:
+                pickle.dumps(function)
+            except Exception as e:
+                raise ValueError("DerivedColumn function %r cannot be pickled: %s" % (function, e))
+        self.input_columns = list(input_columns)
+        self.function = function
+        super(DerivedColumn, self).__init__(name, **kwargs)
+
+    def resolve_input_columns(self, archive):
+        # type: (fidia.Archive) -> List[ColumnID]
+        """Find the full IDs of the input columns on `archive`."""
+        column_ids = [ColumnID.as_column_id(column_id) for column_id in archive.columns]
+        result = []
+        for input_id in self.input_columns:
+            input_id = ColumnID.as_column_id(input_id)
+            if input_id.type == 'full':
+                matches = [column_id for column_id in column_ids if column_id == input_id]
+            else:
+                matches = [column_id for column_id in column_ids
+                           if (column_id.column_type, column_id.column_name) ==
+                           (input_id.column_type, input_id.column_name)]
+            if len(matches) == 0:
+                raise FIDIAException("Input column %s of derived column %s not found. Input columns must be "
+                                     "defined before the derived column." % (input_id, self.name))
+            # Use the latest version of the column if there is more than one.
+            result.append(max(matches, key=lambda column_id: float(column_id.timestamp)))
+        return result
+
+    def _timestamp_helper(self, archive):
+        if archive is None:
+            return None
+        timestamps = [archive.columns[column_id].timestamp for column_id in self.resolve_input_columns(archive)]
+        if len(timestamps) == 0:
+            return None
+        return max(timestamps)
+
+    def associate(self, archive):
+        # type: (fidia.Archive) -> FIDIADerivedColumn
+        """Overrides `ColumnDefinition.associate` to record the function and the input columns on the new column."""
+        if self.function is None:
+            raise FIDIAException("DerivedColumn %s has no function" % self.name)
+        input_column_ids = self.resolve_input_columns(archive)
+        column = super(DerivedColumn, self).associate(archive)
+        column._array_getter = self.function
+        column._array_getter_args = {'input_column_ids': [str(column_id) for column_id in input_column_ids]}
+        return column
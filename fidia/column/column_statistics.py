@@ -0,0 +1,278 @@
+"""
+Summary statistics ("zone maps") of the contents of (non-array) columns.
+
+A :class:`ColumnStatistics` records the minimum, maximum, number of nulls,
+an estimate of the number of distinct values and (for numeric columns) a
+histogram of a whole column, and the minimum, maximum and number of nulls
+of each consecutive chunk of its values. They are computed when a column is
+ingested into a data access layer (see
+:meth:`fidia.dal.NumpyFileStore.write_series`), and are available from
+:meth:`FIDIAColumn.statistics`.
+
+The statistics allow questions such as "could any value in this column (or
+chunk) be greater than 10?" to be answered without reading the values (see
+:meth:`ColumnStatistics.may_match`).
+
+"""
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, Dict, List, Union
+import fidia
+
+# Python Standard Library Imports
+import json
+import operator
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['ColumnStatistics', 'estimate_distinct']
+
+STATISTICS_VERSION = 1
+
+# Number of values summarised by each chunk of the zone map.
+DEFAULT_CHUNK_SIZE = 4096
+
+# Number of bins in the histogram of numeric columns.
+DEFAULT_HISTOGRAM_BINS = 20
+
+# Number of hash values retained by the distinct value estimate.
+DISTINCT_SKETCH_SIZE = 1024
+
+COMPARISON_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+
+def estimate_distinct(values, k=DISTINCT_SKETCH_SIZE):
+    # type: (pd.Series, int) -> int
+    """Estimate the number of distinct non-null values using a K-minimum values sketch.
+
+    Each value is hashed to a 64 bit integer. If there are no more than `k`
+    distinct hashes, the count is exact. Otherwise, the number of distinct
+    values is estimated from the `k`-th smallest hash as
+    `(k - 1) * 2**64 / hash_k`.
+
+    """
+    values = values[values.notnull()]
+    if len(values) == 0:
+        return 0
+    try:
+        hashes = pd.util.hash_pandas_object(values, index=False).values
+    except TypeError:
+        # Unhashable values (e.g. arrays) are compared by their representation.
+        hashes = pd.util.hash_pandas_object(values.map(repr), index=False).values
+    hashes = np.unique(hashes)
+    if len(hashes) <= k:
+        return int(len(hashes))
+    kth_smallest = float(hashes[k - 1])
+    return int(round((k - 1) * 2.0 ** 64 / kth_smallest))
+
+
+def _to_python(value):
+    # type: (Any) -> Any
+    """Convert a (numpy) scalar into a value that can be stored as JSON, or None if that is not possible."""
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return None
+
+
+def _extrema(values):
+    # type: (pd.Series) -> (Any, Any)
+    """Return the minimum and maximum of the non-null `values`, or None if they can't be compared."""
+    if len(values) == 0:
+        return None, None
+    try:
+        return _to_python(values.min()), _to_python(values.max())
+    except (TypeError, ValueError):
+        # Values of types that can't be compared with each other (or arrays).
+        return None, None
+
+
+def _is_numeric(series):
+    # type: (pd.Series) -> bool
+    return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+
+class ColumnStatistics(object):
+    """Summary statistics of the values of a column, overall and for each chunk of values.
+
+    Usually created with :meth:`from_series`. The chunks are consecutive
+    runs of `chunk_size` values in the order the values were stored.
+
+    Attributes
+    ----------
+    count: int
+        Number of values (including nulls).
+    null_count: int
+        Number of null values.
+    min, max:
+        The smallest and largest non-null values (None if there are none, or
+        if the values can't be ordered).
+    distinct: int
+        Estimate of the number of distinct non-null values (see :func:`estimate_distinct`).
+    histogram: dict or None
+        For numeric columns, the bin `edges` and `counts` of the non-null values.
+    chunks: list of dict
+        The `start`, `count`, `null_count`, `min` and `max` of each chunk.
+    complete: bool
+        False if the values are known to cover only some of the objects of
+        the column (e.g. those written back to the DAL as they were used), in
+        which case the statistics say nothing about the other objects.
+
+    """
+
+    def __init__(self, count, null_count, min, max, distinct, histogram=None, chunks=None, chunk_size=None,
+                 complete=True):
+        self.count = int(count)
+        self.null_count = int(null_count)
+        self.min = min
+        self.max = max
+        self.distinct = int(distinct)
+        self.histogram = histogram  # type: Union[Dict[str, List], None]
+        self.chunks = chunks if chunks is not None else []  # type: List[Dict[str, Any]]
+        self.chunk_size = chunk_size
+        self.complete = bool(complete)
+
+    @classmethod
+    def from_series(cls, series, chunk_size=DEFAULT_CHUNK_SIZE, bins=DEFAULT_HISTOGRAM_BINS, complete=True):
+        # type: (pd.Series, int, int, bool) -> ColumnStatistics
+        """Compute the statistics of the values of `series` (all of the column's, unless `complete` is False)."""
+
+        nulls = series.isnull()
+        non_null = series[~nulls]
+        minimum, maximum = _extrema(non_null)
+
+        histogram = None
+        if _is_numeric(series):
+            finite = non_null.values[np.isfinite(non_null.values)]
+            if len(finite) > 0:
+                counts, edges = np.histogram(finite, bins=bins)
+                histogram = {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+        chunks = []
+        for start in range(0, len(series), chunk_size):
+            chunk_nulls = nulls.values[start:start + chunk_size]
+            chunk_values = series.iloc[start:start + chunk_size][~chunk_nulls]
+            chunk_min, chunk_max = _extrema(chunk_values)
+            chunks.append({'start': start, 'count': int(len(chunk_nulls)),
+                           'null_count': int(chunk_nulls.sum()),
+                           'min': chunk_min, 'max': chunk_max})
+
+        return cls(count=len(series), null_count=int(nulls.sum()), min=minimum, max=maximum,
+                   distinct=estimate_distinct(series), histogram=histogram, chunks=chunks,
+                   chunk_size=chunk_size, complete=complete)
+
+    def __repr__(self):
+        return "ColumnStatistics(count=%d, null_count=%d, min=%r, max=%r, distinct=%d)" % (
+            self.count, self.null_count, self.min, self.max, self.distinct)
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        return {'version': STATISTICS_VERSION,
+                'count': self.count, 'null_count': self.null_count,
+                'min': self.min, 'max': self.max, 'distinct': self.distinct,
+                'histogram': self.histogram, 'chunk_size': self.chunk_size, 'chunks': self.chunks,
+                'complete': self.complete}
+
+    @classmethod
+    def from_dict(cls, d):
+        # type: (Dict[str, Any]) -> ColumnStatistics
+        if d.get('version') != STATISTICS_VERSION:
+            raise ValueError("Unsupported column statistics version %s" % d.get('version'))
+        return cls(count=d['count'], null_count=d['null_count'], min=d['min'], max=d['max'],
+                   distinct=d['distinct'], histogram=d['histogram'], chunks=d['chunks'],
+                   chunk_size=d['chunk_size'], complete=d.get('complete', True))
+
+    def save(self, path):
+        # type: (str) -> None
+        """Write the statistics to `path` as JSON."""
+        from fidia.dal.numpy_file_store import write_atomically
+
+        def write(temporary_path):
+            with open(temporary_path, 'w') as f:
+                json.dump(self.as_dict(), f)
+        write_atomically(write, path)
+
+    @classmethod
+    def load(cls, path):
+        # type: (str) -> ColumnStatistics
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @staticmethod
+    def _range_may_match(minimum, maximum, op, value):
+        # type: (Any, Any, str, Any) -> bool
+        """True unless the range [minimum, maximum] certainly contains no value satisfying `op value`."""
+        if op not in COMPARISON_OPERATORS:
+            raise ValueError("Unknown comparison operator '%s'" % op)
+        if minimum is None or maximum is None:
+            # Nothing is known about the values.
+            return True
+        try:
+            if op == '<':
+                return minimum < value
+            if op == '<=':
+                return minimum <= value
+            if op == '>':
+                return maximum > value
+            if op == '>=':
+                return maximum >= value
+            if op == '==':
+                return minimum <= value <= maximum
+            # '!=': only excluded if every value is equal to `value`.
+            return not (minimum == value == maximum)
+        except TypeError:
+            return True
+
+    def may_match(self, op, value):
+        # type: (str, Any) -> bool
+        """True unless no non-null value in the column can satisfy the comparison `op value` (e.g. `'>', 10`).
+
+        A result of True does not guarantee that any value matches.
+
+        """
+        if self.count == self.null_count:
+            return False
+        return self._range_may_match(self.min, self.max, op, value)
+
+    def matching_chunks(self, op, value):
+        # type: (str, Any) -> List[Dict[str, Any]]
+        """Return the chunks which may contain a non-null value satisfying the comparison `op value`."""
+        return [chunk for chunk in self.chunks
+                if chunk['count'] > chunk['null_count'] and
+                self._range_may_match(chunk['min'], chunk['max'], op, value)]
@@ -14,14 +14,19 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from typing import Union, Callable
+from typing import Union, Callable, List, Set, Any, Dict, Tuple
 import fidia
 
 # Python Standard Library Imports
 import re
+import bisect
+import inspect
+import weakref
+import itertools
 from contextlib import contextmanager
 from operator import itemgetter, attrgetter
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import types
 
 # Other Library Imports
@@ -34,7 +39,8 @@ from sqlalchemy.orm.collections import attribute_mapped_collection, mapped_colle
 # FIDIA Imports
 import fidia.base_classes as bases
 from ..exceptions import FIDIAException, DataNotAvailable
-from ..utilities import RegexpGroup
+from ..utilities import RegexpGroup, downsample_to_size, describe_array
+from .column_statistics import ColumnStatistics
 
 # Set up logging
 from fidia import slogging
@@ -42,16 +48,40 @@ log = slogging.getLogger(__name__)
 log.setLevel(slogging.WARNING)
 log.enable_console_logging()
 
+# Marks rows with no data in `FIDIAColumn.get_array`
+_NO_DATA = object()
+
+# Source of unique keys for column data stored in `fidia.column_cache`
+_column_cache_keys = itertools.count()
+
+
+def _discard_cached_data(key):
+    fidia.column_cache.discard(key)
+
+
+# Registry of interned ColumnIDs, see `ColumnID.__new__`
+_interned_column_ids = dict()  # type: Dict[str, ColumnID]
+
 
 # noinspection PyInitNewSignature
 class ColumnID(str):
-    """ColumnID(archive_id, column_type, column_name, timestamp)"""
+    """ColumnID(archive_id, column_type, column_name, timestamp)
+
+    ColumnIDs are interned: creating a ColumnID from a string that has been
+    seen before returns the existing instance (with its components already
+    split out), so repeated conversion of the same ID is a dictionary lookup.
+
+    """
 
     # @TODO: More tests required of this.
 
     __slots__ = ('archive_id', 'column_type', 'column_name', 'timestamp')
 
     def __new__(cls, string):
+        try:
+            return _interned_column_ids[string]
+        except KeyError:
+            pass
         # @TODO: Validation
         self = str.__new__(cls, string)
         split = string.split(":")
@@ -61,23 +91,23 @@ class ColumnID(str):
             self.column_type = split[0]
             self.column_name = split[1]
             self.timestamp = None
-            return self
-        if len(split) == 4:
+        elif len(split) == 4:
             # Fully defined
             self.archive_id = split[0]
             self.column_type = split[1]
             self.column_name = split[2]
             self.timestamp = split[3]
-            return self
-        if len(split) == 1:
+        elif len(split) == 1:
             # Column name contains no colons, so assume it is not a `proper'
             # ColumnID and just populate the name
             self.archive_id = None
             self.column_type = None
             self.column_name = string
             self.timestamp = None
-            return self
-        raise ValueError("Supplied string cannot be parsed as a ColumnID: %s" % string)
+        else:
+            raise ValueError("Supplied string cannot be parsed as a ColumnID: %s" % string)
+        # If another thread interned the same ID in the meantime, use that instance.
+        return _interned_column_ids.setdefault(str(string), self)
 
     @classmethod
     def as_column_id(cls, key):
@@ -133,16 +163,29 @@ class ColumnID(str):
         """Return a nicely formatted representation string"""
         return 'ColumnID(%s)' % super(ColumnID, self).__repr__()
 
+    def __reduce__(self):
+        # Slots are set in `__new__`, so pickling need only record the string.
+        return ColumnID, (str(self),)
+
     # def _asdict(self):
     #     """Return a new OrderedDict which maps field names to their values"""
     #     return collections.OrderedDict(zip(self._fields, self))
 
     def replace(self, **kwargs):
         """Return a new ColumnID object replacing specified fields with new values"""
-        result = ColumnID.as_column_id(map(kwargs.pop, self.__slots__, self.as_tuple))
-        if kwargs:
-            raise ValueError('Got unexpected field names: %r' % kwargs.keys())
-        return result
+        fields = dict(zip(self.__slots__, self.as_tuple()))
+        for field in kwargs:
+            if field not in fields:
+                raise ValueError('Got unexpected field names: %r' % list(kwargs.keys()))
+        fields.update(kwargs)
+        if fields['archive_id'] is None and fields['timestamp'] is None:
+            return ColumnID.as_column_id((fields['column_type'], fields['column_name']))
+        return ColumnID.as_column_id(tuple(str(fields[field]) for field in self.__slots__))
+
+    @property
+    def components(self):
+        """The (archive_id, column_type, column_name) identifying the column independent of its timestamp."""
+        return self.archive_id, self.column_type, self.column_name
 
     # def __str__(self):
     #     string = self.column_name
@@ -165,19 +208,96 @@ class ColumnID(str):
             return {'archive_id': split[0], 'column_type': split[1], 'column_name': split[2], 'timestamp': split[3]}
 
     def as_tuple(self):
-        return tuple(map(attrgetter, self.__slots__))
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+
+def _timestamp_sort_key(timestamp):
+    # type: (str) -> Tuple[float, str]
+    try:
+        return float(timestamp), timestamp
+    except (TypeError, ValueError):
+        return float('-inf'), str(timestamp)
 
 
 class ColumnIDDict(OrderedDict):
+    """An ordered dictionary keyed by ColumnID, which can look up the latest version of a column.
+
+    Looking up a key with the timestamp `latest` (e.g.
+    `"archive:type:name:latest"`) returns the item for the most recent
+    timestamp of that column. An index from the (archive_id, column_type,
+    column_name) of each key to its sorted timestamps is maintained as items
+    are added and removed, so this does not require a search of the keys.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._timestamp_index = dict()  # type: Dict[Tuple[str, str, str], List[Tuple[float, str]]]
+        super(ColumnIDDict, self).__init__(*args, **kwargs)
+
+    def _index_add(self, column_id):
+        # type: (ColumnID) -> None
+        timestamps = self._timestamp_index.setdefault(column_id.components, [])
+        entry = _timestamp_sort_key(column_id.timestamp)
+        position = bisect.bisect_left(timestamps, entry)
+        if position == len(timestamps) or timestamps[position] != entry:
+            timestamps.insert(position, entry)
+
+    def _index_remove(self, column_id):
+        # type: (ColumnID) -> None
+        timestamps = self._timestamp_index.get(column_id.components)
+        if timestamps is None:
+            return
+        entry = _timestamp_sort_key(column_id.timestamp)
+        position = bisect.bisect_left(timestamps, entry)
+        if position < len(timestamps) and timestamps[position] == entry:
+            del timestamps[position]
+        if len(timestamps) == 0:
+            del self._timestamp_index[column_id.components]
+
+    def __setitem__(self, key, value):
+        column_id = ColumnID.as_column_id(key)
+        if column_id not in self:
+            self._index_add(column_id)
+        super(ColumnIDDict, self).__setitem__(column_id, value)
+
+    def __delitem__(self, key):
+        column_id = ColumnID.as_column_id(key)
+        super(ColumnIDDict, self).__delitem__(column_id)
+        self._index_remove(column_id)
+
+    def pop(self, key, *default):
+        column_id = ColumnID.as_column_id(key)
+        if column_id in self:
+            self._index_remove(column_id)
+        return super(ColumnIDDict, self).pop(column_id, *default)
+
+    def popitem(self, last=True):
+        key, value = super(ColumnIDDict, self).popitem(last=last)
+        self._index_remove(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        column_id = ColumnID.as_column_id(key)
+        if column_id not in self:
+            self[column_id] = default
+        return super(ColumnIDDict, self).__getitem__(column_id)
+
+    def clear(self):
+        super(ColumnIDDict, self).clear()
+        self._timestamp_index.clear()
 
     def timestamps(self, column_id):
+        """The timestamps (as strings) of the versions of the column present, from oldest to newest."""
         column_id = ColumnID.as_column_id(column_id)
-        for key in self.keys():
-            if key.replace(timestamp=None) == column_id.replace(timestamp=None):
-                yield key.timestamp
-    
+        for _, timestamp in self._timestamp_index.get(column_id.components, []):
+            yield timestamp
+
     def latest_timestamp(self, column_id):
-        return max(self.timestamps(column_id))
+        column_id = ColumnID.as_column_id(column_id)
+        try:
+            return self._timestamp_index[column_id.components][-1][1]
+        except KeyError:
+            raise KeyError("No version of column %s present" % column_id)
 
     def __getitem__(self, item):
         column_id = ColumnID.as_column_id(item)
@@ -246,6 +366,9 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
     short_description = sa.Column(sa.Unicode(length=150))
     long_description = sa.Column(sa.UnicodeText)
 
+    # Number of threads used by `get_array` if set for this column (see `.get_array_workers`).
+    _get_array_workers = None
+
     allowed_types = RegexpGroup(
         'string',
         'float',
@@ -288,8 +411,10 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
         """
         super(FIDIAColumn, self).__init__()
 
-        # Internal storage for data of this column
-        self._data = kwargs.pop('data', None)
+        # Data provided explicitly for this column (not subject to
+        # eviction). Data retrieved for the column is held in
+        # `fidia.column_cache`, see `._data`.
+        self._explicit_data = kwargs.pop('data', None)
 
         # Data Type information. Parsing and validation already done by `ColumnDefinition`.
         self._dtype = kwargs.pop('dtype', None)
@@ -330,7 +455,40 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
     @reconstructor
     def __db_init__(self):
         super(FIDIAColumn, self).__db_init__()
-        self._data = None
+        self._explicit_data = None
+
+    @property
+    def _data(self):
+        # type: () -> Union[pd.Series, None]
+        """The data of this column for all objects, or None if not retrieved or since discarded.
+
+        Unless it was provided explicitly when the column was created, the
+        data is held by the process-wide `fidia.column_cache`, which may
+        discard it at any time to stay within its memory budget.
+
+        """
+        if getattr(self, '_explicit_data', None) is not None:
+            return self._explicit_data
+        key = getattr(self, '_column_cache_key', None)
+        if key is None:
+            return None
+        return fidia.column_cache.get(key)
+
+    @_data.setter
+    def _data(self, value):
+        key = getattr(self, '_column_cache_key', None)
+        if value is None:
+            if key is not None:
+                fidia.column_cache.discard(key)
+            return
+        if key is None:
+            # Each column object has its own key (rather than e.g. using the
+            # ColumnID), as columns with the same ID may be associated with
+            # different copies of the original data.
+            key = (self.id, next(_column_cache_keys))
+            self._column_cache_key = key
+            weakref.finalize(self, _discard_cached_data, key)
+        fidia.column_cache.put(key, value)
 
     @property
     def column_definition_class(self):
@@ -346,6 +504,30 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
         klass = getattr(fidia.column.column_definitions, class_name)
         return klass
 
+    @property
+    def get_array_workers(self):
+        # type: () -> int
+        """Default number of threads used by `get_array` to call `get_value` for each object.
+
+        Getters are not in general safe to call from several threads, so this
+        is one unless set for this column, or the column's definition is known
+        to be safe (see `ColumnDefinition.get_array_workers`).
+
+        """
+        if self._get_array_workers is not None:
+            return self._get_array_workers
+        try:
+            workers = self.column_definition_class.get_array_workers
+        except (ValueError, AttributeError):
+            workers = None
+        if workers is None:
+            return 1
+        return workers
+
+    @get_array_workers.setter
+    def get_array_workers(self, value):
+        self._get_array_workers = value
+
     @property
     def id(self):
         # type: () -> ColumnID
@@ -383,21 +565,49 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
 
         This function tries each of the following steps until one returns a value:
 
-        1. Search the Data Access Layer
+        1. Search the Data Access Layer (if the DAL reports that no data
+           exists for this object, `DataNotAvailable` is raised immediately)
+           If no layer of the DAL has the column at all, this is remembered,
+           and the DAL is not searched again for this column until data is
+           added to it or its layers are changed (see
+           :attr:`DataAccessLayerHost.generation`).
         2. Use original `ColumnDefinition.object_getter` stored in local `._object_getter`
         3. Use original `ColumnDefinition.array_getter` stored in local `._array_getter`, selecting just this row.
 
+        If the value came from the original definition (steps 2 or 3), and
+        write-back is enabled on the DAL host (see
+        :meth:`DataAccessLayerHost.enable_write_back`), the value is also
+        written into the DAL in the background.
+
         """
 
         if provenance not in ['any', 'dal', 'definition']:
             raise ValueError("provenance must be one of 'any', 'dal' or 'definition'")
 
-        if provenance in ['any', 'dal']:
+        # Skip the DAL if no layer could respond for this column last time,
+        # and nothing has changed in the DAL since.
+        generation = fidia.dal_host.generation
+        skip_dal = (provenance == 'any' and
+                    getattr(self, '_dal_cant_respond_generation', None) == generation)
+
+        if skip_dal:
+            # Still record the request, as it would have been made of the DAL.
+            fidia.dal_host.record_access(self, object_id)
+
+        if provenance in ['any', 'dal'] and not skip_dal:
             # STEP 1: Search the data access layer
             try:
                 return fidia.dal_host.search_for_cell(self, object_id)
+            except fidia.dal.DALDataMissing:
+                # The DAL has recorded that the original data does not exist,
+                # so there is no point in trying the original definition.
+                raise DataNotAvailable("No data for column_id %s, object_id %s" % (self.id, object_id))
+            except fidia.dal.DALCantRespond:
+                log.debug("No DAL layer has data for column_id %s", self.id)
+                self._dal_cant_respond_generation = generation
             except:
-                log.info("DAL did not provide data for column_id %s, object_id %s", self.id, object_id, exc_info=True)
+                log.info("DAL did not provide data for column_id %s, object_id %s", self.id, object_id)
+                log.debug("DAL failure details:", exc_info=True)
 
         if provenance in ['any', 'definition']:
 
@@ -412,49 +622,184 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
                 log.vdebug("_object_getter(object_id=\"%s\", %s)", object_id, self._object_getter_args)
                 result = self._object_getter(object_id, **self._object_getter_args)
                 assert result is not None, "ColumnDefinition.object_getter must not return `None`."
-                return result
+            else:
+                #  STEP 3: Use original `ColumnDefinition.array_getter`
+                log.vdebug("Retrieving using array getter from ColumnDefinition via `._default_get_value`")
+                result = self._default_get_value(object_id)
+
+            if provenance == 'any':
+                # The DAL did not have this data: offer it to the DAL so that
+                # future requests need not use the original definition.
+                fidia.dal_host.write_back(self, object_id, result)
 
-            #  STEP 3: Use original `ColumnDefinition.array_getter`
-            log.vdebug("Retrieving using array getter from ColumnDefinition via `._default_get_value`")
-            return self._default_get_value(object_id)
+            return result
 
         # This should not be reached unless something is wrong with the state of the data/ingestion.
         raise DataNotAvailable("Neither the DAL nor the original ColumnDefinition could provide the requested data.")
 
-    def get_array(self):
+    def get_array(self, workers=None, provenance='any'):
+        """Retrieve the data for all objects as a `pandas.Series` indexed by object ID.
+
+        Parameters
+        ----------
+        workers: int (optional)
+            Number of threads used to call `.get_value`, which is worthwhile
+            when each call reads a separate file (as for e.g.
+            `FITSHeaderColumn`). Defaults to `.get_array_workers`. Has no
+            effect if the column has an `array_getter`.
+        provenance: str
+            As for :meth:`get_value`.
+
+        Implementation
+        --------------
+
+        The Data Access Layer is first asked for the data for all objects in a
+        single request (see :meth:`DataAccessLayerHost.search_for_column`).
+        Only objects the DAL has no data for (and has not recorded as having
+        no data) are then retrieved from the original definition:
+
+        1. If the column has an `array_getter`, it is used.
+        2. Otherwise, `.get_value` is called for each object, and the results
+           converted to the declared type of the column.
+
+        The result is in the order of `.contents`. For columns with an
+        `array_getter` which retrieves all objects at once (e.g. catalog
+        columns), it covers every object (with missing values as `np.nan`).
+        Otherwise (including `array_getter`s which retrieve only the objects
+        requested, e.g. `FITSHeaderColumn`), objects for which no data is
+        available are omitted, and the result has the declared type of the
+        column.
+
+        """
+
+        if provenance not in ['any', 'dal', 'definition']:
+            raise ValueError("provenance must be one of 'any', 'dal' or 'definition'")
+
+        contents = list(self.contents)
+        parts = []  # type: List[pd.Series]
+        known_missing = set()  # type: Set[str]
+        remaining = contents
+
+        # Skip the DAL if it could not respond for this column last time (see `get_value`).
+        generation = fidia.dal_host.generation
+        skip_dal = (provenance == 'any' and
+                    getattr(self, '_dal_cant_respond_generation', None) == generation)
+
+        if skip_dal:
+            fidia.dal_host.record_access(self, *contents)
+
+        if provenance in ['any', 'dal'] and not skip_dal:
+            try:
+                dal_data, known_missing = fidia.dal_host.search_for_column(self, contents)
+            except fidia.dal.DALCantRespond:
+                log.debug("No DAL layer has data for column_id %s", self.id)
+                self._dal_cant_respond_generation = generation
+                if provenance == 'dal':
+                    raise DataNotAvailable("The DAL has no data for column_id %s" % self.id)
+            else:
+                parts.append(dal_data)
+                found = set(dal_data.index)
+                remaining = [object_id for object_id in contents
+                             if object_id not in found and object_id not in known_missing]
+                log.debug("DAL provided %d of %d objects for column %s", len(found), len(contents), self.id)
+
+        if remaining and provenance in ['any', 'definition']:
+            parts.append(self._get_array_from_definition(remaining, workers))
+
+        non_empty = [part for part in parts if len(part) > 0]
+        if len(non_empty) > 1:
+            result = pd.concat(non_empty)
+        elif len(non_empty) == 1:
+            result = non_empty[0]
+        elif len(parts) > 0:
+            result = parts[-1]
+        else:
+            result = pd.Series([])
+
+        if self._array_getter is not None and not self._array_getter_selects_objects:
+            return result.reindex(contents, copy=False)
+        else:
+            present = set(result.index)
+            return result.reindex([object_id for object_id in contents if object_id in present], copy=False)
+
+    def statistics(self):
+        # type: () -> ColumnStatistics
+        """Summary statistics of the values of this column (minimum, maximum, null count, etc.).
+
+        The statistics recorded by the DAL when the column was ingested are
+        used if available (see :meth:`DataAccessLayerHost.search_for_statistics`),
+        so the data need not be read. Otherwise they are computed from
+        `.get_array`.
+
+        See :class:`fidia.column.column_statistics.ColumnStatistics`.
+
+        """
+        try:
+            return fidia.dal_host.search_for_statistics(self)
+        except fidia.dal.DALCantRespond:
+            log.debug("DAL has no statistics for column_id %s, computing them", self.id)
+        return ColumnStatistics.from_series(self.get_array())
+
+    def _get_array_from_definition(self, object_ids, workers=None):
+        # type: (List[str], int) -> pd.Series
+        """Retrieve the data for `object_ids` from the original definition of the column (see `get_array`)."""
+
         if self._array_getter is not None:
-            result = self._array_getter(**self._array_getter_args)
+            arguments = dict(self._array_getter_args)
+            selects_objects = self._array_getter_selects_objects
+            if selects_objects:
+                # Getters which read each object separately (e.g. FITSHeaderColumn) read only those required.
+                arguments['object_ids'] = object_ids
+            result = self._array_getter(**arguments)
             assert result is not None, "ColumnDefinition.array_getter must not return `None`."
             assert isinstance(result, pd.Series)
-            # TODO: Why must this result be ordered? It's indexed...
-            log.debug("Reordering array to ensure correct ordering.")
-            ordered_result = result.reindex(self.contents, copy=False)
-            # Since `copy=False`, this will only do work if required, otherwise the original Series is returned.
-            #   see: https://pandas.pydata.org/pandas-docs/stable/generated/pandas.DataFrame.reindex.html
-            # @NOTE: The order of self.contents is not preserved from how it is initialized.
-            return ordered_result
+            if len(object_ids) < len(result):
+                result = result[result.index.isin(object_ids)]
+            if selects_objects:
+                # As for values retrieved with `get_value` below.
+                result = self._as_declared_type(result)
+            return result
         else:
-            data = []
-            index = []
-            for object_id in self.contents:
+            if workers is None:
+                workers = self.get_array_workers
+
+            def get_row(object_id):
                 try:
-                    data.append(self.get_value(object_id))
+                    return self.get_value(object_id, provenance='definition')
                 except DataNotAvailable:
-                    # This row of the array has no data. To avoid causing
-                    # up-casting of the type, (from e.g. int to float to
-                    # accomodate np.nan), we simply don't add this row to the
-                    # pd.Series object.
-                    pass
-                else:
-                    index.append(object_id)
-                    # @NOTE: It may be more efficient to copy the index and then
-                    # remove items, rather than building it up.
-            series = pd.Series(data, index=index)
-            if series.dtype.name != self._dtype:
+                    return _NO_DATA
+
+            if workers > 1 and len(object_ids) > 1:
+                log.debug("Retrieving array for column %s using %s threads", self, workers)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # `map` returns results in the order of `object_ids`.
+                    values = list(executor.map(get_row, object_ids))
+            else:
+                values = [get_row(object_id) for object_id in object_ids]
+
+            # Rows with no data are omitted (rather than set to e.g. np.nan)
+            # to avoid up-casting the type, (from e.g. int to float to
+            # accomodate np.nan).
+            index = [object_id for object_id, value in zip(object_ids, values) if value is not _NO_DATA]
+            data = [value for value in values if value is not _NO_DATA]
+            return self._as_declared_type(pd.Series(data, index=index))
+
+    @property
+    def _array_getter_selects_objects(self):
+        # type: () -> bool
+        """True if the `array_getter` retrieves only the objects requested (it has an `object_ids` parameter)."""
+        return (self._array_getter is not None and
+                'object_ids' in inspect.signature(self._array_getter).parameters)
+
+    def _as_declared_type(self, series):
+        # type: (pd.Series) -> pd.Series
+        """Convert values of a compatible type (e.g. integers in a float column) to the declared type."""
+        if self._dtype is not None and series.dtype.name != self._dtype:
+            if len(series) > 0 and not np.can_cast(series.dtype, self._dtype, casting='same_kind'):
                 raise TypeError("get_array constructed an array of the wrong type %s, should be %s for column %s" %
                                 (series.dtype.name, self._dtype, self))
-            return series
-
+            series = series.astype(self._dtype)
+        return series
 
     def _default_get_value(self, object_id):
         """Individual value getter, takes object_id as argument.
@@ -470,14 +815,15 @@ class FIDIAColumn(bases.PersistenceBase, bases.SQLAlchemyBase):
         See `ColumnDefinition.associate()`.
 
         """
-        if self._data is not None:
-            assert isinstance(self._data, pd.Series)
-            return self._data.at[object_id]
-        elif self.get_array is not None:
-            self._data = self.get_array()
-            # assert self._data is not None, "Programming Error: get_array should populate _data"
-            return self._data[object_id]
-        raise FIDIAException("Column has no data")
+        data = self._data
+        if data is None:
+            if self.get_array is None:
+                raise FIDIAException("Column has no data")
+            data = self.get_array(provenance='definition')
+            # Retain the data for future requests (for as long as the column cache allows).
+            self._data = data
+        assert isinstance(data, pd.Series)
+        return data.at[object_id]
 
     @property
     def ucd(self):
@@ -545,8 +891,6 @@ class FIDIAArrayColumn(FIDIAColumn):
 
     def __init__(self, *args, **kwargs):
 
-        self._data = None
-
         self._ndim = kwargs.pop('ndim', 0)
         self._shape = kwargs.pop('shape', None)
 
@@ -555,15 +899,260 @@ class FIDIAArrayColumn(FIDIAColumn):
 
         super(FIDIAArrayColumn, self).__init__(*args, **kwargs)
 
+    def get_preview(self, object_id, max_size):
+        """Retrieve the data for the given object ID at reduced resolution.
+
+        The last two axes of the result (e.g. the spatial axes of an image or
+        cube) are no longer than `max_size`. If the DAL has stored a preview
+        pyramid for this column, the data is read from the appropriate level.
+        Otherwise, the full resolution data is retrieved with `.get_value` and
+        downsampled.
+
+        """
+
+        try:
+            return fidia.dal_host.search_for_preview(self, object_id, max_size)
+        except fidia.dal.DALDataNotAvailable:
+            log.info("DAL did not provide a preview for column_id %s, object_id %s", self.id, object_id)
+
+        return downsample_to_size(self.get_value(object_id), max_size)
+
+    def get_section(self, object_id, section):
+        """Retrieve part of the data for the given object ID, e.g. `column.get_section("Gal1", np.s_[0, 10:20, :])`.
+
+        Where possible, only the requested part of the data is read: from the
+        DAL if it can read sections (see
+        :meth:`DataAccessLayerHost.search_for_section`), or else from the
+        original data if the column definition's `object_getter` accepts a
+        `section` argument (e.g. :class:`.FITSDataColumn`). Otherwise, the full
+        data is retrieved with `.get_value` and sliced.
+
+        Parameters
+        ----------
+        object_id: str
+        section: slice, int, or tuple
+            Any basic (not fancy) numpy index.
+
+        """
+
+        try:
+            return fidia.dal_host.search_for_section(self, object_id, section)
+        except fidia.dal.DALDataMissing:
+            raise DataNotAvailable("No data for column_id %s, object_id %s" % (self.id, object_id))
+        except (fidia.dal.DALCantRespond, fidia.dal.DALDataNotAvailable):
+            log.debug("DAL did not provide a section for column_id %s, object_id %s", self.id, object_id)
+
+        if self._object_getter is not None and \
+                'section' in inspect.signature(self._object_getter).parameters:
+            return self._object_getter(object_id, section=section, **self._object_getter_args)
+
+        return np.asarray(self.get_value(object_id))[section]
+
+    def cell_metadata(self, object_ids=None):
+        # type: (List[str]) -> pd.DataFrame
+        """The shape, type and size in bytes of the data for each object.
+
+        The DAL's record of the cells is used where available (see
+        :meth:`DataAccessLayerHost.search_for_cell_metadata`), so that no data
+        need be read. For other objects, the data is retrieved.
+
+        Parameters
+        ----------
+        object_ids: list of str (optional)
+            The objects to describe. Defaults to `.contents`.
+
+        Returns
+        -------
+        pandas.DataFrame
+            With columns `shape` (a tuple), `dtype` (a numpy type string,
+            e.g. `'<f8'`) and `nbytes`, indexed by object ID in the order
+            requested. Objects for which no data is available are omitted.
+
+        """
+
+        if object_ids is None:
+            object_ids = list(self.contents)
+        else:
+            object_ids = list(object_ids)
+
+        parts = []
+        remaining = object_ids
+        try:
+            dal_metadata = fidia.dal_host.search_for_cell_metadata(self, object_ids)
+        except fidia.dal.DALCantRespond:
+            log.debug("No DAL layer has cell metadata for column_id %s", self.id)
+        else:
+            parts.append(dal_metadata)
+            found = set(dal_metadata.index)
+            remaining = [object_id for object_id in object_ids if object_id not in found]
+
+        index = []
+        rows = []
+        for object_id in remaining:
+            try:
+                rows.append(describe_array(self.get_value(object_id)))
+            except DataNotAvailable:
+                continue
+            index.append(object_id)
+        parts.append(pd.DataFrame(rows, index=index, columns=['shape', 'dtype', 'nbytes']))
+
+        metadata = pd.concat(parts) if len(parts) > 1 else parts[0]
+        present = set(metadata.index)
+        return metadata.reindex([object_id for object_id in object_ids if object_id in present])
+
+    # Number of objects retrieved by each task of `stack`
+    stack_chunk_size = 64
+
+    def stack(self, object_ids=None, path=None, workers=None, fill_value=np.nan):
+        # type: (List[str], str, int, Any) -> np.ndarray
+        """Combine the data for many objects into a single array, with the objects along the first axis.
+
+        The data for each object is retrieved with `.get_value` (so from the
+        DAL if possible), in chunks of `.stack_chunk_size` objects spread over
+        a pool of threads, and copied directly into the result. The data for
+        all objects must have the same shape.
+
+        Parameters
+        ----------
+        object_ids: list of str (optional)
+            The objects to include, in order. Defaults to `.contents`.
+        path: str (optional)
+            If given, the result is a `numpy.memmap` backed by a new `.npy`
+            file at this path (which can later be opened with
+            `numpy.load(path, mmap_mode='r')`), so that the result need not
+            fit in memory.
+        workers: int (optional)
+            Number of threads used. Defaults to `.get_array_workers`.
+        fill_value:
+            Value used for objects with no data. The default, `np.nan`,
+            requires floating point data.
+
+        """
+
+        if object_ids is None:
+            object_ids = list(self.contents)
+        else:
+            object_ids = list(object_ids)
+        if workers is None:
+            workers = self.get_array_workers
+
+        # Find the shape and type of the data for each object from the DAL's
+        # record of the cells, or else from the first object with data
+        # (unless declared for the column).
+        shape = getattr(self, '_shape', None)
+        dtype = self._dtype
+        first = None
+        if shape is None or dtype is None:
+            try:
+                metadata = fidia.dal_host.search_for_cell_metadata(self, object_ids)
+            except fidia.dal.DALCantRespond:
+                metadata = None
+            if metadata is not None and len(metadata) > 0:
+                shapes = set(metadata['shape'])
+                if len(shapes) > 1:
+                    raise ValueError("Data in column %s has several shapes: %s" % (self, sorted(shapes)))
+                if shape is None:
+                    shape = shapes.pop()
+                if dtype is None:
+                    dtype = np.result_type(*set(metadata['dtype']))
+        if shape is None or dtype is None:
+            for first, object_id in enumerate(object_ids):
+                try:
+                    first_data = np.asarray(self.get_value(object_id))
+                except DataNotAvailable:
+                    continue
+                shape, dtype = first_data.shape, first_data.dtype
+                break
+            else:
+                raise DataNotAvailable("No data for any of the requested objects in column %s" % self)
+        shape = (len(object_ids),) + tuple(shape)
+
+        if path is not None:
+            result = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        else:
+            result = np.empty(shape, dtype=dtype)
+
+        def fill_chunk(start):
+            for i in range(start, min(start + self.stack_chunk_size, len(object_ids))):
+                if i == first:
+                    result[i] = first_data
+                    continue
+                try:
+                    data = self.get_value(object_ids[i])
+                except DataNotAvailable:
+                    result[i] = fill_value
+                    continue
+                if np.shape(data) != shape[1:]:
+                    raise ValueError("Data for object %s in column %s has shape %s, expected %s" %
+                                     (object_ids[i], self, np.shape(data), shape[1:]))
+                result[i] = data
+
+        chunk_starts = range(0, len(object_ids), self.stack_chunk_size)
+        if workers > 1 and len(chunk_starts) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Consume the results so that any exception is raised here.
+                list(executor.map(fill_chunk, chunk_starts))
+        else:
+            for start in chunk_starts:
+                fill_chunk(start)
+
+        if path is not None:
+            result.flush()
+        return result
+
     @property
     def ndarray(self):
+        """The data for all objects in `.contents` as a single array (see :meth:`stack`)."""
+        return self.stack()
+
 
-        arr = np.empty((len(self._data),) + self._shape, dtype=self._dtype)
+class FIDIADerivedColumn(FIDIAColumn):
+    """A column whose data is computed from other columns of the same archive.
 
-        for i, elem in enumerate(self._data.values()):
-            arr[i] = elem
+    Created by :class:`.DerivedColumn`. The function computing the data is
+    stored as `._array_getter`, and the IDs of the input columns in
+    `._array_getter_args`.
 
-        return arr
+    """
+
+    __mapper_args__ = {'polymorphic_identity': 'FIDIADerivedColumn'}
+
+    @property
+    def input_column_ids(self):
+        # type: () -> List[str]
+        return list(self._array_getter_args['input_column_ids'])
+
+    @property
+    def input_columns(self):
+        # type: () -> List[FIDIAColumn]
+        return [self._archive.columns[column_id] for column_id in self.input_column_ids]
+
+    def _get_array_from_definition(self, object_ids, workers=None):
+        # type: (List[str], int) -> pd.Series
+        """Overrides `FIDIAColumn._get_array_from_definition` to compute the data from the input columns."""
+
+        # The IDs of the inputs include their timestamps, so the result is
+        # recomputed if any input changes.
+        key = (self.id, tuple(self.input_column_ids))
+        result = fidia.column_cache.get(key)
+        if result is None:
+            contents = list(self.contents)
+            inputs = [column.get_array(workers=workers).reindex(contents) for column in self.input_columns]
+            result = self._array_getter(*inputs)
+            if isinstance(result, pd.Series):
+                result = result.reindex(contents)
+            else:
+                result = pd.Series(np.asarray(result), index=contents)
+            if self._dtype is not None and result.dtype.name != self._dtype:
+                if not np.can_cast(result.dtype, self._dtype, casting='same_kind'):
+                    raise TypeError("Derived column %s computed data of type %s, should be %s" %
+                                    (self, result.dtype.name, self._dtype))
+                result = result.astype(self._dtype)
+            fidia.column_cache.put(key, result)
+
+        if len(object_ids) < len(result):
+            result = result[result.index.isin(object_ids)]
+        return result
 
 
 class PathBasedColumn:
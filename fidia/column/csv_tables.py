@@ -0,0 +1,149 @@
+"""
+Shared cache of parsed CSV tables.
+
+Each `CSVTableColumn` provides one column of a CSV file, and several are
+usually defined on the same file. Rather than each column parsing the file,
+:func:`read_csv_table` parses it once and keeps the result (keyed by the path,
+modification time and size of the file, and the comment character), so all
+columns of a file share one parse.
+
+Files are parsed with `astropy.io.ascii.read` (which uses the C reader of
+astropy where it can), so the cache does not make any one parse faster: the
+saving is that each file is parsed once rather than once per column. (The
+pandas C parser was also considered, but is no faster when floating point
+values must be read exactly.)
+
+The parsed tables are held up to a limit on their total memory use
+(:data:`CSV_CACHE_MAX_BYTES`), discarding the least recently used first.
+
+"""
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Dict, List, Tuple, Union
+import fidia
+
+# Python Standard Library Imports
+import os
+import threading
+from collections import OrderedDict
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+from astropy.io import ascii
+
+# FIDIA Imports
+from .column_cache import data_size
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['CSVTable', 'read_csv_table', 'parse_csv', 'clear_csv_cache']
+
+# Maximum total size of the parsed tables retained by the cache.
+CSV_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+_csv_cache = OrderedDict()  # type: OrderedDict[Tuple[str, Union[str, None]], Tuple[Tuple[int, int], CSVTable, int]]
+_csv_cache_bytes = 0
+_csv_cache_lock = threading.Lock()
+
+
+def parse_csv(path, comment=None):
+    # type: (str, Union[str, None]) -> pd.DataFrame
+    """Parse the CSV file at `path`, ignoring lines starting with `comment`."""
+    table = ascii.read(path, format="csv", comment=comment)
+    return pd.DataFrame(OrderedDict((name, table[name].data) for name in table.colnames))
+
+
+class CSVTable(object):
+    """A parsed CSV file, with the index built for each index column on first use shared by all users."""
+
+    def __init__(self, frame):
+        self.frame = frame  # type: pd.DataFrame
+        self._indexes = dict()  # type: Dict[str, pd.Index]
+        self._lock = threading.Lock()
+
+    @property
+    def column_names(self):
+        # type: () -> List[str]
+        return list(self.frame.columns)
+
+    def column(self, name):
+        # type: (str) -> np.ndarray
+        return self.frame[name].values
+
+    def index(self, name):
+        # type: (str) -> pd.Index
+        """The values of column `name` as an index."""
+        with self._lock:
+            try:
+                return self._indexes[name]
+            except KeyError:
+                index = pd.Index(self.frame[name].values)
+                self._indexes[name] = index
+                return index
+
+    def series(self, column_name, index_column_name, name=None):
+        # type: (str, str, str) -> pd.Series
+        """The values of column `column_name` indexed by those of column `index_column_name`."""
+        return pd.Series(self.column(column_name), index=self.index(index_column_name), name=name, copy=True)
+
+
+def read_csv_table(path, comment=None):
+    # type: (str, Union[str, None]) -> CSVTable
+    """Return the parsed CSV file at `path`, parsing it only if it is not in the cache or has changed.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no file at `path`.
+
+    """
+    global _csv_cache_bytes
+
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = (path, comment)
+    with _csv_cache_lock:
+        cached = _csv_cache.get(key)
+        if cached is not None and cached[0] == version:
+            _csv_cache.move_to_end(key)
+            return cached[1]
+
+    log.debug("Parsing CSV file %s", path)
+    table = CSVTable(parse_csv(path, comment))
+    size = data_size(table.frame)
+
+    with _csv_cache_lock:
+        if key in _csv_cache:
+            _csv_cache_bytes -= _csv_cache.pop(key)[2]
+        if size <= CSV_CACHE_MAX_BYTES:
+            while _csv_cache and _csv_cache_bytes + size > CSV_CACHE_MAX_BYTES:
+                _csv_cache_bytes -= _csv_cache.popitem(last=False)[1][2]
+            _csv_cache[key] = (version, table, size)
+            _csv_cache_bytes += size
+    return table
+
+
+def clear_csv_cache():
+    global _csv_cache_bytes
+    with _csv_cache_lock:
+        _csv_cache.clear()
+        _csv_cache_bytes = 0
@@ -0,0 +1,190 @@
+"""
+Cached listings of directories, for finding the modification times of many files.
+
+The timestamps of columns with a file per object (e.g. `FITSHeaderColumn`)
+are the latest modification time of the files of all objects in an archive.
+Determining them with `os.stat` for each object, for each column, is slow for
+large archives. Instead, a :class:`DirectorySnapshot` lists each directory
+containing those files once (with `os.scandir`, directories in parallel), and
+answers the questions of all columns from the listing. (Columns read from a
+single file, e.g. `FITSBinaryTableColumn`, simply use `os.stat` on it.)
+
+A listing is reused until the modification time of its directory changes,
+which happens when files are created, deleted or renamed in it (so also when
+a file is replaced by writing a new copy and renaming it into place). To
+avoid checking every directory for every column, a listing checked in the
+last `max_age` seconds is used without checking it again. Files modified in
+place do not change the modification time of their directory, so such
+changes are not seen until the listings are discarded
+(:meth:`DirectorySnapshot.clear`).
+
+All columns share the snapshot `fidia.column.directory_snapshot.snapshot`.
+
+"""
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Dict, Iterable, List, Union, Tuple
+import fidia
+
+# Python Standard Library Imports
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Other Library Imports
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['DirectorySnapshot', 'snapshot']
+
+
+class _Listing(object):
+    """The files in one directory and their modification times."""
+
+    __slots__ = ('directory_mtime_ns', 'checked', 'files')
+
+    def __init__(self, directory_mtime_ns, files):
+        # type: (Union[int, None], Dict[str, float]) -> None
+        # None if the directory does not exist.
+        self.directory_mtime_ns = directory_mtime_ns
+        self.checked = time.time()
+        self.files = files
+
+
+class DirectorySnapshot(object):
+    """Listings of directories, used to find the modification times of many files.
+
+    Parameters
+    ----------
+    workers: int
+        Number of threads used to list (or check) directories.
+    max_age: float
+        A listing checked more recently than this many seconds ago is used
+        without checking the modification time of its directory again.
+    max_directories: int
+        Maximum number of listings retained (least recently used are discarded).
+
+    """
+
+    def __init__(self, workers=16, max_age=10.0, max_directories=1000000):
+        self.workers = workers
+        self.max_age = max_age
+        self.max_directories = max_directories
+        self._listings = OrderedDict()  # type: OrderedDict[str, _Listing]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._listings)
+
+    def clear(self):
+        with self._lock:
+            self._listings = OrderedDict()
+
+    @staticmethod
+    def _scan(directory):
+        # type: (str) -> _Listing
+        try:
+            # Recorded before listing, so changes made during the listing are noticed later.
+            directory_mtime_ns = os.stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return _Listing(None, dict())
+        files = dict()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            files[entry.name] = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        # Removed while listing.
+                        pass
+        except (FileNotFoundError, NotADirectoryError):
+            return _Listing(None, dict())
+        return _Listing(directory_mtime_ns, files)
+
+    def _check(self, directory, listing):
+        # type: (str, Union[_Listing, None]) -> _Listing
+        """Return a current listing of `directory`, reusing `listing` if it is still valid."""
+        if listing is None:
+            return self._scan(directory)
+        try:
+            directory_mtime_ns = os.stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            directory_mtime_ns = None
+        if directory_mtime_ns != listing.directory_mtime_ns:
+            log.debug("Directory %s has changed, listing it again", directory)
+            return self._scan(directory)
+        listing.checked = time.time()
+        return listing
+
+    def listings(self, directories):
+        # type: (Iterable[str]) -> Dict[str, _Listing]
+        """Return current listings of `directories`, listing or checking them in parallel as required."""
+        directories = set(directories)
+        now = time.time()
+        with self._lock:
+            current = dict()
+            to_check = []  # type: List[Tuple[str, Union[_Listing, None]]]
+            for directory in directories:
+                listing = self._listings.get(directory)
+                if listing is not None and now - listing.checked < self.max_age:
+                    current[directory] = listing
+                    self._listings.move_to_end(directory)
+                else:
+                    to_check.append((directory, listing))
+
+        if to_check:
+            log.debug("Checking %d directory listings", len(to_check))
+            if self.workers > 1 and len(to_check) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    checked = list(executor.map(lambda args: self._check(*args), to_check))
+            else:
+                checked = [self._check(*args) for args in to_check]
+            with self._lock:
+                for (directory, _), listing in zip(to_check, checked):
+                    current[directory] = listing
+                    self._listings[directory] = listing
+                    self._listings.move_to_end(directory)
+                while len(self._listings) > self.max_directories:
+                    self._listings.popitem(last=False)
+        return current
+
+    def modification_times(self, paths):
+        # type: (Iterable[str]) -> List[Union[float, None]]
+        """Return the modification time of each of `paths`, or None for those which are not (regular) files."""
+        split_paths = [os.path.split(os.path.abspath(path)) for path in paths]
+        listings = self.listings(directory for directory, _ in split_paths)
+        return [listings[directory].files.get(name) for directory, name in split_paths]
+
+    def latest_modification_time(self, paths):
+        # type: (Iterable[str]) -> Union[float, None]
+        """Return the latest modification time of any of `paths`, or None if none of them exist."""
+        times = [t for t in self.modification_times(paths) if t is not None]
+        if len(times) == 0:
+            return None
+        return max(times)
+
+
+snapshot = DirectorySnapshot()
@@ -0,0 +1,331 @@
+"""
+Fast, header-only reading of FITS files.
+
+Reading a single keyword with `astropy.io.fits.open` parses the structure of
+the whole file. The functions here instead read only the 2880 byte header
+blocks of the HDUs up to the one required (skipping over the data of earlier
+HDUs), and parse only the keyword cards. Parsed headers are cached (keyed by
+the path, modification time and size of the file), so that the several
+`FITSHeaderColumn` columns usually defined on one file each read it only once.
+
+:func:`header_table` reads the headers of many files (optionally in
+parallel), and is used by `FITSHeaderColumn.array_getter` to retrieve whole
+columns of keyword values at once.
+
+"""
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, Dict, List, Union, Tuple
+import fidia
+
+# Python Standard Library Imports
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+from astropy.io import fits
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['read_header', 'header_table', 'keyword_values', 'normalize_keyword', 'clear_header_cache']
+
+BLOCK_SIZE = 2880
+CARD_SIZE = 80
+
+# Maximum number of parsed headers retained by the cache.
+HEADER_CACHE_SIZE = 100000
+
+# Keywords whose cards do not have values.
+_COMMENTARY_KEYWORDS = {'', 'COMMENT', 'HISTORY'}
+
+_STRING_VALUE = re.compile(r"^'((?:[^']|'')*)'")
+_END_CARD = b"END" + b" " * (CARD_SIZE - 3)
+
+_header_cache = OrderedDict()  # type: OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], Dict[str, Any]]]
+_header_cache_lock = threading.Lock()
+
+
+def _read_header_blocks(f):
+    # type: (Any) -> Union[bytes, None]
+    """Read the header blocks of the HDU starting at the current position of `f`, or None at the end of the file."""
+    blocks = []
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if len(block) < BLOCK_SIZE:
+            if blocks or block.strip(b"\0 "):
+                raise ValueError("Truncated FITS header in %s" % getattr(f, 'name', f))
+            return None
+        blocks.append(block)
+        for position in range(0, BLOCK_SIZE, CARD_SIZE):
+            if block[position:position + CARD_SIZE] == _END_CARD:
+                return b"".join(blocks)
+
+
+def _parse_value(card, value_start=10):
+    # type: (str, int) -> Any
+    """Parse the value of a (fixed or free format) FITS keyword card, which follows `value_start`."""
+    text = card[value_start:].strip()
+    if text.startswith("'"):
+        match = _STRING_VALUE.match(text)
+        if match is not None:
+            return match.group(1).replace("''", "'").rstrip()
+    else:
+        text = text.split("/", 1)[0].strip()
+        if text == "T":
+            return True
+        if text == "F":
+            return False
+        if text == "":
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            return float(text.replace("D", "E"))
+        except ValueError:
+            pass
+    # Anything else (e.g. complex values) is left to astropy.
+    return fits.Card.fromstring(card).value
+
+
+def normalize_keyword(keyword):
+    # type: (str) -> str
+    """The form of a keyword used in parsed headers: upper case, without any `HIERARCH` prefix.
+
+    As for astropy headers, `'exptime'`, `'EXPTIME'`, `'ESO DET CHIP'` and
+    `'HIERARCH ESO DET CHIP'` are then all found.
+
+    """
+    words = keyword.upper().split()
+    if len(words) > 1 and words[0] == 'HIERARCH':
+        words = words[1:]
+    return " ".join(words)
+
+
+def _parse_cards(raw):
+    # type: (bytes) -> Dict[str, Any]
+    """Parse the keyword values of a FITS header (with keywords as given by :func:`normalize_keyword`)."""
+    text = raw.decode('ascii', errors='replace')
+    header = OrderedDict()  # type: Dict[str, Any]
+    for position in range(0, len(text), CARD_SIZE):
+        card = text[position:position + CARD_SIZE]
+        keyword = card[:8].rstrip()
+        if keyword == 'END':
+            break
+        if keyword == 'CONTINUE':
+            # Long string values span several cards, which astropy handles.
+            header = OrderedDict()
+            for keyword, value in fits.Header.fromstring(text).items():
+                if keyword not in _COMMENTARY_KEYWORDS:
+                    header.setdefault(normalize_keyword(keyword), value)
+            return header
+        if keyword == 'HIERARCH':
+            # ESO HIERARCH convention: `HIERARCH <keyword> = <value>`.
+            value_start = card.find("=", 8)
+            if value_start < 0:
+                continue
+            keyword = normalize_keyword(card[8:value_start])
+            if keyword not in header:
+                header[keyword] = _parse_value(card, value_start + 1)
+            continue
+        if keyword in _COMMENTARY_KEYWORDS or card[8:10] != "= ":
+            continue
+        if keyword not in header:
+            header[keyword] = _parse_value(card)
+    return header
+
+
+def _data_size(header):
+    # type: (Dict[str, Any]) -> int
+    """Size in bytes (including padding) of the data following a header."""
+    naxis = header.get('NAXIS', 0)
+    if naxis == 0:
+        return 0
+    n_elements = 1
+    for axis in range(1, naxis + 1):
+        n_elements *= header['NAXIS%d' % axis]
+    size = abs(header['BITPIX']) // 8 * header.get('GCOUNT', 1) * (header.get('PCOUNT', 0) + n_elements)
+    return size + -size % BLOCK_SIZE
+
+
+def _is_extension(header, index, extension):
+    # type: (Dict[str, Any], int, Union[int, str]) -> bool
+    if isinstance(extension, int):
+        return index == extension
+    name = str(header.get('EXTNAME', 'PRIMARY' if index == 0 else '')).strip().upper()
+    return name == extension.upper()
+
+
+def _scan_header(path, extension):
+    # type: (str, Union[int, str]) -> Dict[str, Any]
+    with open(path, 'rb') as f:
+        index = 0
+        while True:
+            raw = _read_header_blocks(f)
+            if raw is None:
+                raise KeyError("FITS file %s has no extension %s" % (path, extension))
+            header = _parse_cards(raw)
+            if _is_extension(header, index, extension):
+                return header
+            f.seek(_data_size(header), os.SEEK_CUR)
+            index += 1
+
+
+def read_header(path, extension=0):
+    # type: (str, Union[int, str]) -> Dict[str, Any]
+    """Return the keyword values of the header of one extension of a FITS file.
+
+    Only the header blocks are read. Commentary keywords (`COMMENT`,
+    `HISTORY`) are omitted. Keywords are given in upper case, and HIERARCH
+    keywords without the `HIERARCH` prefix (see :func:`normalize_keyword`).
+
+    Parameters
+    ----------
+    path: str
+    extension: int or str
+        The index or the name (`EXTNAME`, or `PRIMARY`) of the extension.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no file at `path`.
+    KeyError
+        If the file has no such extension.
+
+    """
+    try:
+        extension = int(extension)
+    except ValueError:
+        pass
+
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = (path, str(extension))
+    with _header_cache_lock:
+        cached = _header_cache.get(key)
+        if cached is not None and cached[0] == version:
+            _header_cache.move_to_end(key)
+            return cached[1]
+
+    header = _scan_header(path, extension)
+
+    with _header_cache_lock:
+        _header_cache[key] = (version, header)
+        while len(_header_cache) > HEADER_CACHE_SIZE:
+            _header_cache.popitem(last=False)
+    return header
+
+
+def header_table(paths, extension=0, keywords=None, workers=8):
+    # type: (Dict[str, str], Union[int, str], List[str], int) -> pd.DataFrame
+    """Read the headers of many FITS files into a table.
+
+    Parameters
+    ----------
+    paths: dict
+        The path of the file for each object ID.
+    extension: int or str
+        The extension of each file to read (see :func:`read_header`).
+    keywords: list of str (optional)
+        The keywords to include (in any case, and with or without a
+        `HIERARCH` prefix). By default, all keywords found are included.
+    workers: int
+        Number of threads used to read the files.
+
+    Returns
+    -------
+    pandas.DataFrame
+        With a row for each object ID (in the order of `paths`) and a column
+        for each keyword. Files or extensions which do not exist, and keywords
+        not present in a header, give null values.
+
+    """
+
+    object_ids = list(paths.keys())
+    headers = _read_headers(paths, extension, workers)
+
+    if keywords is None:
+        keywords = list(OrderedDict.fromkeys(keyword for header in headers for keyword in header))
+    columns = OrderedDict()
+    for keyword in keywords:
+        key = normalize_keyword(keyword)
+        values = np.empty(len(headers), dtype=object)
+        for i, header in enumerate(headers):
+            values[i] = header.get(key, np.nan)
+        columns[keyword] = pd.Series(values, index=object_ids).infer_objects()
+    return pd.DataFrame(columns, index=object_ids, columns=keywords)
+
+
+def keyword_values(paths, keyword, extension=0, workers=8):
+    # type: (Dict[str, str], str, Union[int, str], int) -> pd.Series
+    """Read the value of one keyword from the headers of many FITS files.
+
+    As :func:`header_table`, except that objects whose file, extension or
+    keyword does not exist are omitted (so that e.g. integer values are not
+    converted to float to accommodate nulls). As for astropy headers, the
+    keyword is not case sensitive, and may be a HIERARCH keyword.
+
+    """
+    keyword = normalize_keyword(keyword)
+    headers = _read_headers(paths, extension, workers)
+    index = []
+    values = []
+    for object_id, header in zip(paths.keys(), headers):
+        value = header.get(keyword)
+        if value is not None:
+            index.append(object_id)
+            values.append(value)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return pd.Series(array, index=index).infer_objects()
+
+
+def _read_headers(paths, extension, workers):
+    # type: (Dict[str, str], Union[int, str], int) -> List[Dict[str, Any]]
+    """Read the headers of `paths` (in order), with an empty header for any which can't be read."""
+
+    def read(path):
+        try:
+            return read_header(path, extension)
+        except (FileNotFoundError, KeyError):
+            return dict()
+        except ValueError as e:
+            log.warning("Unable to read FITS header of %s: %s", path, e)
+            return dict()
+
+    paths = list(paths.values())
+    if workers > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(read, paths))
+    return [read(path) for path in paths]
+
+
+def clear_header_cache():
+    with _header_cache_lock:
+        _header_cache.clear()
@@ -0,0 +1,181 @@
+"""
+Shared cache of FITS binary tables.
+
+Catalogs in FITS binary tables usually provide several columns of an archive
+(e.g. a value and its error), each defined as a separate
+`FITSBinaryTableColumn`. Rather than each column opening and reading the
+table, :func:`read_table` reads it once and keeps it (keyed by the path,
+modification time and size of the file, and limited by the memory used). The columns of the table are
+converted to native byte order at most once, and the object index is
+built once and shared by all columns read from the table.
+
+"""
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, Dict, Tuple, Union
+import fidia
+
+# Python Standard Library Imports
+import os
+import threading
+from collections import OrderedDict
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+from astropy.io import fits
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['FITSTable', 'read_table', 'clear_table_cache', 'native_array', 'string_index']
+
+# Maximum total size in bytes (see `FITSTable.nbytes`) of the tables retained
+# by the cache. The table most recently read is retained whatever its size.
+TABLE_CACHE_BYTES = 1024 ** 3
+
+_table_cache = OrderedDict()  # type: OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], FITSTable]]
+_table_cache_lock = threading.Lock()
+
+
+def native_array(data):
+    # type: (Any) -> np.ndarray
+    """Return `data` as an array in native byte order, copying it only if required."""
+    array = np.asarray(data)
+    if not array.dtype.isnative:
+        array = array.astype(array.dtype.newbyteorder('='))
+    return array
+
+
+def string_index(data):
+    # type: (Any) -> pd.Index
+    """Return a `pandas.Index` of the values of `data` as strings (e.g. for use as object IDs)."""
+    return pd.Index(native_array(data).astype(str), dtype=object)
+
+
+class FITSTable(object):
+    """The data of one binary table HDU, with columns converted to native byte order on first use.
+
+    The arrays returned by :meth:`column` and the index returned by
+    :meth:`index` are shared by all users of the table, and are read-only.
+
+    """
+
+    def __init__(self, data):
+        self._data = data  # type: fits.FITS_rec
+        self._columns = dict()  # type: Dict[str, np.ndarray]
+        self._indexes = dict()  # type: Dict[str, pd.Index]
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # type: () -> int
+        """Memory used by the table, including the columns converted and indexes built so far."""
+        with self._lock:
+            return int(self._data.nbytes +
+                       sum(array.nbytes for array in self._columns.values()) +
+                       sum(index.memory_usage(deep=True) for index in self._indexes.values()))
+
+    @property
+    def column_names(self):
+        return list(self._data.names)
+
+    def column(self, name):
+        # type: (str) -> np.ndarray
+        with self._lock:
+            try:
+                return self._columns[name]
+            except KeyError:
+                pass
+            array = native_array(self._data[name])
+            array.flags.writeable = False
+            self._columns[name] = array
+            return array
+
+    def index(self, name):
+        # type: (str) -> pd.Index
+        """The values of column `name` as a (string) index."""
+        with self._lock:
+            try:
+                return self._indexes[name]
+            except KeyError:
+                index = string_index(self._data[name])
+                self._indexes[name] = index
+                return index
+
+    def series(self, column_name, index_column_name, name=None):
+        # type: (str, str, str) -> pd.Series
+        """The values of column `column_name` indexed by those of column `index_column_name`.
+
+        The series does not copy the data held by the table.
+
+        """
+        return pd.Series(self.column(column_name), index=self.index(index_column_name), name=name, copy=False)
+
+
+def read_table(path, extension=1):
+    # type: (str, Union[int, str]) -> FITSTable
+    """Return the binary table in extension `extension` (index or name) of the FITS file at `path`.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no file at `path`.
+
+    """
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = (path, str(extension))
+    with _table_cache_lock:
+        cached = _table_cache.get(key)
+        if cached is not None and cached[0] == version:
+            _table_cache.move_to_end(key)
+            # Tables grow as their columns are converted, so the limit is checked again.
+            _limit_table_cache()
+            return cached[1]
+
+    log.debug("Reading FITS table %s[%s]", path, extension)
+    with fits.open(path, memmap=False) as hdulist:
+        from .column_definitions import get_fits_extension_by_name_or_index
+        table = FITSTable(get_fits_extension_by_name_or_index(hdulist, extension).data)
+
+    with _table_cache_lock:
+        _table_cache[key] = (version, table)
+        _limit_table_cache()
+    return table
+
+
+def _limit_table_cache():
+    """Discard the least recently used tables until the cache is within `TABLE_CACHE_BYTES` (lock held)."""
+    sizes = [table.nbytes for _, table in _table_cache.values()]
+    total = sum(sizes)
+    for size in sizes[:-1]:
+        if total <= TABLE_CACHE_BYTES:
+            break
+        key, _ = _table_cache.popitem(last=False)
+        log.debug("Discarding FITS table %s[%s] from the cache", *key)
+        total -= size
+
+
+def clear_table_cache():
+    with _table_cache_lock:
+        _table_cache.clear()
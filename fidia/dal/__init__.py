@@ -14,5 +14,9 @@
 
 
 from .numpy_file_store import NumpyFileStore
+from .pack_file_store import PackFileStore, write_pack_file
+from .row_bundle_store import RowBundleStore
+from .memory_cache import MemoryCache
+from .access_log import AccessLog, replay_access_log
 
 from ._dal_internals import *
@@ -14,15 +14,22 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Iterable, Union, Mapping, Set, Tuple
 import fidia
 
 # Python Standard Library Imports
 import inspect
+import zlib
+import sys
+import atexit
+import configparser
+import threading
 from itertools import chain
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Other Library Imports
-# import numpy as np
+import numpy as np
 import pandas as pd
 
 # FIDIA Imports
@@ -40,7 +47,8 @@ log.enable_console_logging()
 __all__ = ['DataAccessLayer',
            'DataAccessLayerHost',
            'OptimizedIngestionMixin',
-           'DALException', 'DALCantRespond', 'DALDataNotAvailable', 'DALIngestionError']
+           'shard_contents',
+           'DALException', 'DALCantRespond', 'DALDataNotAvailable', 'DALDataMissing', 'DALIngestionError']
 
 class DALException(Exception):
     """Generic exception class for the Data Access Layer."""
@@ -51,10 +59,35 @@ class DALCantRespond(DALException):
 class DALDataNotAvailable(DALException):
     """Exception raised when a layer of the DAL doesn't have the requested data."""
 
+class DALDataMissing(DALDataNotAvailable):
+    """Exception raised when the DAL knows the requested data does not exist (e.g. from an availability index)."""
+
 class DALIngestionError(DALException):
     """Exception raised when an error occurs loading new data into a layer of the DAL."""
 
 
+def shard_contents(contents, n_shards, shard_index):
+    # type: (Iterable[str], int, int) -> List[str]
+    """Return the subset of `contents` belonging to shard `shard_index` of `n_shards`.
+
+    Objects are assigned to shards by a CRC32 hash of their ID, so the
+    assignment is stable across processes and machines, and does not depend on
+    the order of `contents` (which is not preserved by the persistence
+    database). Every object belongs to exactly one shard.
+
+    >>> shard_contents(["Gal1", "Gal2", "Gal3"], 1, 0)
+    ['Gal1', 'Gal2', 'Gal3']
+
+    """
+    if n_shards < 1:
+        raise ValueError("n_shards must be at least 1")
+    if not 0 <= shard_index < n_shards:
+        raise ValueError("shard_index must be in the range [0, %s)" % n_shards)
+
+    return [object_id for object_id in contents
+            if zlib.crc32(str(object_id).encode('utf-8')) % n_shards == shard_index]
+
+
 class DataAccessLayer(object):
     """Base class for implementing layers of the FIDIA Data Access System.
 
@@ -71,6 +104,32 @@ class DataAccessLayer(object):
     - `simple_pre_ingestion_callback(column)`
     - `simple_post_ingestion_callback(column)`
 
+    Subclasses which record which objects have data in each column (an
+    availability index) should override `.has_data`, which allows the
+    :class:`DataAccessLayerHost` to report missing data without reading it.
+
+    Subclasses which can efficiently provide data for many objects of a column
+    at once can define `get_array(column, object_ids)`, which should return a
+    `pandas.Series` of the data found (indexed by object ID, omitting objects
+    with no data), or raise :class:`DALCantRespond`. This is used by
+    :meth:`DataAccessLayerHost.search_for_column`.
+
+    Subclasses storing array columns which can read part of a cell without
+    reading all of it can define `get_section(column, object_id, section)`
+    (see :meth:`DataAccessLayerHost.search_for_section`).
+
+    Subclasses storing array columns which record the shape, type and size
+    of each cell can define `get_cell_metadata(column, object_ids)`, which
+    should return a `pandas.DataFrame` (see
+    :meth:`DataAccessLayerHost.search_for_cell_metadata`) or raise
+    :class:`DALCantRespond`.
+
+    Subclasses which record summary statistics of the columns they store can
+    define `get_statistics(column)`, which should return a
+    :class:`fidia.column.column_statistics.ColumnStatistics` or raise
+    :class:`DALCantRespond`. This is used by
+    :meth:`DataAccessLayerHost.search_for_statistics`.
+
 
     See Also
     --------
@@ -113,16 +172,38 @@ class DataAccessLayer(object):
         """
         raise NotImplementedError()
 
-    def ingest_column(self, column):
+    def has_data(self, column, object_id):
+        # type: (fidia.FIDIAColumn, str) -> Union[bool, None]
+        """Report whether this layer knows if data exists for the specified column and object_id.
+
+        Returns True or False if the layer has recorded whether the original
+        data for this cell exists (e.g. at ingestion), and None if it does not
+        know. This base implementation always returns None.
+
+        """
+        return None
+
+    def _data_changed(self):
+        """Note that data has been added to this layer.
+
+        Subclasses which ingest data must call this, as it invalidates the
+        routing decisions cached by columns (see :attr:`DataAccessLayerHost.generation`).
+
+        """
+        DataAccessLayerHost.generation += 1
+
+    def ingest_column(self, column, contents=None):
         """(Abstract) Add the data available from the specified column to this layer.
 
-        Layers implementing this method will be able to ingest data.
+        Layers implementing this method will be able to ingest data. If
+        `contents` is provided, only data for those objects should be ingested
+        (otherwise, all of `column.contents` is ingested).
 
         """
         raise NotImplementedError()
 
-    def ingest_archive(self, archive):
-        # type: (fidia.Archive) -> None
+    def ingest_archive(self, archive, contents=None):
+        # type: (fidia.Archive, List[str]) -> None
         """Ingest all columns found in archive into this data access layer.
 
         This implementation of full archive ingestion is "dumb": it just loops
@@ -130,6 +211,14 @@ class DataAccessLayer(object):
         `OptimizedIngestionMixin` which provides a smarter ingestion that takes
         advantage of column grouping.
 
+        Parameters
+        ----------
+        archive: Archive
+            The archive to be ingested.
+        contents: list (optional)
+            Restrict ingestion to just these objects of the archive, e.g. one
+            shard as returned by :func:`shard_contents`.
+
         """
 
         if isinstance(self, OptimizedIngestionMixin):
@@ -141,7 +230,7 @@ class DataAccessLayer(object):
             if hasattr(self, 'simple_pre_ingestion_callback'):
                 self.simple_pre_ingestion_callback(column)
 
-            self.ingest_column(column)
+            self.ingest_column(column, contents=contents)
 
             if hasattr(self, 'simple_post_ingestion_callback'):
                 self.simple_post_ingestion_callback(column)
@@ -166,16 +255,19 @@ class OptimizedIngestionMixin:
         """
         raise NotImplementedError()
 
-    def ingest_column_with_data(self, column, data):
-        # type: (fidia.FIDIAColumn, Any) -> None
+    def ingest_column_with_data(self, column, data, update=False):
+        # type: (fidia.FIDIAColumn, Any, bool) -> None
         """(Abstract) Optimised ingestion of a the given data for a whole column.
 
+        If `update` is True, `data` may cover only some objects of the column,
+        and replaces the stored values of only those objects.
+
         Implementation of this method in subclasses is not required.
 
         """
         raise NotImplementedError()
 
-    def ingest_column(self, column):
+    def ingest_column(self, column, contents=None):
         """(Abstract) Add the data available from the specified column to this layer.
 
         Layers implementing this method will be able to ingest data.
@@ -183,10 +275,13 @@ class OptimizedIngestionMixin:
         """
         raise NotImplementedError()
 
-    def ingest_archive(self, archive):
-        # type: (fidia.Archive) -> None
+    def ingest_archive(self, archive, contents=None):
+        # type: (fidia.Archive, List[str]) -> None
         """Ingest all columns found in archive into this data access layer with column grouping optimization.
 
+        If `contents` is provided, only those objects are ingested (see
+        :func:`shard_contents`).
+
         Subclasses can implement the following callback functions to be notified of particular stages of ingestion:
 
         - `simple_pre_ingestion_callback(column)`
@@ -195,9 +290,17 @@ class OptimizedIngestionMixin:
         - `by_object_group_post_ingestion_callback(object_id, grouping_context)`
         - `by_column_group_pre_ingestion_callback(grouping_context)`
         - `by_column_group_post_ingestion_callback(grouping_context)`
+        - `column_ingestion_complete_callback(column, contents)`
+
+        The last is called once all objects of a grouped column have been
+        ingested. (Columns ingested by `.ingest_column` are not grouped, so
+        `.ingest_column` must handle their completion itself.)
 
         """
 
+        if contents is None:
+            contents = archive.contents
+
         # Create a local list of columns, from which we can remove columns that
         # have a smarter way of being ingested.
         unsorted_columns = list(archive.columns.values())
@@ -265,7 +368,7 @@ class OptimizedIngestionMixin:
 
                 non_array_column_data = dict()
 
-                for object_id in archive.contents:
+                for object_id in contents:
 
                     if hasattr(self, 'by_object_group_pre_ingestion_callback'):
                         self.by_object_group_pre_ingestion_callback(object_id, grouping_context)
@@ -288,7 +391,7 @@ class OptimizedIngestionMixin:
                                         self.ingest_object_with_data(column, object_id, data)
                                     else:
                                         if column not in non_array_column_data:
-                                            non_array_column_data[column] = pd.Series(index=archive.contents,
+                                            non_array_column_data[column] = pd.Series(index=contents,
                                                                                       dtype=type(data))
                                         non_array_column_data[column][object_id] = data
                     except DataNotAvailable:
@@ -300,6 +403,10 @@ class OptimizedIngestionMixin:
                 for column, data in non_array_column_data.items():
                     self.ingest_column_with_data(column, data)
 
+                if hasattr(self, 'column_ingestion_complete_callback'):
+                    for column in column_group:
+                        self.column_ingestion_complete_callback(column, contents)
+
 
             elif hasattr(a_column_definition, 'array_getter_from_context'):
 
@@ -323,8 +430,15 @@ class OptimizedIngestionMixin:
                     for column in column_group:
                         coldef = column.column_definition_class.from_id(column.id.column_name)
                         data = coldef.array_getter_from_context(context, **arguments)
+                        if isinstance(data, pd.Series):
+                            # Restrict to the objects being ingested (which
+                            # may be only a shard of the archive).
+                            data = data[data.index.isin(contents)]
                         self.ingest_column_with_data(column, data)
 
+                        if hasattr(self, 'column_ingestion_complete_callback'):
+                            self.column_ingestion_complete_callback(column, contents)
+
                     if hasattr(self, 'by_column_group_post_ingestion_callback'):
                         self.by_column_group_post_ingestion_callback(grouping_context)
 
@@ -339,13 +453,31 @@ class OptimizedIngestionMixin:
             if hasattr(self, 'simple_pre_ingestion_callback'):
                 self.simple_pre_ingestion_callback(column)
 
-            self.ingest_column(column)
+            self.ingest_column(column, contents=contents)
 
             if hasattr(self, 'simple_post_ingestion_callback'):
                 self.simple_post_ingestion_callback(column)
 
 
 
+class _LayerList(list):
+    """A list of DAL layers which notes any change to itself (see :attr:`DataAccessLayerHost.generation`)."""
+
+def _notifying_list_method(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        DataAccessLayerHost.generation += 1
+        return result
+    wrapper.__name__ = name
+    return wrapper
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse',
+              '__setitem__', '__delitem__', '__iadd__', '__imul__'):
+    setattr(_LayerList, _name, _notifying_list_method(_name))
+
+
 class DataAccessLayerHost(object):
     """Hosts a set of data access layers.
 
@@ -355,8 +487,60 @@ class DataAccessLayerHost(object):
     Layers of an existing host can be changed by modifying :attr:`.layers`
     directly.
 
+    Write-Back
+    ----------
+
+    One writable layer can be designated for write-back, either with
+    :meth:`enable_write_back` or by adding `write_back = True` to its section
+    of the configuration, e.g.::
+
+        [DAL-NumpyFileStore]
+        base_path = /path/to/store
+        write_back = True
+
+    Data which is not found in the DAL, and so is retrieved from the original
+    `ColumnDefinition`, is then written into that layer in a background thread,
+    so that the layer is populated by actual usage rather than requiring a full
+    ingestion up front. Writes are serialised through a single worker thread.
+    Individual values of (non-array) columns are collected, and written
+    together once :attr:`write_back_batch_size` values of a column have been
+    collected. Use :meth:`flush_write_back` to write any values collected and
+    wait for pending writes to complete.
+
+    Access Log and Warm-Up
+    ----------------------
+
+    The host can record every request for data in an access log (see
+    :class:`fidia.dal.access_log.AccessLog`), and use that log to preload the
+    most frequently requested data into cache layers (such as
+    :class:`MemoryCache`) with :meth:`warm_up`. Both can be set up in an
+    optional `DALHost` section of the configuration::
+
+        [DALHost]
+        access_log = /path/to/access.log
+        warm_up_bytes = 500000000
+
+    If `warm_up_bytes` is given, warm-up runs in a background thread at
+    startup. The log can also be replayed as a benchmark with
+    :func:`fidia.dal.access_log.replay_access_log`.
+
+    Routing Cache
+    -------------
+
+    If every layer raises :class:`DALCantRespond` for a column,
+    :meth:`search_for_cell` raises :class:`DALCantRespond` too, and
+    :meth:`FIDIAColumn.get_value` then skips the DAL for that column until
+    :attr:`generation` changes. The generation is shared by all hosts, and is
+    incremented whenever the layers of a host are changed, or data is added to
+    any layer.
+
     """
 
+    generation = 0
+
+    # Number of values of a (non-array) column collected before they are written back.
+    write_back_batch_size = 1000
+
     def __init__(self, config):
         """Create a DAL host with all DAL layers described in fidia.ini file as provided by `config`."""
 
@@ -366,6 +550,20 @@ class DataAccessLayerHost(object):
 
         self.layers = []  # type: List[fidia.dal.NumpyFileStore]
 
+        self.write_back_layer = None  # type: OptimizedIngestionMixin
+        self._write_back_executor = None  # type: ThreadPoolExecutor
+        self._write_back_pending = set()
+        self._write_back_lock = threading.Lock()
+        # Scalar columns already written back as a whole.
+        self._written_back_columns = set()
+        # Values of scalar columns collected for write-back, by column.
+        self._write_back_buffer = dict()  # type: Dict[str, Tuple[fidia.FIDIAColumn, Dict[str, Any]]]
+
+        self.access_log = None  # type: fidia.dal.AccessLog
+        self.warm_up_thread = None  # type: threading.Thread
+        # Per-thread state, used to avoid logging requests made by warm-up.
+        self._local = threading.local()
+
         for section in config:
 
             # Skip sections of the config file not related to the Data Access Layer
@@ -385,10 +583,33 @@ class DataAccessLayerHost(object):
             except:
                 log.error("FIDIA Configuration Error: DAL Layer type %s is unknown", new_layer_class_name)
                 raise
-            new_layer = new_layer_class(**config[section])
+            layer_config = dict(config[section])
+            write_back = layer_config.pop('write_back', 'false')
+
+            new_layer = new_layer_class(**layer_config)
 
             self.layers.append(new_layer)
 
+            if configparser.ConfigParser.BOOLEAN_STATES[write_back.lower()]:
+                self.enable_write_back(new_layer)
+
+        if 'DALHost' in config:
+            host_config = config['DALHost']
+            if 'access_log' in host_config:
+                self.enable_access_log(host_config['access_log'])
+            if 'warm_up_bytes' in host_config:
+                self.warm_up(max_bytes=int(host_config['warm_up_bytes']), background=True)
+
+    @property
+    def layers(self):
+        # type: () -> List[DataAccessLayer]
+        return self._layers
+
+    @layers.setter
+    def layers(self, value):
+        self._layers = _LayerList(value)
+        DataAccessLayerHost.generation += 1
+
     def __repr__(self):
         result = "Data Access Layer Host with layers:\n"
 
@@ -397,24 +618,480 @@ class DataAccessLayerHost(object):
 
         return result
 
+    def enable_write_back(self, layer):
+        # type: (OptimizedIngestionMixin) -> None
+        """Write data retrieved from original definitions into `layer` (see class documentation).
+
+        The layer must support optimized ingestion, i.e. `ingest_object_with_data`
+        and `ingest_column_with_data`. It need not be one of :attr:`.layers`.
+
+        """
+        if not isinstance(layer, OptimizedIngestionMixin):
+            raise DALException("DAL layer %s cannot be used for write-back" % layer)
+        self.flush_write_back()
+        self.write_back_layer = layer
+        self._written_back_columns = set()
+        if self._write_back_executor is None:
+            self._write_back_executor = ThreadPoolExecutor(max_workers=1)
+            atexit.register(self.flush_write_back)
+
+    def disable_write_back(self):
+        """Stop writing data back into the DAL, once pending writes are complete."""
+        self.flush_write_back()
+        self.write_back_layer = None
+        if self._write_back_executor is not None:
+            atexit.unregister(self.flush_write_back)
+            self._write_back_executor.shutdown(wait=True)
+            self._write_back_executor = None
+
+    def flush_write_back(self, timeout=None):
+        # type: (float) -> None
+        """Write any values collected, and block until all pending write-back has completed.
+
+        Waits at most `timeout` seconds (if given).
+
+        """
+        with self._write_back_lock:
+            buffered = list(self._write_back_buffer.values())
+            self._write_back_buffer = dict()
+        layer = self.write_back_layer
+        if layer is not None:
+            for column, values in buffered:
+                self._submit_write_back(self._write_back_values, layer, column, values)
+        with self._write_back_lock:
+            pending = list(self._write_back_pending)
+        wait(pending, timeout=timeout)
+
+    def write_back(self, column, object_id, data):
+        # type: (fidia.FIDIAColumn, str, Any) -> None
+        """Queue data retrieved from the original definition of `column` to be written into the DAL.
+
+        Does nothing unless write-back has been enabled.
+
+        """
+
+        layer = self.write_back_layer
+        if layer is None:
+            return
+
+        # Whole-column data is held in the column cache, and may be discarded at any time.
+        column_data = getattr(column, '_data', None)
+
+        if isinstance(column, FIDIAArrayColumn):
+            # Copy, as the caller may modify the array before it is written.
+            task = (layer.ingest_object_with_data, column, object_id, np.array(data, copy=True))
+        elif isinstance(column_data, pd.Series):
+            # The whole column has already been read from the original data,
+            # so write it all at once.
+            if column.id in self._written_back_columns:
+                return
+            self._written_back_columns.add(column.id)
+            task = (layer.ingest_column_with_data, column, column_data)
+        else:
+            # Writing values one at a time would rewrite the whole stored
+            # column for each, so collect them until there are enough to
+            # be worth writing.
+            with self._write_back_lock:
+                values = self._write_back_buffer.setdefault(column.id, (column, OrderedDict()))[1]
+                values[object_id] = data
+                if len(values) < self.write_back_batch_size:
+                    return
+                del self._write_back_buffer[column.id]
+            task = (self._write_back_values, layer, column, values)
+
+        log.debug("Queuing write-back of col: %s, obj: %s to %s", column.id, object_id, layer)
+        self._submit_write_back(*task)
+
+    def _submit_write_back(self, function, *args):
+        future = self._write_back_executor.submit(function, *args)
+        with self._write_back_lock:
+            self._write_back_pending.add(future)
+        future.add_done_callback(self._write_back_done)
+
+    @staticmethod
+    def _write_back_values(layer, column, values):
+        # type: (OptimizedIngestionMixin, fidia.FIDIAColumn, Dict[str, Any]) -> None
+        """Write the values collected for some objects of a (non-array) column into `layer`."""
+        log.debug("Writing back %d values of col: %s to %s", len(values), column.id, layer)
+        layer.ingest_column_with_data(column, pd.Series(values), update=True)
+
+    def _write_back_done(self, future):
+        with self._write_back_lock:
+            self._write_back_pending.discard(future)
+        exception = future.exception()
+        if exception is not None:
+            log.warning("Write-back to DAL failed: %s: %s", exception.__class__.__name__, exception)
+
+    def enable_access_log(self, path):
+        # type: (str) -> None
+        """Record all requests for data in the access log at `path` (appending if it exists)."""
+        from .access_log import AccessLog
+        self.disable_access_log()
+        self.access_log = AccessLog(path)
+        atexit.register(self.access_log.close)
+
+    def disable_access_log(self):
+        if self.access_log is not None:
+            self.access_log.close()
+            atexit.unregister(self.access_log.close)
+            self.access_log = None
+
+    def warm_up(self, access_log_path=None, max_bytes=None, columns=None, background=True):
+        # type: (str, int, Mapping[str, fidia.FIDIAColumn], bool) -> Union[threading.Thread, None]
+        """Preload the most frequently requested data from an access log into the cache layers.
+
+        Cache layers are those defining a `cache_value(column, object_id, data)`
+        method, e.g. :class:`MemoryCache`. Data is loaded in order of the
+        number of requests in the log, until `max_bytes` have been loaded.
+
+        Parameters
+        ----------
+        access_log_path: str (optional)
+            The log to use. Defaults to the host's current access log.
+        max_bytes: int (optional)
+            Stop once this much data has been loaded. By default, loading
+            continues until all logged data has been loaded (the cache layers
+            will discard the least used data as necessary).
+        columns: mapping (optional)
+            Where to find the columns named in the log. By default, they are
+            found from FIDIA's known archives.
+        background: bool
+            If True (the default), data is loaded in a separate thread, which
+            is returned (and stored in :attr:`warm_up_thread`).
+
+        """
+        from .access_log import access_counts, resolve_columns
+
+        if access_log_path is None:
+            if self.access_log is None:
+                raise DALException("No access log available for warm-up")
+            self.access_log.flush()
+            access_log_path = self.access_log.path
+
+        cache_layers = [layer for layer in self.layers if hasattr(layer, 'cache_value')]
+        if not cache_layers:
+            log.warning("DAL has no cache layers to warm up")
+            return None
+
+        requests = [request for request, _ in access_counts(access_log_path).most_common()]
+        # Columns are resolved here, as the persistence database must not be
+        # used from the background thread.
+        resolved = resolve_columns([column_id for column_id, _ in requests], columns)
+
+        def load():
+            self._local.suppress_access_log = True
+            loaded_bytes = 0
+            for column_id, object_id in requests:
+                column = resolved.get(column_id)
+                if column is None:
+                    continue
+                try:
+                    try:
+                        data = self.search_for_cell(column, object_id)
+                    except DALDataMissing:
+                        continue
+                    except (DALCantRespond, DALDataNotAvailable):
+                        data = column.get_value(object_id, provenance='definition')
+                except Exception as e:
+                    log.debug("Warm-up skipped col: %s, obj: %s: %s", column_id, object_id, e)
+                    continue
+                for layer in cache_layers:
+                    layer.cache_value(column, object_id, data)
+                loaded_bytes += getattr(data, 'nbytes', sys.getsizeof(data))
+                if max_bytes is not None and loaded_bytes >= max_bytes:
+                    break
+            log.info("Warm-up loaded %s bytes into %s", loaded_bytes, cache_layers)
+
+        if background:
+            self.warm_up_thread = threading.Thread(target=load, name="FIDIA DAL warm-up", daemon=True)
+            self.warm_up_thread.start()
+            return self.warm_up_thread
+        else:
+            load()
+            return None
+
+    def record_access(self, column, *object_ids):
+        # type: (fidia.FIDIAColumn, *str) -> None
+        """Record requests for the data of `column` for `object_ids` in the access log (if enabled)."""
+        if self.access_log is not None and not getattr(self._local, 'suppress_access_log', False):
+            for object_id in object_ids:
+                self.access_log.record(column.id, object_id)
+
     def search_for_cell(self, column, object_id):
         # type: (fidia.FIDIAColumn, str) -> Any
-        """Iterate through the DAL looking for a layer that provides the requested data."""
+        """Iterate through the DAL looking for a layer that provides the requested data.
+
+        Layers reporting (through `.has_data`) that the data does not exist
+        are skipped. If no layer provides the data, and at least one layer
+        reported it does not exist, :class:`DALDataMissing` is raised. If
+        every layer raised :class:`DALCantRespond` (or there are no layers),
+        :class:`DALCantRespond` is raised. Otherwise, :class:`DALDataNotAvailable`
+        is raised.
+
+        """
 
         log.debug("Searching DAL for data for col: %s, obj: %s", column, object_id)
 
+        self.record_access(column, object_id)
+
+        known_missing = False
+        all_cant_respond = True
+
         for dal_layer in self.layers:
             log.debug("Trying layer %s", dal_layer)
+            if dal_layer.has_data(column, object_id) is False:
+                log.debug("Layer %s reports no data exists", dal_layer)
+                known_missing = True
+                all_cant_respond = False
+                continue
             try:
                 data = dal_layer.get_value(column, object_id)
             except DALCantRespond as e:
-                log.info(e, exc_info=True)
+                log.debug(e)
             except DALDataNotAvailable as e:
-                log.info(e, exc_info=True)
+                log.debug(e)
+                all_cant_respond = False
             except:
                 raise DALException("Unexpected error in data retrieval")
             else:
                 return data
 
         # All layers have been exhausted. The DAL has no data for the request.
+        if known_missing:
+            raise DALDataMissing("No data exists for column %s, object %s" % (column.id, object_id))
+        if all_cant_respond:
+            raise DALCantRespond("No DAL layer has data for column %s" % column.id)
         raise DALDataNotAvailable()
+
+    def search_for_column(self, column, object_ids):
+        # type: (fidia.FIDIAColumn, List[str]) -> Tuple[pd.Series, Set[str]]
+        """Search the DAL for data for many objects of a single column.
+
+        Only layers defining a `get_array(column, object_ids)` method (e.g.
+        :class:`NumpyFileStore`) are searched. Each is asked in a single
+        request for all objects not found in previous layers.
+
+        Returns
+        -------
+        (pandas.Series, set)
+            The data found, indexed by object ID (not in any particular
+            order), and the object IDs for which a layer has recorded that no
+            data exists (see :meth:`DataAccessLayer.has_data`).
+
+        Raises
+        ------
+        DALCantRespond
+            If no layer can respond for this column.
+
+        """
+
+        log.debug("Searching DAL for data for col: %s, %d objects", column, len(object_ids))
+
+        self.record_access(column, *object_ids)
+
+        found = []  # type: List[pd.Series]
+        known_missing = set()  # type: Set[str]
+        remaining = list(object_ids)
+        responded = False
+
+        for dal_layer in self.layers:
+            if not remaining:
+                break
+            if not hasattr(dal_layer, 'get_array'):
+                continue
+            try:
+                data = dal_layer.get_array(column, remaining)
+            except DALCantRespond as e:
+                log.debug(e)
+                continue
+            responded = True
+            found.append(data)
+            found_ids = set(data.index)
+            for object_id in remaining:
+                if object_id not in found_ids and dal_layer.has_data(column, object_id) is False:
+                    known_missing.add(object_id)
+            remaining = [object_id for object_id in remaining
+                         if object_id not in found_ids and object_id not in known_missing]
+
+        if not responded:
+            raise DALCantRespond("No DAL layer has data for column %s" % column.id)
+
+        if len(found) == 1:
+            return found[0], known_missing
+        return pd.concat(found), known_missing
+
+    def search_for_cell_metadata(self, column, object_ids):
+        # type: (fidia.FIDIAArrayColumn, List[str]) -> pd.DataFrame
+        """Search the DAL for the shape, type and size of the cells of an array column.
+
+        Only layers defining a `get_cell_metadata(column, object_ids)` method
+        (e.g. :class:`NumpyFileStore`) are searched. Each is asked for all
+        objects not found in previous layers.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The `shape`, `dtype` and `nbytes` of each cell found, indexed by
+            object ID (not in any particular order).
+
+        Raises
+        ------
+        DALCantRespond
+            If no layer can respond for this column.
+
+        """
+
+        found = []  # type: List[pd.DataFrame]
+        remaining = list(object_ids)
+        responded = False
+
+        for dal_layer in self.layers:
+            if not remaining:
+                break
+            if not hasattr(dal_layer, 'get_cell_metadata'):
+                continue
+            try:
+                metadata = dal_layer.get_cell_metadata(column, remaining)
+            except DALCantRespond as e:
+                log.debug(e)
+                continue
+            responded = True
+            found.append(metadata)
+            found_ids = set(metadata.index)
+            remaining = [object_id for object_id in remaining if object_id not in found_ids]
+
+        if not responded:
+            raise DALCantRespond("No DAL layer has cell metadata for column %s" % column.id)
+
+        if len(found) == 1:
+            return found[0]
+        return pd.concat(found)
+
+    def search_for_statistics(self, column):
+        # type: (fidia.FIDIAColumn) -> fidia.column.column_statistics.ColumnStatistics
+        """Search the DAL for the summary statistics recorded for a column.
+
+        Only layers defining a `get_statistics(column)` method (e.g.
+        :class:`NumpyFileStore`) are searched. Statistics covering only some
+        of the objects of the column (e.g. those of a write-back layer, see
+        :attr:`ColumnStatistics.complete`) are ignored, as they say nothing
+        about the other objects.
+
+        Raises
+        ------
+        DALCantRespond
+            If no layer has statistics for the whole of this column.
+
+        """
+
+        for dal_layer in self.layers:
+            if not hasattr(dal_layer, 'get_statistics'):
+                continue
+            try:
+                statistics = dal_layer.get_statistics(column)
+            except DALCantRespond as e:
+                log.debug(e)
+                continue
+            if not statistics.complete:
+                log.debug("Layer %s has statistics for only some objects of column %s", dal_layer, column.id)
+                continue
+            return statistics
+
+        raise DALCantRespond("No DAL layer has statistics for column %s" % column.id)
+
+    def search_for_section(self, column, object_id, section):
+        # type: (fidia.FIDIAArrayColumn, str, Any) -> Any
+        """Search the DAL for part of the data of an array column, reading only that part.
+
+        Only layers defining a `get_section(column, object_id, section)`
+        method (e.g. :class:`NumpyFileStore`) are asked. Otherwise this
+        behaves as :meth:`search_for_cell`, including the exceptions raised.
+
+        """
+
+        log.debug("Searching DAL for section %s of col: %s, obj: %s", section, column, object_id)
+
+        known_missing = False
+        all_cant_respond = True
+
+        for dal_layer in self.layers:
+            if not hasattr(dal_layer, 'get_section'):
+                continue
+            if dal_layer.has_data(column, object_id) is False:
+                known_missing = True
+                all_cant_respond = False
+                continue
+            try:
+                return dal_layer.get_section(column, object_id, section)
+            except DALCantRespond as e:
+                log.debug(e)
+            except DALDataNotAvailable as e:
+                log.debug(e)
+                all_cant_respond = False
+
+        if known_missing:
+            raise DALDataMissing("No data exists for column %s, object %s" % (column.id, object_id))
+        if all_cant_respond:
+            raise DALCantRespond("No DAL layer can provide sections of column %s" % column.id)
+        raise DALDataNotAvailable()
+
+    def search_for_preview(self, column, object_id, max_size):
+        # type: (fidia.FIDIAArrayColumn, str, int) -> Any
+        """Search the DAL for a reduced resolution version of the requested data.
+
+        Only layers defining a `get_preview(column, object_id, max_size)`
+        method (e.g. :class:`NumpyFileStore`) are searched.
+
+        """
+
+        for dal_layer in self.layers:
+            if not hasattr(dal_layer, 'get_preview'):
+                continue
+            try:
+                return dal_layer.get_preview(column, object_id, max_size)
+            except (DALCantRespond, DALDataNotAvailable) as e:
+                log.info(e)
+
+        raise DALDataNotAvailable("No preview available for column %s, object %s" % (column.id, object_id))
+
+    def search_for_cells(self, columns, object_id):
+        # type: (List[fidia.FIDIAColumn], str) -> Dict[str, Any]
+        """Search the DAL for data for several columns of the same object.
+
+        Layers which can serve several columns at once (by defining a
+        `get_values(columns, object_id)` method, e.g. :class:`RowBundleStore`)
+        are asked for all of the remaining columns in one request. Other layers
+        are asked for each column in turn.
+
+        Returns
+        -------
+        dict
+            The data found, keyed by ColumnID. Columns for which no layer
+            had data are omitted.
+
+        """
+
+        result = dict()  # type: Dict[str, Any]
+        remaining = list(columns)
+
+        for dal_layer in self.layers:
+            if not remaining:
+                break
+            if hasattr(dal_layer, 'get_values'):
+                try:
+                    result.update(dal_layer.get_values(remaining, object_id))
+                except (DALCantRespond, DALDataNotAvailable) as e:
+                    log.debug(e)
+            else:
+                for column in remaining:
+                    if dal_layer.has_data(column, object_id) is False:
+                        continue
+                    try:
+                        result[column.id] = dal_layer.get_value(column, object_id)
+                    except (DALCantRespond, DALDataNotAvailable) as e:
+                        log.debug(e)
+                    except:
+                        raise DALException("Unexpected error in data retrieval")
+            remaining = [column for column in remaining if column.id not in result]
+
+        return result
@@ -0,0 +1,183 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Dict, Generator, Tuple, List, Mapping
+import fidia
+
+# Python Standard Library Imports
+import time
+import threading
+from collections import Counter
+
+# Other Library Imports
+
+# FIDIA Imports
+from fidia.column import ColumnID
+from fidia.exceptions import DataNotAvailable
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['AccessLog', 'read_access_log', 'access_counts', 'resolve_columns', 'replay_access_log']
+
+
+class AccessLog(object):
+    """An append-only record of requests for data from the DAL.
+
+    The log is a text file. To keep it compact, each ColumnID is written once
+    per session with a short number, and each request then records only the
+    number and the object ID::
+
+        !
+        @0 ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1
+        0 Gal1
+        0 Gal2
+
+    A line containing only `!` starts a new session (and so a new set of
+    column numbers), so the log can be appended to across restarts without
+    first reading it. Writes are buffered; call :meth:`flush` or :meth:`close`
+    to ensure they reach the file.
+
+    """
+
+    # Number of records between automatic flushes.
+    flush_interval = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._file.write("!\n")
+        self._column_numbers = dict()  # type: Dict[str, int]
+        self._unflushed = 0
+        self._lock = threading.Lock()
+
+    def record(self, column_id, object_id):
+        # type: (str, str) -> None
+        with self._lock:
+            number = self._column_numbers.get(column_id)
+            if number is None:
+                number = len(self._column_numbers)
+                self._column_numbers[column_id] = number
+                self._file.write("@%d %s\n" % (number, column_id))
+            self._file.write("%d %s\n" % (number, object_id))
+            self._unflushed += 1
+            if self._unflushed >= self.flush_interval:
+                self._file.flush()
+                self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self._unflushed = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_access_log(path):
+    # type: (str) -> Generator[Tuple[ColumnID, str], None, None]
+    """Iterate over the requests recorded in an access log, yielding (ColumnID, object_id)."""
+    columns = dict()  # type: Dict[str, ColumnID]
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line == "!":
+                columns = dict()
+            elif line.startswith("@"):
+                number, column_id = line[1:].split(" ", 1)
+                columns[number] = ColumnID.as_column_id(column_id)
+            elif line:
+                number, object_id = line.split(" ", 1)
+                try:
+                    yield columns[number], object_id
+                except KeyError:
+                    log.warning("Access log %s is corrupt: unknown column number %s", path, number)
+
+
+def access_counts(path):
+    # type: (str) -> Counter
+    """Count the requests for each (ColumnID, object_id) in an access log."""
+    return Counter(read_access_log(path))
+
+
+def resolve_columns(column_ids, columns=None):
+    # type: (List[str], Mapping[str, fidia.FIDIAColumn]) -> Dict[str, fidia.FIDIAColumn]
+    """Find the column objects for a set of ColumnIDs.
+
+    Columns are looked up in the mapping `columns` (e.g. `archive.columns`) if
+    given, otherwise in the archives known to FIDIA. ColumnIDs which can't be
+    found are omitted from the result.
+
+    """
+    result = dict()
+    for column_id in set(column_ids):
+        try:
+            if columns is not None:
+                result[column_id] = columns[column_id]
+            else:
+                archive = fidia.known_archives.by_id[column_id.archive_id]
+                result[column_id] = archive.columns[column_id]
+        except KeyError:
+            log.warning("Column %s from access log is not known", column_id)
+    return result
+
+
+def replay_access_log(path, columns=None, limit=None):
+    # type: (str, Mapping[str, fidia.FIDIAColumn], int) -> Dict[str, float]
+    """Repeat the requests recorded in an access log, e.g. as a realistic benchmark.
+
+    Parameters
+    ----------
+    path: str
+        The access log.
+    columns: mapping (optional)
+        Where to find the columns named in the log (see :func:`resolve_columns`).
+    limit: int (optional)
+        Replay at most this many requests.
+
+    Returns
+    -------
+    dict
+        The number of `requests` made, the number which found no data
+        (`not_available`), and the total time taken in `seconds`.
+
+    """
+
+    requests = list(read_access_log(path))
+    if limit is not None:
+        requests = requests[:limit]
+    resolved = resolve_columns([column_id for column_id, _ in requests], columns)
+
+    n_requests = 0
+    n_not_available = 0
+    start = time.perf_counter()
+    for column_id, object_id in requests:
+        column = resolved.get(column_id)
+        if column is None:
+            continue
+        n_requests += 1
+        try:
+            column.get_value(object_id)
+        except DataNotAvailable:
+            n_not_available += 1
+    elapsed = time.perf_counter() - start
+
+    return {'requests': n_requests, 'not_available': n_not_available, 'seconds': elapsed}
@@ -0,0 +1,136 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Iterable, Union, Dict
+import fidia
+
+# Python Standard Library Imports
+import os
+import hashlib
+
+# Other Library Imports
+import numpy as np
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['AvailabilityIndex']
+
+
+class AvailabilityIndex(object):
+    """Records which objects of an archive have data in a column.
+
+    The index consists of the sorted list of object IDs that were considered
+    when the column was ingested (the "object index"), and a bitmap with one
+    bit per object marking whether data was found for that object.
+
+    When stored, the bitmap is kept with the column, while the object index is
+    stored once per archive and shared by all columns ingested over the same
+    objects (it is identified by a digest of its contents).
+
+    """
+
+    def __init__(self, object_ids, available):
+        # type: (np.ndarray, np.ndarray) -> None
+        """Create an index from a sorted array of object IDs and a matching boolean array."""
+        assert len(object_ids) == len(available)
+        self.object_ids = object_ids
+        self.available = available
+
+    @classmethod
+    def from_object_ids(cls, contents, available_ids):
+        # type: (Iterable[str], Iterable[str]) -> AvailabilityIndex
+        """Create an index over `contents` in which only `available_ids` have data."""
+        object_ids = np.array(sorted(set(str(i) for i in contents)), dtype=str)
+        available = np.isin(object_ids, np.array([str(i) for i in available_ids], dtype=str))
+        return cls(object_ids, available)
+
+    def has_data(self, object_id):
+        # type: (str) -> Union[bool, None]
+        """True or False if the object is in the index, otherwise None (unknown)."""
+        position = np.searchsorted(self.object_ids, object_id)
+        if position < len(self.object_ids) and self.object_ids[position] == object_id:
+            return bool(self.available[position])
+        return None
+
+    @property
+    def available_object_ids(self):
+        return self.object_ids[self.available]
+
+    def merge(self, other):
+        # type: (AvailabilityIndex) -> AvailabilityIndex
+        """Combine two indexes. Where both cover an object, `other` takes precedence."""
+        keep = ~np.isin(self.object_ids, other.object_ids)
+        object_ids = np.concatenate((self.object_ids[keep], other.object_ids))
+        available = np.concatenate((self.available[keep], other.available))
+        order = np.argsort(object_ids)
+        return AvailabilityIndex(object_ids[order], available[order])
+
+    @property
+    def digest(self):
+        # type: () -> str
+        """A digest identifying the object index."""
+        return hashlib.sha1("\n".join(self.object_ids).encode('utf-8')).hexdigest()
+
+    def save(self, bitmap_path, object_index_dir):
+        # type: (str, str) -> None
+        """Write the bitmap to `bitmap_path`, and the object index into `object_index_dir` if not already there."""
+        from .numpy_file_store import write_atomically
+
+        digest = self.digest
+        object_index_path = os.path.join(object_index_dir, digest + ".objects")
+        if not os.path.exists(object_index_path):
+            if not os.path.exists(object_index_dir):
+                os.makedirs(object_index_dir, exist_ok=True)
+
+            def write_object_index(path):
+                with open(path, 'wb') as f:
+                    np.save(f, self.object_ids, allow_pickle=False)
+            write_atomically(write_object_index, object_index_path)
+
+        def write_bitmap(path):
+            with open(path, 'wb') as f:
+                np.savez(f, bits=np.packbits(self.available), digest=np.array(digest))
+        write_atomically(write_bitmap, bitmap_path)
+
+    @classmethod
+    def load(cls, bitmap_path, object_index_dir, object_index_cache=None):
+        # type: (str, str, Dict[str, np.ndarray]) -> AvailabilityIndex
+        """Read an index written by :meth:`save`.
+
+        Object indexes are shared between columns, so they can be cached in
+        the dictionary `object_index_cache` (keyed by digest).
+
+        """
+        with np.load(bitmap_path, allow_pickle=False) as f:
+            bits = f['bits']
+            digest = str(f['digest'])
+
+        if object_index_cache is not None and digest in object_index_cache:
+            object_ids = object_index_cache[digest]
+        else:
+            with open(os.path.join(object_index_dir, digest + ".objects"), 'rb') as f:
+                object_ids = np.load(f, allow_pickle=False)
+            if object_index_cache is not None:
+                object_index_cache[digest] = object_ids
+
+        available = np.unpackbits(bits)[:len(object_ids)].astype(bool)
+        return cls(object_ids, available)
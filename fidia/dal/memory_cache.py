@@ -0,0 +1,157 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, List, Tuple
+import fidia
+
+# Python Standard Library Imports
+import sys
+import threading
+from collections import OrderedDict
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+
+# FIDIA Imports
+
+# Other modules within this package
+from ._dal_internals import *
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['MemoryCache']
+
+
+class MemoryCache(OptimizedIngestionMixin, DataAccessLayer):
+    """A data access layer holding recently used data in memory, up to a fixed number of bytes.
+
+    When full, the least recently used data is discarded. The cache is
+    populated by :meth:`cache_value` (used by
+    :meth:`DataAccessLayerHost.warm_up`), or by designating it for write-back
+    (see :meth:`DataAccessLayerHost.enable_write_back`). It should normally
+    be the first layer of the DAL, e.g.::
+
+        [DAL-MemoryCache]
+        max_bytes = 500000000
+
+    Parameters
+    ----------
+    max_bytes: int
+        The maximum total size of the data held.
+
+    """
+
+    def __init__(self, max_bytes=100 * 1024 ** 2):
+        self.max_bytes = int(max_bytes)
+        self.current_bytes = 0
+        self._data = OrderedDict()  # type: OrderedDict[Tuple[str, str], Tuple[Any, int]]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_value(self, column, object_id):
+        # type: (fidia.FIDIAColumn, str) -> Any
+        """Overrides :meth:`DataAccessLayer.get_value`"""
+        key = (column.id, object_id)
+        with self._lock:
+            try:
+                data, _ = self._data[key]
+            except KeyError:
+                raise DALDataNotAvailable("MemoryCache has no data for object %s in column %s" %
+                                          (object_id, column.id))
+            self._data.move_to_end(key)
+        return data
+
+    def get_array(self, column, object_ids):
+        # type: (fidia.FIDIAColumn, List[str]) -> pd.Series
+        """Return the data held for any of `object_ids`, as a `pandas.Series` indexed by object ID."""
+        index = []
+        values = []
+        with self._lock:
+            for object_id in object_ids:
+                key = (column.id, object_id)
+                try:
+                    data, _ = self._data[key]
+                except KeyError:
+                    continue
+                self._data.move_to_end(key)
+                index.append(object_id)
+                values.append(data)
+        # Filled element by element so that numpy does not try to combine any arrays.
+        array = np.empty(len(values), dtype=object)
+        for i, data in enumerate(values):
+            array[i] = data
+        return pd.Series(array, index=index).infer_objects()
+
+    def cache_value(self, column, object_id, data):
+        # type: (fidia.FIDIAColumn, str, Any) -> bool
+        """Add data to the cache, discarding the least recently used data as required.
+
+        Returns False if the data is larger than the whole cache (and so was not added).
+
+        """
+        size = getattr(data, 'nbytes', None)
+        if size is None:
+            size = sys.getsizeof(data)
+        if size > self.max_bytes:
+            return False
+
+        key = (column.id, object_id)
+        with self._lock:
+            if key in self._data:
+                self.current_bytes -= self._data.pop(key)[1]
+            while self.current_bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.current_bytes -= evicted_size
+            self._data[key] = (data, size)
+            self.current_bytes += size
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._data = OrderedDict()
+            self.current_bytes = 0
+
+    def ingest_object_with_data(self, column, object_id, data):
+        # type: (fidia.FIDIAColumn, str, Any) -> None
+        self.cache_value(column, object_id, data)
+
+    def ingest_column_with_data(self, column, data, update=False):
+        # type: (fidia.FIDIAColumn, pd.Series, bool) -> None
+        # Values are cached individually, so `update` makes no difference.
+        if not isinstance(data, pd.Series):
+            data = pd.Series(data, index=column.contents)
+        for object_id, value in data.dropna().items():
+            self.cache_value(column, object_id, value)
+
+    def ingest_column(self, column, contents=None):
+        # type: (fidia.FIDIAColumn, List[str]) -> None
+        """Overrides :meth:`DataAccessLayer.ingest_column`"""
+        if contents is None:
+            contents = column.contents
+        for object_id in contents:
+            try:
+                data = column.get_value(object_id, provenance='definition')
+            except:
+                log.warning("No data cached for object '%s' in column '%s'", object_id, column.id)
+            else:
+                self.cache_value(column, object_id, data)
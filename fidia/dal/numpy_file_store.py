@@ -14,14 +14,21 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from typing import Any
+from typing import Any, List, Dict, Set, Callable, Generator, Iterable, Tuple, Union
 import fidia
 
 # Python Standard Library Imports
 import os
+import sys
+import json
 import pickle
 import time
+import hashlib
+import argparse
 import inspect
+import shutil
+import threading
+from contextlib import contextmanager
 from itertools import chain
 import gzip
 
@@ -31,11 +38,16 @@ import pandas as pd
 
 # FIDIA Imports
 from fidia.column import ColumnID, FIDIAArrayColumn
+from fidia.column.column_statistics import ColumnStatistics
 from fidia.exceptions import *
 import fidia.column.column_definitions as fidiacoldefs
+from fidia.utilities import exclusive_file_lock, downsample_by_two, downsample_to_size, downsampled_shape, \
+    describe_array
 
 # Other modules within this package
 from ._dal_internals import *
+from .availability import AvailabilityIndex
+from .string_column import StringColumn, write_string_column, is_string_series
 
 # Set up logging
 import fidia.slogging as slogging
@@ -45,6 +57,15 @@ log.enable_console_logging()
 
 # __all__ = ['Archive', 'KnownArchives', 'ArchiveDefinition']
 
+PANDAS_SERIES_FILE = "pandas_series.pkl"
+STRING_SERIES_FILE = "string_series.strcol"
+SCALAR_DATA_FILES = (PANDAS_SERIES_FILE, STRING_SERIES_FILE)
+
+# Suffix of the files created by `exclusive_file_lock`, and marker in the names
+# of the temporary files written by `write_atomically`.
+LOCK_FILE_SUFFIX = ".LOCK"
+TEMPORARY_FILE_MARKER = ".tmp-"
+
 
 
 class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
@@ -73,18 +94,149 @@ class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
 
     Within the directory defined by ColumnID as above, there is either one
     file (for regular FIDIAColumns) or one file per object (for array data
-    in FIDIAArrayColumns).
+    in FIDIAArrayColumns). Regular columns are stored as a pickled
+    `pandas.Series` (`pandas_series.pkl`), except for columns of strings,
+    which are stored in the compact, memory-mappable format of
+    :class:`fidia.dal.string_column.StringColumn` (`string_series.strcol`).
+
+    Directory Fan-Out
+    -----------------
+
+    Very large numbers of files in one directory are slow on many
+    filesystems. If `fan_out` is set, the per-object files of array columns
+    are instead spread over `fan_out` levels of subdirectories named from
+    successive pairs of hex digits of the MD5 hash of the object ID (256
+    subdirectories per level), e.g. `.../{timestamp}/3f/a2/{object_id}.npy`
+    for `fan_out=2`. The path of any cell can be computed directly from the
+    object ID, so no directory listing is required to find it.
+
+    The layout of a store is recorded in `store_layout.json` in `base_path`
+    when the store is created, and later instances use the recorded layout.
+    Existing stores can be converted to a different layout in place with
+    :meth:`migrate_layout` (or the `fidia-migrate-numpy-store` command).
+
+    Preview Pyramids
+    ----------------
+
+    If `preview_levels` is set, images and cubes from `FITSDataColumn`
+    columns are also stored at up to that many reduced resolutions as they
+    are ingested. Each level halves the size of the last two axes of the
+    previous level by averaging 2x2 blocks (see
+    :func:`fidia.utilities.downsample_by_two`), and is stored like a separate
+    array column in `_preview/{level}` below the column's directory. The
+    levels are used by :meth:`get_preview` (and so
+    :meth:`FIDIAArrayColumn.get_preview`) to serve thumbnails and quick-look
+    data without reading the full resolution data. The number of levels
+    stored is recorded in `store_layout.json`, so instances reading the store
+    need not be created with the same `preview_levels`.
+
+    Sharded Ingestion
+    -----------------
+
+    Several processes (possibly on different machines sharing the
+    filesystem) can ingest one archive in parallel. Each process ingests one
+    shard of the archive into its own private staging directory below
+    `base_path` using :meth:`ingest_archive_shard`. Once all shards are
+    complete, a single call to :meth:`merge_staged_shards` combines the staged
+    scalar columns and moves the staged array cells into place. All files are
+    written to a temporary name and then renamed, so readers never see a
+    partially written file.
+
+    Availability Index
+    ------------------
+
+    During ingestion, the store records which of the objects ingested had data
+    in each column. This is stored alongside the column data as a bitmap
+    (`_availability.npz`) over a sorted list of the object IDs, which is
+    shared between columns and stored once per archive (in
+    `_object_index`). The index is used by :meth:`has_data`, so that requests
+    for data that does not exist can be answered without searching for it.
 
+    Column Statistics
+    -----------------
+
+    Whenever a scalar column is written, summary statistics of its values
+    (minimum, maximum, null count, distinct count estimate, histogram, and
+    the same for each chunk of values, see
+    :class:`fidia.column.column_statistics.ColumnStatistics`) are stored
+    alongside it (`_statistics.json`). These are returned by
+    :meth:`get_statistics` without reading the column data.
+
+    Cell Index
+    ----------
+
+    For array columns, the shape, type and size in bytes of each cell
+    ingested are recorded, and stored alongside the cells (`_cell_index.json`)
+    once the column is complete. These are returned by
+    :meth:`get_cell_metadata`, so that e.g. the shapes of all cells of a
+    column can be found without reading any of them.
 
     """
 
-    def __init__(self, base_path, use_compression=False):
+    staging_directory_name = "_staging"
+    layout_file_name = "store_layout.json"
+    preview_directory_name = "_preview"
+    availability_file_name = "_availability.npz"
+    object_index_directory_name = "_object_index"
+    statistics_file_name = "_statistics.json"
+    cell_index_file_name = "_cell_index.json"
+
+    def __init__(self, base_path, use_compression=False, fan_out=None, preview_levels=0):
 
         if not os.path.isdir(base_path):
             raise FileNotFoundError(base_path + " does not exist.")
 
         self.base_path = base_path
         self.use_compression = use_compression
+        self.preview_levels = int(preview_levels)
+
+        layout = self._read_layout()
+        if fan_out is None:
+            fan_out = layout.get('fan_out', 0)
+        else:
+            # (Values from the configuration file are strings.)
+            fan_out = int(fan_out)
+            if layout and layout['fan_out'] != fan_out:
+                raise DALException("NumpyFileStore at %s has fan_out=%s, not %s: use `migrate_layout` to change it" %
+                                   (base_path, layout['fan_out'], fan_out))
+            if not layout and fan_out > 0:
+                if any(entry not in (self.staging_directory_name, self.layout_file_name)
+                       for entry in os.listdir(base_path)):
+                    raise DALException("NumpyFileStore at %s already contains data without fan out: "
+                                       "use `migrate_layout` to change it" % base_path)
+                self._write_layout({'fan_out': fan_out})
+        self.fan_out = fan_out
+
+        # Set only while a change of layout is in progress, when cells may be
+        # in either layout.
+        self.previous_fan_out = layout.get('previous_fan_out')  # type: int
+
+        # Number of preview pyramid levels stored by any instance.
+        self.stored_preview_levels = layout.get('preview_levels', 0)  # type: int
+
+        # Objects ingested so far for each column, recorded in the
+        # availability index once the column is complete. Only objects
+        # ingested by `ingest_column` or `ingest_archive` are tracked here:
+        # data added otherwise (e.g. written back by the DAL host) is recorded
+        # in the availability index as it is written.
+        self._ingested_objects = dict()  # type: Dict[str, Set[str]]
+        self._ingestion_state = threading.local()
+
+        # Availability indexes loaded (or written), keyed by data directory.
+        # Object indexes are shared between columns, and cached separately.
+        self._availability_cache = dict()  # type: Dict[str, Union[AvailabilityIndex, None]]
+        self._object_index_cache = dict()  # type: Dict[str, np.ndarray]
+
+        # Shape, type and size of the cells of array columns ingested so far,
+        # recorded in the cell index once the column is complete (cells
+        # written otherwise are described by their file headers).
+        self._ingested_cells = dict()  # type: Dict[str, Dict[str, Tuple[tuple, str, int]]]
+
+        # Cell indexes loaded (or written), keyed by data directory.
+        self._cell_index_cache = dict()  # type: Dict[str, Dict[str, Tuple[tuple, str, int]]]
+
+        # Open string columns, with the inode and modification time of their file.
+        self._string_columns = dict()  # type: Dict[str, Tuple[Tuple[int, int], StringColumn]]
 
     # def __repr__(self):
     #     return "NumpyFileStore(base_path={})".format(self.base_path)
@@ -96,65 +248,431 @@ class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
         data_dir = self.get_directory_for_column_id(column.id)
 
         if not os.path.exists(data_dir):
-            raise DALDataNotAvailable("NumpyFileStore has no data for ColumnID %s" % column.id)
+            raise DALCantRespond("NumpyFileStore has no data for ColumnID %s" % column.id)
 
         if isinstance(column, FIDIAArrayColumn):
             # Data is in array format, and therefore each cell is stored as a separate file.
-            data_path = os.path.join(data_dir, object_id + ".npy")
-
-            if self.use_compression:
-                local_open = gzip.open
-                data_path += ".gz"
-            else:
-                local_open = open
-            with local_open(data_path, 'rb') as fh:
-                data = np.load(fh)
+            data = self._read_cell(data_dir, object_id, column)
 
         else:
-            # Data is individual values, so is stored in a single pickled pandas series
+            # Data is individual values, so is stored in a single pickled
+            # pandas series, or for strings, a string column.
 
-            # NOTE: This is loading the entire column into memory to return a
-            # single value. This should perhaps instead raise an exception that
-            # instructs the caller to use `get_array` instead.
+            string_path = os.path.join(data_dir, STRING_SERIES_FILE)
+            if os.path.exists(string_path):
+                # Only the requested value is decoded from the string column.
+                series = self._open_string_column(string_path)
+            else:
+                # NOTE: This is loading the entire column into memory to return a
+                # single value. This should perhaps instead raise an exception that
+                # instructs the caller to use `get_array` instead.
 
-            data_path = os.path.join(data_dir, "pandas_series.pkl")
+                data_path = os.path.join(data_dir, PANDAS_SERIES_FILE)
 
-            with open(data_path, "rb") as f:
-                series = pickle.load(f)  # type: pd.Series
+                with open(data_path, "rb") as f:
+                    series = pickle.load(f)  # type: pd.Series
 
-            data = series[object_id]
+            try:
+                data = series[object_id]
+            except KeyError:
+                raise DALDataNotAvailable("NumpyFileStore has no data for object %s in column %s" %
+                                          (object_id, column.id))
 
         # Sanity checks that data loaded matches expectations
         assert data is not None
 
         return data
 
-    def ingest_column(self, column):
-        # type: (fidia.FIDIAColumn) -> None
-        """Overrides :meth:`DataAccessLayer.ingest_column`"""
+    def get_array(self, column, object_ids):
+        # type: (fidia.FIDIAColumn, List[str]) -> pd.Series
+        """Return the data stored for any of `object_ids`, as a `pandas.Series` indexed by object ID.
 
-        data_dir = self.get_directory_for_column_id(column.id, True)
+        Objects with no data stored are omitted. For array columns, each cell
+        is read in turn; other columns are read whole in a single operation.
+
+        """
+
+        data_dir = self.get_directory_for_column_id(column.id)
+
+        if not os.path.exists(data_dir):
+            raise DALCantRespond("NumpyFileStore has no data for ColumnID %s" % column.id)
 
         if isinstance(column, FIDIAArrayColumn):
-            # Data is in array format, and therefore each cell is stored as a separate file.
-            # @TODO: If the column definition defines only get_array, this will be badly inefficient?
-            for object_id in column.contents:
+            index = []
+            cells = []
+            for object_id in object_ids:
                 try:
-                    data = column.get_value(object_id, provenance='definition')
-                except:
-                    log.warning("No data ingested for object '%s' in column '%s'", object_id, column.id)
-                    pass
-                else:
-                    self.ingest_object_with_data(column, object_id, data)
+                    cells.append(self._read_cell(data_dir, object_id, column))
+                except DALDataNotAvailable:
+                    continue
+                index.append(object_id)
+            # Filled element by element so that numpy does not try to combine the arrays.
+            values = np.empty(len(cells), dtype=object)
+            for i, cell in enumerate(cells):
+                values[i] = cell
+            return pd.Series(values, index=index)
+
+        series = self.read_series(data_dir)
+        if series is None:
+            raise DALCantRespond("NumpyFileStore has no data for ColumnID %s" % column.id)
+        series = series[series.index.isin(object_ids)]
+        return series[series.notnull()]
+
+    def _read_cell(self, data_dir, object_id, column, header_only=False):
+        # type: (str, str, fidia.FIDIAColumn, bool) -> Any
+        """Load the array stored for `object_id` in `data_dir` (or just its shape and dtype if `header_only`)."""
+
+        if self.use_compression:
+            local_open = gzip.open
         else:
-            # Data is individual values, so is stored in a single pickled pandas series
+            local_open = open
+
+        data_paths = [self.cell_path(data_dir, object_id)]
+        if self.previous_fan_out is not None:
+            # A change of layout is in progress, so the cell may not have been moved yet.
+            data_paths.append(self.cell_path(data_dir, object_id, self.previous_fan_out))
+
+        for data_path in data_paths:
+            try:
+                with local_open(data_path, 'rb') as fh:
+                    if header_only:
+                        version = np.lib.format.read_magic(fh)
+                        if version == (1, 0):
+                            shape, _, dtype = np.lib.format.read_array_header_1_0(fh)
+                        else:
+                            shape, _, dtype = np.lib.format.read_array_header_2_0(fh)
+                        return shape, dtype
+                    return np.load(fh)
+            except FileNotFoundError:
+                continue
+
+        raise DALDataNotAvailable("NumpyFileStore has no data for object %s in column %s" %
+                                  (object_id, column.id))
+
+    def get_section(self, column, object_id, section):
+        # type: (FIDIAArrayColumn, str, Any) -> np.ndarray
+        """Return part of the data stored for `object_id`, reading only that part of the file.
+
+        The cell is memory mapped, so this is not possible for stores using
+        compression (which raise :class:`DALCantRespond`).
+
+        """
+
+        data_dir = self.get_directory_for_column_id(column.id)
+        if self.use_compression or not isinstance(column, FIDIAArrayColumn) or not os.path.exists(data_dir):
+            raise DALCantRespond("NumpyFileStore can't read sections of ColumnID %s" % column.id)
+
+        data_paths = [self.cell_path(data_dir, object_id)]
+        if self.previous_fan_out is not None:
+            data_paths.append(self.cell_path(data_dir, object_id, self.previous_fan_out))
+        for data_path in data_paths:
+            try:
+                mapped = np.load(data_path, mmap_mode='r')
+            except FileNotFoundError:
+                continue
+            # Copy, so that the file is not held open by the result.
+            return np.array(mapped[section])
+
+        raise DALDataNotAvailable("NumpyFileStore has no data for object %s in column %s" %
+                                  (object_id, column.id))
+
+    def _write_cell(self, data_dir, object_id, data):
+        # type: (str, str, np.ndarray) -> None
+        """Save the array `data` for `object_id` in `data_dir`."""
+
+        data_path = self.cell_path(data_dir, object_id)
+        if not os.path.exists(os.path.dirname(data_path)):
+            os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        if self.use_compression:
+            local_open = gzip.open
+        else:
+            local_open = open
+
+        def save(path):
+            with local_open(path, 'wb') as fh:
+                np.save(fh, data, allow_pickle=False)
+        write_atomically(save, data_path)
+
+    def preview_directory(self, data_dir, level):
+        # type: (str, int) -> str
+        """Directory containing level `level` of the preview pyramid of the column stored in `data_dir`."""
+        return os.path.join(data_dir, self.preview_directory_name, str(level))
+
+    def get_preview(self, column, object_id, max_size):
+        # type: (FIDIAArrayColumn, str, int) -> np.ndarray
+        """Return the data for `object_id` reduced so that its last two axes are no longer than `max_size`.
+
+        The smallest stored pyramid level at least as large as required is
+        read and, if necessary, further downsampled. If no suitable level has
+        been stored, :class:`DALDataNotAvailable` is raised.
+
+        """
+
+        data_dir = self.get_directory_for_column_id(column.id)
+        if not os.path.exists(data_dir):
+            raise DALCantRespond("NumpyFileStore has no data for ColumnID %s" % column.id)
+
+        # Work out the level required from the shape of the full resolution data.
+        shape, _ = self._read_cell(data_dir, object_id, column, header_only=True)
+        level = 0
+        while len(shape) >= 2 and max(shape[-2:]) > max(max_size, 1):
+            shape = downsampled_shape(shape)
+            level += 1
+
+        if level == 0:
+            return self._read_cell(data_dir, object_id, column)
+
+        if level > self.stored_preview_levels:
+            # More levels may have been stored (by another instance) since the layout was read.
+            self.stored_preview_levels = self._read_layout().get('preview_levels', 0)
+
+        for stored_level in range(min(level, max(self.preview_levels, self.stored_preview_levels)), 0, -1):
+            try:
+                data = self._read_cell(self.preview_directory(data_dir, stored_level), object_id, column)
+            except DALDataNotAvailable:
+                continue
+            return downsample_to_size(data, max_size)
+
+        raise DALDataNotAvailable("NumpyFileStore has no preview for object %s in column %s" %
+                                  (object_id, column.id))
+
+    def _open_string_column(self, path):
+        # type: (str) -> StringColumn
+        """Open (or reuse an open) memory mapped string column, reopening it if the file has been replaced."""
+        stat = os.stat(path)
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._string_columns.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, StringColumn.open(path))
+            self._string_columns[path] = cached
+        return cached[1]
+
+    def read_series(self, data_dir):
+        # type: (str) -> Union[pd.Series, None]
+        """Return the whole of the (non-array) column stored in `data_dir`, or None if there is none."""
+        string_path = os.path.join(data_dir, STRING_SERIES_FILE)
+        if os.path.exists(string_path):
+            return StringColumn.open(string_path).to_series()
+        data_path = os.path.join(data_dir, PANDAS_SERIES_FILE)
+        if os.path.exists(data_path):
+            return pd.read_pickle(data_path)
+        return None
+
+    def write_series(self, data_dir, series, complete=True):
+        # type: (str, pd.Series, bool) -> None
+        """Store the whole of a (non-array) column in `data_dir`, choosing the format for its type.
+
+        `complete` is False if `series` may not include every object of the
+        column (see :attr:`ColumnStatistics.complete`).
+
+        """
+        if is_string_series(series):
+            data_path, other_path = (os.path.join(data_dir, STRING_SERIES_FILE),
+                                     os.path.join(data_dir, PANDAS_SERIES_FILE))
+            write_string_column(series, data_path)
+        else:
+            data_path, other_path = (os.path.join(data_dir, PANDAS_SERIES_FILE),
+                                     os.path.join(data_dir, STRING_SERIES_FILE))
+            write_atomically(series.to_pickle, data_path)
+        if os.path.exists(other_path):
+            # The type of the column has changed.
+            os.remove(other_path)
+        ColumnStatistics.from_series(series, complete=complete).save(
+            os.path.join(data_dir, self.statistics_file_name))
+
+    def _is_complete(self, data_dir):
+        # type: (str) -> bool
+        """True if the column stored in `data_dir` was stored whole (so remains so as values are updated)."""
+        try:
+            return ColumnStatistics.load(os.path.join(data_dir, self.statistics_file_name)).complete
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def get_statistics(self, column):
+        # type: (fidia.FIDIAColumn) -> ColumnStatistics
+        """Return the statistics recorded when the (non-array) `column` was stored."""
+        data_dir = self.get_directory_for_column_id(column.id)
+        statistics_path = os.path.join(data_dir, self.statistics_file_name)
+        if not os.path.exists(statistics_path):
+            raise DALCantRespond("NumpyFileStore has no statistics for ColumnID %s" % column.id)
+        try:
+            return ColumnStatistics.load(statistics_path)
+        except (ValueError, KeyError) as e:
+            raise DALCantRespond("Statistics for ColumnID %s could not be read: %s" % (column.id, e))
+
+    def has_data(self, column, object_id):
+        # type: (fidia.FIDIAColumn, str) -> Union[bool, None]
+        """Overrides :meth:`DataAccessLayer.has_data` using the availability index."""
+
+        data_dir = self.get_directory_for_column_id(column.id)
+        try:
+            index = self._availability_cache[data_dir]
+        except KeyError:
+            index = self._load_availability(data_dir)
+            self._availability_cache[data_dir] = index
+        if index is None:
+            return None
+        return index.has_data(object_id)
+
+    def column_ingestion_complete_callback(self, column, contents):
+        # type: (fidia.FIDIAColumn, List[str]) -> None
+        """Record the availability index for a column once all of `contents` have been ingested."""
+
+        data_dir = self.get_directory_for_column_id(column.id, True)
+        index = AvailabilityIndex.from_object_ids(contents, self._ingested_objects.pop(column.id, set()))
+        index.save(os.path.join(data_dir, self.availability_file_name),
+                   self.object_index_directory(column.id.archive_id))
+        self._availability_cache[data_dir] = index
+
+        cells = self._ingested_cells.pop(column.id, None)
+        if cells:
+            self._update_cell_index(data_dir, cells)
+
+    def _load_cell_index(self, data_dir):
+        # type: (str) -> Dict[str, Tuple[tuple, str, int]]
+        """Load the cell index stored in `data_dir` (empty if there is none)."""
+        try:
+            return self._cell_index_cache[data_dir]
+        except KeyError:
+            pass
+        cells = dict()
+        index_path = os.path.join(data_dir, self.cell_index_file_name)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path) as f:
+                    stored = json.load(f)
+                cells = {object_id: (tuple(shape), dtype, nbytes)
+                         for object_id, (shape, dtype, nbytes) in stored['cells'].items()}
+            except (ValueError, KeyError) as e:
+                log.warning("Cell index %s could not be read: %s", index_path, e)
+        self._cell_index_cache[data_dir] = cells
+        return cells
+
+    def _update_cell_index(self, data_dir, cells):
+        # type: (str, Dict[str, Tuple[tuple, str, int]]) -> None
+        """Add the shape, type and size of `cells` to the cell index stored in `data_dir`."""
+        index_path = os.path.join(data_dir, self.cell_index_file_name)
+        with exclusive_file_lock(index_path):
+            # Reread the index, as another process may have changed it.
+            self._cell_index_cache.pop(data_dir, None)
+            merged = dict(self._load_cell_index(data_dir))
+            merged.update(cells)
+
+            def write(path):
+                with open(path, 'w') as f:
+                    json.dump({'version': 1, 'cells': {object_id: [list(shape), dtype, nbytes]
+                                                       for object_id, (shape, dtype, nbytes) in merged.items()}},
+                              f)
+            write_atomically(write, index_path)
+            self._cell_index_cache[data_dir] = merged
+
+    def get_cell_metadata(self, column, object_ids):
+        # type: (FIDIAArrayColumn, List[str]) -> pd.DataFrame
+        """Return the `shape`, `dtype` and `nbytes` of the stored cells of an array column.
+
+        The values are taken from the cell index, or, for cells not in the
+        index (e.g. those added by write-back), from the header of the cell's
+        file. Objects with no data stored are omitted.
 
-            data_path = os.path.join(data_dir, "pandas_series.pkl")
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by object ID.
 
-            data = column.get_array()
-            log.debug(type(data))
-            series = pd.Series(data, index=column.contents)
-            series.to_pickle(data_path)
+        """
+
+        data_dir = self.get_directory_for_column_id(column.id)
+        if not os.path.exists(data_dir) or not isinstance(column, FIDIAArrayColumn):
+            raise DALCantRespond("NumpyFileStore has no array data for ColumnID %s" % column.id)
+
+        cells = self._load_cell_index(data_dir)
+        index = []
+        rows = []
+        for object_id in object_ids:
+            try:
+                row = cells[object_id]
+            except KeyError:
+                if self.has_data(column, object_id) is False:
+                    continue
+                try:
+                    shape, dtype = self._read_cell(data_dir, object_id, column, header_only=True)
+                except DALDataNotAvailable:
+                    continue
+                row = (tuple(shape), dtype.str, int(np.prod(shape, dtype=np.int64)) * dtype.itemsize)
+            index.append(object_id)
+            rows.append(row)
+        return pd.DataFrame(rows, index=index, columns=['shape', 'dtype', 'nbytes'])
+
+    def object_index_directory(self, archive_id):
+        # type: (str) -> str
+        """Directory containing the object indexes used by the availability indexes of an archive."""
+        return os.path.join(self.base_path, path_escape(archive_id), self.object_index_directory_name)
+
+    def _load_availability(self, data_dir):
+        # type: (str) -> Union[AvailabilityIndex, None]
+        """Load the availability index stored in `data_dir`, or None if there is none."""
+        bitmap_path = os.path.join(data_dir, self.availability_file_name)
+        if not os.path.exists(bitmap_path):
+            return None
+        archive_id = os.path.relpath(data_dir, self.base_path).split(os.path.sep)[0]
+        try:
+            return AvailabilityIndex.load(bitmap_path, self.object_index_directory(archive_id),
+                                          self._object_index_cache)
+        except Exception as e:
+            log.warning("Availability index %s could not be read: %s", bitmap_path, e)
+            return None
+
+    def ingest_column(self, column, contents=None):
+        # type: (fidia.FIDIAColumn, List[str]) -> None
+        """Overrides :meth:`DataAccessLayer.ingest_column`"""
+
+        data_dir = self.get_directory_for_column_id(column.id, True)
+
+        if contents is None:
+            contents = column.contents
+
+        with self._ingestion():
+            if isinstance(column, FIDIAArrayColumn):
+                # Data is in array format, and therefore each cell is stored as a separate file.
+                # @TODO: If the column definition defines only get_array, this will be badly inefficient?
+                for object_id in contents:
+                    try:
+                        data = column.get_value(object_id, provenance='definition')
+                    except:
+                        log.warning("No data ingested for object '%s' in column '%s'", object_id, column.id)
+                        pass
+                    else:
+                        self.ingest_object_with_data(column, object_id, data)
+            else:
+                # Data is individual values, so is stored in a single pickled pandas series
+
+                # Only `contents` is read, so that each shard of a sharded
+                # ingestion reads only its own objects.
+                data = column._get_array_from_definition(list(contents))
+                self.ingest_column_with_data(column, data.reindex(contents))
+
+            self.column_ingestion_complete_callback(column, contents)
+
+    def ingest_archive(self, archive, contents=None):
+        # type: (fidia.Archive, List[str]) -> None
+        """Overrides :meth:`OptimizedIngestionMixin.ingest_archive`"""
+        with self._ingestion():
+            super(NumpyFileStore, self).ingest_archive(archive, contents)
+
+    @contextmanager
+    def _ingestion(self):
+        """Track the objects (and cells) ingested by this thread until their columns are complete."""
+        depth = getattr(self._ingestion_state, 'depth', 0)
+        self._ingestion_state.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._ingestion_state.depth = depth
+
+    @property
+    def _ingesting(self):
+        # type: () -> bool
+        return getattr(self._ingestion_state, 'depth', 0) > 0
 
     def ingest_object_with_data(self, column, object_id, data):
         # type: (fidia.FIDIAColumn, str, Any) -> None
@@ -163,18 +681,48 @@ class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
 
         if isinstance(column, FIDIAArrayColumn):
             # Data is in array format, and therefore each cell is stored as a separate file.
-            data_path = os.path.join(data_dir, object_id + ".npy")
-            if self.use_compression:
-                local_open = gzip.open
-                data_path += ".gz"
-            else:
-                local_open = open
-            with local_open(data_path, 'wb') as fh:
-                np.save(fh, data, allow_pickle=False)
+            self._write_cell(data_dir, object_id, data)
+            if self._ingesting:
+                self._ingested_cells.setdefault(column.id, dict())[object_id] = describe_array(data)
+            # Any indexed description of a previous version of the cell is no longer valid.
+            self._cell_index_cache.get(data_dir, dict()).pop(object_id, None)
+
+            if (self.preview_levels > 0 and np.ndim(data) >= 2 and
+                    issubclass(column.column_definition_class, fidiacoldefs.FITSDataColumn)):
+                if self.stored_preview_levels < self.preview_levels:
+                    self._record_preview_levels(self.preview_levels)
+                preview = data
+                for level in range(1, self.preview_levels + 1):
+                    preview = downsample_by_two(preview)
+                    self._write_cell(self.preview_directory(data_dir, level), object_id, preview)
         else:
-            raise DALIngestionError("NumpyFileStore.ingest_object_with_data() works only for array data.")
+            # Update a single value of the pickled series. This is relatively
+            # expensive, and is intended for occasional updates: use
+            # `ingest_column_with_data` to ingest whole columns, or (with
+            # `update=True`) many values at once.
+            with exclusive_file_lock(os.path.join(data_dir, PANDAS_SERIES_FILE)):
+                series = self.read_series(data_dir)
+                if series is None:
+                    series = pd.Series(dtype=type(data))
+                series[object_id] = data
+                self.write_series(data_dir, series, complete=self._is_complete(data_dir))
 
-    def ingest_column_with_data(self, column, data):
+        if self._ingesting:
+            self._ingested_objects.setdefault(column.id, set()).add(object_id)
+        else:
+            self._record_availability(data_dir, column.id.archive_id, [object_id])
+        self._data_changed()
+
+    def ingest_column_with_data(self, column, data, update=False):
+        # type: (fidia.FIDIAColumn, Any, bool) -> None
+        """Overrides :meth:`OptimizedIngestionMixin.ingest_column_with_data`.
+
+        With `update`, the values are merged into the stored column (which is
+        read and written once). Outside of `ingest_column` and
+        `ingest_archive`, the objects are immediately recorded as having data
+        in the availability index of the column.
+
+        """
 
         data_dir = self.get_directory_for_column_id(column.id, True)
 
@@ -182,12 +730,168 @@ class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
             # Array column
             raise Exception("Not Implemented")
         else:
-            data_path = os.path.join(data_dir, "pandas_series.pkl")
             if isinstance(data, pd.Series):
                 series = data
             else:
                 series = pd.Series(data, index=column.contents)
-            series.to_pickle(data_path)
+            available = series.index[series.notnull()]
+            if update:
+                with exclusive_file_lock(os.path.join(data_dir, PANDAS_SERIES_FILE)):
+                    stored = self.read_series(data_dir)
+                    complete = stored is not None and self._is_complete(data_dir)
+                    if stored is not None:
+                        series = pd.concat((stored[~stored.index.isin(series.index)], series))
+                    self.write_series(data_dir, series, complete=complete)
+            else:
+                self.write_series(data_dir, series)
+            if self._ingesting:
+                self._ingested_objects.setdefault(column.id, set()).update(available)
+            else:
+                self._record_availability(data_dir, column.id.archive_id, available)
+            self._data_changed()
+
+    def _record_availability(self, data_dir, archive_id, object_ids):
+        # type: (str, str, Iterable[str]) -> None
+        """Mark `object_ids` as having data in the availability index stored in `data_dir`."""
+        bitmap_path = os.path.join(data_dir, self.availability_file_name)
+        with exclusive_file_lock(bitmap_path):
+            index = AvailabilityIndex.from_object_ids(object_ids, object_ids)
+            stored = self._load_availability(data_dir)
+            if stored is not None:
+                if all(stored.has_data(object_id) for object_id in index.object_ids):
+                    self._availability_cache[data_dir] = stored
+                    return
+                index = stored.merge(index)
+            index.save(bitmap_path, self.object_index_directory(archive_id))
+            self._availability_cache[data_dir] = index
+
+    def ingest_archive_shard(self, archive, n_shards, shard_index):
+        # type: (fidia.Archive, int, int) -> str
+        """Ingest one shard of `archive` into a private staging directory of this store.
+
+        The staged data is not visible to :meth:`get_value` until
+        :meth:`merge_staged_shards` has been called. Any previously staged data
+        for the same shard is discarded first, so a failed shard can simply be
+        re-run.
+
+        Returns
+        -------
+        str
+            The path of the staging directory used.
+
+        """
+
+        staging_path = os.path.join(self.base_path, self.staging_directory_name,
+                                    "shard-{}-of-{}".format(shard_index, n_shards))
+        if os.path.exists(staging_path):
+            shutil.rmtree(staging_path)
+        os.makedirs(staging_path)
+
+        staging_store = NumpyFileStore(staging_path, use_compression=self.use_compression, fan_out=self.fan_out,
+                                       preview_levels=self.preview_levels)
+        staging_store.ingest_archive(archive, contents=shard_contents(archive.contents, n_shards, shard_index))
+
+        return staging_path
+
+    def merge_staged_shards(self, staging_paths=None):
+        # type: (List[str]) -> None
+        """Combine the data staged by :meth:`ingest_archive_shard` into this store.
+
+        Scalar columns from all shards are concatenated (together with any data
+        already in the store for objects not present in any shard), and
+        replace the existing data. Array cells are renamed
+        into place. Availability indexes are combined in the same way as
+        scalar columns. Staging directories are removed once merged.
+
+        Parameters
+        ----------
+        staging_paths: list (optional)
+            Staging directories to be merged. By default, all staging
+            directories below this store are merged.
+
+        """
+
+        staging_root = os.path.join(self.base_path, self.staging_directory_name)
+        if staging_paths is None:
+            if not os.path.exists(staging_root):
+                return
+            staging_paths = [os.path.join(staging_root, d) for d in sorted(os.listdir(staging_root))
+                             if os.path.isdir(os.path.join(staging_root, d))]
+
+        with exclusive_file_lock(staging_root):
+
+            # Collect the scalar series from each shard, keyed by their
+            # directory relative to the store.
+            staged_series = dict()  # type: Dict[str, List[pd.Series]]
+            staged_availability = dict()  # type: Dict[str, List[AvailabilityIndex]]
+            staged_cells = dict()  # type: Dict[str, Dict[str, Tuple[tuple, str, int]]]
+
+            for staging_path in staging_paths:
+                staging_store = NumpyFileStore(staging_path)
+                if staging_store.stored_preview_levels > self.stored_preview_levels:
+                    self._record_preview_levels(staging_store.stored_preview_levels)
+                for dirpath, dirnames, filenames in os.walk(staging_path):
+                    if self.object_index_directory_name in dirnames:
+                        # Object indexes are rewritten as needed when the availability is merged.
+                        dirnames.remove(self.object_index_directory_name)
+                    relative_dir = os.path.relpath(dirpath, staging_path)
+                    for filename in filenames:
+                        staged_file = os.path.join(dirpath, filename)
+                        if dirpath == staging_path and filename == self.layout_file_name:
+                            continue
+                        elif is_working_file(filename):
+                            # Removed with the staging directory.
+                            continue
+                        elif filename in SCALAR_DATA_FILES:
+                            staged_series.setdefault(relative_dir, []).append(staging_store.read_series(dirpath))
+                        elif filename == self.statistics_file_name:
+                            # Recomputed when the scalar series are merged below.
+                            continue
+                        elif filename == self.cell_index_file_name:
+                            staged_cells.setdefault(relative_dir, dict()).update(
+                                staging_store._load_cell_index(dirpath))
+                        elif filename == self.availability_file_name:
+                            index = staging_store._load_availability(dirpath)
+                            if index is not None:
+                                staged_availability.setdefault(relative_dir, []).append(index)
+                        else:
+                            target_dir = os.path.join(self.base_path, relative_dir)
+                            if not os.path.exists(target_dir):
+                                os.makedirs(target_dir, exist_ok=True)
+                            os.replace(staged_file, os.path.join(target_dir, filename))
+
+            for relative_dir, series_list in staged_series.items():
+                target_dir = os.path.join(self.base_path, relative_dir)
+                if not os.path.exists(target_dir):
+                    os.makedirs(target_dir, exist_ok=True)
+
+                merged = pd.concat(series_list)
+                existing = self.read_series(target_dir)
+                if existing is not None:
+                    merged = pd.concat([existing[~existing.index.isin(merged.index)], merged])
+                log.debug("Merged %s shards into %s", len(series_list), target_dir)
+
+                self.write_series(target_dir, merged)
+
+            for relative_dir, indexes in staged_availability.items():
+                target_dir = os.path.join(self.base_path, relative_dir)
+                if not os.path.exists(target_dir):
+                    os.makedirs(target_dir, exist_ok=True)
+                merged_index = self._load_availability(target_dir)
+                for index in indexes:
+                    merged_index = index if merged_index is None else merged_index.merge(index)
+                archive_id = relative_dir.split(os.path.sep)[0]
+                merged_index.save(os.path.join(target_dir, self.availability_file_name),
+                                  self.object_index_directory(archive_id))
+                self._availability_cache[target_dir] = merged_index
+
+            for relative_dir, cells in staged_cells.items():
+                self._update_cell_index(os.path.join(self.base_path, relative_dir), cells)
+
+            for staging_path in staging_paths:
+                shutil.rmtree(staging_path)
+
+        self._data_changed()
 
     def by_object_group_pre_ingestion_callback(self, object_id, grouping_context):
         self.start_size = get_size(self.base_path)
@@ -228,6 +932,150 @@ class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
         log.info("Ingested %s MB in %s seconds, rate %s Mb/s",
                  delta_size / 1024 ** 2, delta_time, delta_size / 1024 ** 2 / delta_time)
 
+    def stored_columns(self):
+        # type: () -> Generator[Tuple[ColumnID, str], None, None]
+        """Iterate over the columns with data in this store, yielding their ColumnID and data directory.
+
+        The ColumnID is reconstructed from the directory levels described in
+        the class documentation. Staging directories are skipped.
+
+        """
+        seen = set()
+        for dirpath, dirnames, filenames in os.walk(self.base_path):
+            if dirpath == self.base_path and self.staging_directory_name in dirnames:
+                dirnames.remove(self.staging_directory_name)
+            if self.preview_directory_name in dirnames:
+                dirnames.remove(self.preview_directory_name)
+            data_files = [f for f in filenames if is_data_file(f)]
+            if not data_files:
+                continue
+            data_dir = self._column_directory_for_file(dirpath, data_files[0])
+            if data_dir in seen:
+                continue
+            seen.add(data_dir)
+            parts = os.path.relpath(data_dir, self.base_path).split(os.path.sep)
+            if len(parts) < 4:
+                continue
+            column_id = ColumnID(":".join((parts[0], parts[1], "/".join(parts[2:-1]), parts[-1])))
+            yield column_id, data_dir
+
+    def _column_directory_for_file(self, dirpath, filename):
+        # type: (str, str) -> str
+        """Determine the column data directory of a data file found in `dirpath`, allowing for fan-out."""
+        if filename in SCALAR_DATA_FILES:
+            return dirpath
+        object_id = strip_cell_suffix(filename)
+        dir_parts = dirpath.split(os.path.sep)
+        for levels in sorted({self.fan_out, self.previous_fan_out or 0}, reverse=True):
+            if levels > 0 and dir_parts[-levels:] == hash_prefixes(object_id, levels):
+                return os.path.sep.join(dir_parts[:-levels])
+        return dirpath
+
+    def iter_cells(self, data_dir):
+        # type: (str) -> Generator[Tuple[str, str], None, None]
+        """Iterate over the array cells stored in `data_dir`, yielding their object ID and file path."""
+        for dirpath, dirnames, filenames in os.walk(data_dir):
+            if dirpath == data_dir and self.preview_directory_name in dirnames:
+                dirnames.remove(self.preview_directory_name)
+            for filename in filenames:
+                object_id = strip_cell_suffix(filename)
+                if object_id is not None:
+                    yield object_id, os.path.join(dirpath, filename)
+
+    def cell_path(self, data_dir, object_id, fan_out=None):
+        # type: (str, str, int) -> str
+        """The path of the file for `object_id` in the array column stored in `data_dir`."""
+        if fan_out is None:
+            fan_out = self.fan_out
+        filename = object_id + ".npy"
+        if self.use_compression:
+            filename += ".gz"
+        return os.path.join(data_dir, *(hash_prefixes(object_id, fan_out) + [filename]))
+
+    def migrate_layout(self, fan_out):
+        # type: (int) -> None
+        """Convert this store in place to use the given directory fan-out (see class documentation).
+
+        Cells are moved one at a time, and the store remains readable
+        throughout. If the migration is interrupted, calling this method again
+        will complete it.
+
+        """
+        fan_out = int(fan_out)
+        with exclusive_file_lock(os.path.join(self.base_path, self.layout_file_name)):
+            if fan_out == self.fan_out and self.previous_fan_out is None:
+                return
+
+            # Find the array column directories before changing the layout.
+            array_data_dirs = [data_dir for _, data_dir in self.stored_columns()
+                               if not is_scalar_column_directory(data_dir)]
+            # Preview pyramid levels are laid out in the same way.
+            for data_dir in list(array_data_dirs):
+                preview_root = os.path.join(data_dir, self.preview_directory_name)
+                if os.path.isdir(preview_root):
+                    array_data_dirs.extend(os.path.join(preview_root, level) for level in os.listdir(preview_root))
+
+            layout = self._read_layout()
+            layout.update(fan_out=fan_out, previous_fan_out=self.fan_out)
+            self._write_layout(layout)
+            self.previous_fan_out = self.fan_out
+            self.fan_out = fan_out
+
+            for data_dir in array_data_dirs:
+                moved = 0
+                for object_id, path in list(self.iter_cells(data_dir)):
+                    target = os.path.join(data_dir, *(hash_prefixes(object_id, fan_out) + [os.path.basename(path)]))
+                    if path != target:
+                        if not os.path.exists(os.path.dirname(target)):
+                            os.makedirs(os.path.dirname(target), exist_ok=True)
+                        os.replace(path, target)
+                        moved += 1
+                # Remove any directories emptied by the move.
+                for dirpath, dirnames, filenames in os.walk(data_dir, topdown=False):
+                    if dirpath != data_dir and not os.listdir(dirpath):
+                        os.rmdir(dirpath)
+                log.info("Moved %s cells in %s", moved, data_dir)
+
+            del layout['previous_fan_out']
+            self._write_layout(layout)
+            self.previous_fan_out = None
+
+    def _read_layout(self):
+        # type: () -> Dict[str, int]
+        try:
+            with open(os.path.join(self.base_path, self.layout_file_name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return dict()
+
+    def _record_preview_levels(self, levels):
+        # type: (int) -> None
+        """Record in the layout that up to `levels` preview pyramid levels have been stored."""
+        with exclusive_file_lock(os.path.join(self.base_path, self.layout_file_name)):
+            layout = self._read_layout()
+            if levels > layout.get('preview_levels', 0):
+                layout.setdefault('fan_out', self.fan_out)
+                layout['preview_levels'] = levels
+                self._write_layout(layout)
+            self.stored_preview_levels = layout['preview_levels']
+
+    def _write_layout(self, layout):
+        # type: (Dict[str, int]) -> None
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(layout, f)
+        write_atomically(write, os.path.join(self.base_path, self.layout_file_name))
+
+    def export_pack(self, pack_path):
+        # type: (str) -> None
+        """Export all data in this store to a single read-only pack file.
+
+        See :class:`fidia.dal.PackFileStore`.
+
+        """
+        from .pack_file_store import write_pack_file
+        write_pack_file(self, pack_path)
+
     def get_directory_for_column_id(self, column_id, create=False):
         # type: (ColumnID) -> str
         """Determine the path containing the .npy files for a given column."""
@@ -243,6 +1091,58 @@ class NumpyFileStore(OptimizedIngestionMixin, DataAccessLayer):
 
         return path
 
+def write_atomically(writer, path):
+    # type: (Callable[[str], None], str) -> None
+    """Write a file using `writer(temporary_path)`, then rename it to `path`.
+
+    The rename is atomic on POSIX filesystems, so concurrent readers see
+    either the old or the new file, never a partially written one.
+
+    """
+    # Unique to the process and thread, as several threads may write the same file.
+    temporary_path = "{}{}{}-{}".format(path, TEMPORARY_FILE_MARKER, os.getpid(), threading.get_ident())
+    try:
+        writer(temporary_path)
+        os.replace(temporary_path, path)
+    except:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+def is_data_file(filename):
+    # type: (str) -> bool
+    """True if the filename is one of the data files written by `NumpyFileStore`."""
+    return filename in SCALAR_DATA_FILES or filename.endswith(".npy") or filename.endswith(".npy.gz")
+
+def is_working_file(filename):
+    # type: (str) -> bool
+    """True if the filename is a lock file, or a temporary file left by an interrupted `write_atomically`."""
+    return filename.endswith(LOCK_FILE_SUFFIX) or TEMPORARY_FILE_MARKER in filename
+
+def is_scalar_column_directory(data_dir):
+    # type: (str) -> bool
+    """True if `data_dir` contains a (non-array) column, stored as a single file."""
+    return any(os.path.exists(os.path.join(data_dir, filename)) for filename in SCALAR_DATA_FILES)
+
+def strip_cell_suffix(filename):
+    # type: (str) -> Union[str, None]
+    """Return the object ID of an array cell file name, or None if it is not an array cell."""
+    for suffix in (".npy", ".npy.gz"):
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return None
+
+def hash_prefixes(object_id, levels):
+    # type: (str, int) -> List[str]
+    """The fan-out subdirectory names for `object_id`, one pair of hex digits per level.
+
+    >>> hash_prefixes("Gal1", 2)
+    ['44', '05']
+
+    """
+    digest = hashlib.md5(object_id.encode('utf-8')).hexdigest()
+    return [digest[2 * level:2 * level + 2] for level in range(levels)]
+
 def path_escape(str):
     # type: (str) -> str
     """Escape any path separators in a string so it can be used as the name of a single folder."""
@@ -258,3 +1158,17 @@ def get_size(start_path='.'):
             fp = os.path.join(dirpath, f)
             total_size += os.path.getsize(fp)
     return total_size
+
+
+def main(args=None):
+    """Command line tool to change the directory fan-out of an existing `NumpyFileStore`."""
+
+    parser = argparse.ArgumentParser(description="Change the directory fan-out of a FIDIA NumpyFileStore in place.")
+    parser.add_argument('base_path', help="Directory of the store")
+    parser.add_argument('fan_out', type=int, help="Number of levels of hashed subdirectories (0 for none)")
+    options = parser.parse_args(args)
+
+    NumpyFileStore(options.base_path).migrate_layout(options.fan_out)
+
+if __name__ == '__main__':
+    sys.exit(main())
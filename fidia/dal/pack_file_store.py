@@ -0,0 +1,262 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, Dict, Union
+import fidia
+
+# Python Standard Library Imports
+import os
+import io
+import gzip
+import json
+import mmap
+import pickle
+import struct
+import configparser
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+
+# FIDIA Imports
+from fidia.column import FIDIAArrayColumn
+
+# Other modules within this package
+from ._dal_internals import *
+from .numpy_file_store import write_atomically, PANDAS_SERIES_FILE, STRING_SERIES_FILE
+from .string_column import StringColumn
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['PackFileStore', 'write_pack_file']
+
+PACK_MAGIC = b"FIDIAPAK"
+PACK_VERSION = 1
+
+# Header: magic, version, reserved
+_HEADER = struct.Struct("<8sII")
+# Footer: offset of index, length of index, magic
+_FOOTER = struct.Struct("<QQ8s")
+
+# Blobs are aligned so that uncompressed array data can be mapped directly.
+_ALIGNMENT = 64
+
+# Magic string and version of the `.npy` format, followed by the length of
+# the header: two bytes in version 1, four in later versions.
+_NPY_PREFIX_LENGTH = 8
+_NPY_HEADER_LENGTH = {1: struct.Struct("<H"), 2: struct.Struct("<I")}
+
+
+def write_pack_file(file_store, pack_path):
+    # type: (fidia.dal.NumpyFileStore, str) -> None
+    """Write all of the data in `file_store` into a single pack file at `pack_path`.
+
+    The pack file consists of a short header, the contents of each data file
+    of the store (unchanged, and aligned to 64 bytes), and finally a central
+    JSON index giving the offset and length of every column series (or
+    string column) and array cell, followed by a fixed size footer pointing
+    to the index.
+
+    """
+
+    index = {
+        'version': PACK_VERSION,
+        'compressed': bool(file_store.use_compression),
+        'columns': dict()
+    }  # type: Dict[str, Any]
+
+    def write(path):
+        with open(path, 'wb') as pack:
+            pack.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0))
+
+            def append_blob(filename):
+                padding = -pack.tell() % _ALIGNMENT
+                pack.write(b"\0" * padding)
+                offset = pack.tell()
+                with open(filename, 'rb') as f:
+                    data = f.read()
+                pack.write(data)
+                return [offset, len(data)]
+
+            for column_id, data_dir in file_store.stored_columns():
+                series_path = os.path.join(data_dir, PANDAS_SERIES_FILE)
+                string_path = os.path.join(data_dir, STRING_SERIES_FILE)
+                if os.path.exists(series_path):
+                    entry = {'series': append_blob(series_path)}
+                elif os.path.exists(string_path):
+                    entry = {'strings': append_blob(string_path)}
+                else:
+                    entry = {'cells': {object_id: append_blob(cell_path)
+                                       for object_id, cell_path in file_store.iter_cells(data_dir)}}
+                index['columns'][str(column_id)] = entry
+                log.debug("Packed column %s", column_id)
+
+            index_bytes = json.dumps(index).encode('utf-8')
+            index_offset = pack.tell()
+            pack.write(index_bytes)
+            pack.write(_FOOTER.pack(index_offset, len(index_bytes), PACK_MAGIC))
+
+    write_atomically(write, pack_path)
+
+
+class PackFileStore(DataAccessLayer):
+    """A read-only data access layer serving data from a single pack file.
+
+    Pack files are created from a :class:`NumpyFileStore` using
+    :meth:`NumpyFileStore.export_pack`, and are convenient for distributing
+    ingested data as one file rather than millions of small files. The
+    results of :meth:`get_value` are the same as for the original store.
+
+    Configuration is by a section of the `fidia.ini` file, e.g.::
+
+        [DAL-PackFileStore]
+        pack_path = /path/to/data.fidiapack
+
+    Parameters
+    ----------
+    pack_path: str
+        Location of the pack file.
+    use_mmap: bool
+        If True (the default), the file is memory mapped. Otherwise, data is
+        read with positioned reads (`os.pread`), which may be preferable on
+        some network filesystems.
+
+    Notes
+    -----
+
+    The arrays returned for array columns are read-only. If the pack file is
+    memory mapped and not compressed, they are views of the mapped file, so
+    no data is copied (or read until it is used).
+
+    """
+
+    def __init__(self, pack_path, use_mmap=True):
+
+        if isinstance(use_mmap, str):
+            # Values from the configuration file are always strings.
+            use_mmap = configparser.ConfigParser.BOOLEAN_STATES[use_mmap.lower()]
+
+        self.pack_path = pack_path
+        self.use_mmap = use_mmap
+
+        self._fd = os.open(pack_path, os.O_RDONLY)
+        file_size = os.fstat(self._fd).st_size
+
+        if self.use_mmap:
+            self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = None
+
+        magic, version, _ = _HEADER.unpack(self._read(0, _HEADER.size))
+        if magic != PACK_MAGIC:
+            raise DALException("File %s is not a FIDIA pack file" % pack_path)
+        if version != PACK_VERSION:
+            raise DALException("Pack file %s has unsupported version %s" % (pack_path, version))
+
+        index_offset, index_length, magic = _FOOTER.unpack(self._read(file_size - _FOOTER.size, _FOOTER.size))
+        if magic != PACK_MAGIC:
+            raise DALException("Pack file %s is truncated or corrupt" % pack_path)
+        index = json.loads(self._read(index_offset, index_length).decode('utf-8'))
+
+        self._compressed = index['compressed']
+        self._columns = index['columns']  # type: Dict[str, Dict[str, Any]]
+
+        # The pack is read-only, so unpickled series (and string columns) can be cached safely.
+        self._series_cache = dict()  # type: Dict[str, Union[pd.Series, StringColumn]]
+
+    def __del__(self):
+        # The memory map is not closed explicitly, as arrays returned by
+        # `get_value` may still refer to it: it is released with the last of them.
+        if getattr(self, '_fd', None) is not None:
+            os.close(self._fd)
+
+    def _read(self, offset, length):
+        # type: (int, int) -> bytes
+        if self._mmap is not None:
+            return self._mmap[offset:offset + length]
+        else:
+            return os.pread(self._fd, length, offset)
+
+    def get_value(self, column, object_id):
+        # type: (fidia.FIDIAColumn, str) -> Any
+        """Overrides :meth:`DataAccessLayer.get_value`"""
+
+        try:
+            entry = self._columns[str(column.id)]
+        except KeyError:
+            raise DALCantRespond("PackFileStore has no data for ColumnID %s" % column.id)
+
+        if isinstance(column, FIDIAArrayColumn):
+            try:
+                offset, length = entry['cells'][object_id]
+            except KeyError:
+                raise DALDataNotAvailable("PackFileStore has no data for object %s in column %s" %
+                                          (object_id, column.id))
+            if self._compressed:
+                return _array_from_npy(gzip.decompress(self._read(offset, length)))
+            elif self._mmap is not None:
+                return _array_from_npy(self._mmap, offset)
+            else:
+                return _array_from_npy(self._read(offset, length))
+        else:
+            series = self._series_cache.get(column.id)
+            if series is None:
+                if 'strings' in entry:
+                    offset, length = entry['strings']
+                    series = StringColumn(self._read(offset, length))
+                else:
+                    offset, length = entry['series']
+                    series = pickle.loads(self._read(offset, length))
+                self._series_cache[column.id] = series
+            try:
+                return series[object_id]
+            except KeyError:
+                raise DALDataNotAvailable("PackFileStore has no data for object %s in column %s" %
+                                          (object_id, column.id))
+
+
+def _array_from_npy(buffer, offset=0):
+    # type: (Union[bytes, mmap.mmap], int) -> np.ndarray
+    """Return a read-only view of the array stored in `.npy` format at `offset` in `buffer`.
+
+    Only the header is parsed: the data of the array is not copied.
+
+    """
+    prefix = io.BytesIO(buffer[offset:offset + _NPY_PREFIX_LENGTH])
+    major, _ = np.lib.format.read_magic(prefix)
+    try:
+        header_length = _NPY_HEADER_LENGTH[major]
+    except KeyError:
+        raise DALException("Pack file contains an array in unsupported .npy format version %s" % major)
+    length_start = offset + _NPY_PREFIX_LENGTH
+    length_end = length_start + header_length.size
+    header_end = length_end + header_length.unpack(buffer[length_start:length_end])[0]
+    header = io.BytesIO(buffer[offset:header_end])
+    np.lib.format.read_magic(header)
+    if major == 1:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    if dtype.hasobject:
+        raise DALException("Pack file contains an array of Python objects, which cannot be mapped")
+    array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=header_end,
+                       order='F' if fortran_order else 'C')
+    array.flags.writeable = False
+    return array
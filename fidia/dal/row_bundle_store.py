@@ -0,0 +1,368 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, Dict, List, Tuple, Iterable
+import fidia
+
+# Python Standard Library Imports
+import os
+import io
+import json
+import struct
+from urllib.parse import quote
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+
+# FIDIA Imports
+from fidia.column import FIDIAArrayColumn
+from fidia.utilities import exclusive_file_lock
+
+# Other modules within this package
+from ._dal_internals import *
+from .numpy_file_store import write_atomically
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['RowBundleStore']
+
+BUNDLE_MAGIC = b"FIDIABDL"
+INDEX_MAGIC = b"FIDIAIDX"
+
+# Record header: length of key, length of payload
+_RECORD = struct.Struct("<IQ")
+# Index footer: offset of index, magic
+_FOOTER = struct.Struct("<Q8s")
+
+
+class RowBundleStore(OptimizedIngestionMixin, DataAccessLayer):
+    """A data access layer storing all columns of an object together in one bundle file.
+
+    This is a row-oriented alternative to the columnar
+    :class:`NumpyFileStore`, suited to access patterns that touch many
+    columns for the same object (e.g. exporting a `FITSFile` Trait). A
+    request for several columns of one object, using :meth:`get_values` (or
+    :meth:`DataAccessLayerHost.search_for_cells`), is served with a single file
+    open.
+
+    Parameters
+    ----------
+    base_path: str
+        Directory to store/find the data in, which must already exist.
+
+    Notes
+    -----
+
+    Bundles are stored at `{base_path}/{archive_id}/{object_id}.bundle`. Each
+    bundle is a sequence of records, one per column, containing the full
+    ColumnID as the key and the value in Numpy `.npy` format as the payload.
+    Records are appended as data is ingested (holding an exclusive lock on
+    the bundle), and a later record for the same column replaces an earlier
+    one. After ingestion, bundles are "sealed" by appending an internal index
+    of the offsets of the current record for each column, so that readers can
+    seek directly to the requested columns. Unsealed bundles are still
+    readable by scanning the record headers.
+
+    Bundles containing replaced records are rewritten without them when sealed
+    (e.g. after re-ingestion), or as soon as more than
+    `max_superseded_fraction` of their records have been replaced (e.g. by
+    repeated write-back).
+
+    """
+
+    # Fraction of the records of a bundle which may be superseded before it is rewritten.
+    max_superseded_fraction = 0.5
+
+    def __init__(self, base_path):
+
+        if not os.path.isdir(base_path):
+            raise FileNotFoundError(base_path + " does not exist.")
+
+        self.base_path = base_path
+
+        # Scalar values waiting to be written, grouped by bundle so each
+        # bundle is opened only once.
+        self._pending = dict()  # type: Dict[str, Dict[str, Any]]
+
+        # Bundles written to since the last flush, which need to be (re-)sealed.
+        self._unsealed = set()
+
+    def bundle_path(self, archive_id, object_id):
+        # type: (str, str) -> str
+        """Location of the bundle for the given object."""
+        return os.path.join(self.base_path, quote(archive_id, safe=''), quote(object_id, safe='') + ".bundle")
+
+    def get_value(self, column, object_id):
+        # type: (fidia.FIDIAColumn, str) -> Any
+        """Overrides :meth:`DataAccessLayer.get_value`"""
+
+        values = self.get_values([column], object_id)
+        try:
+            return values[column.id]
+        except KeyError:
+            raise DALDataNotAvailable("RowBundleStore has no data for object %s in column %s" %
+                                      (object_id, column.id))
+
+    def get_values(self, columns, object_id):
+        # type: (List[fidia.FIDIAColumn], str) -> Dict[str, Any]
+        """Return the data for several columns of one object, keyed by ColumnID.
+
+        Columns with no data for this object are omitted from the result.
+
+        """
+
+        if len(columns) == 0:
+            return dict()
+
+        archive_ids = {column.id.archive_id for column in columns}
+        if len(archive_ids) != 1:
+            raise ValueError("RowBundleStore.get_values requires columns from a single archive.")
+
+        path = self.bundle_path(archive_ids.pop(), object_id)
+        try:
+            fh = open(path, 'rb')
+        except FileNotFoundError:
+            raise DALDataNotAvailable("RowBundleStore has no data for object %s" % object_id)
+
+        result = dict()
+        with fh:
+            index = _read_index(fh)
+            for column in columns:
+                try:
+                    offset, length = index[column.id]
+                except KeyError:
+                    continue
+                fh.seek(offset)
+                data = np.load(io.BytesIO(fh.read(length)), allow_pickle=False)
+                if not isinstance(column, FIDIAArrayColumn):
+                    data = data.item()
+                result[column.id] = data
+
+        return result
+
+    def ingest_column(self, column, contents=None):
+        # type: (fidia.FIDIAColumn, List[str]) -> None
+        """Overrides :meth:`DataAccessLayer.ingest_column`"""
+
+        if contents is None:
+            contents = column.contents
+
+        if isinstance(column, FIDIAArrayColumn):
+            for object_id in contents:
+                try:
+                    data = column.get_value(object_id, provenance='definition')
+                except:
+                    log.warning("No data ingested for object '%s' in column '%s'", object_id, column.id)
+                else:
+                    self.ingest_object_with_data(column, object_id, data)
+        else:
+            self.ingest_column_with_data(column, column.get_array(provenance='definition').reindex(contents))
+
+        self.flush()
+
+    def ingest_object_with_data(self, column, object_id, data):
+        # type: (fidia.FIDIAColumn, str, Any) -> None
+        self._append_records(self.bundle_path(column.id.archive_id, object_id), {column.id: data})
+
+    def ingest_column_with_data(self, column, data, update=False):
+        # type: (fidia.FIDIAColumn, pd.Series, bool) -> None
+        """Overrides :meth:`OptimizedIngestionMixin.ingest_column_with_data`.
+
+        Values are held until :meth:`flush` unless `update` is True, in which
+        case they are appended to the bundles immediately.
+
+        """
+
+        if isinstance(column, FIDIAArrayColumn):
+            raise DALIngestionError("RowBundleStore.ingest_column_with_data() works only for non-array data.")
+
+        if not isinstance(data, pd.Series):
+            data = pd.Series(data, index=column.contents)
+
+        for object_id, value in data.dropna().items():
+            path = self.bundle_path(column.id.archive_id, object_id)
+            if update:
+                self._append_records(path, {column.id: value})
+            else:
+                self._pending.setdefault(path, dict())[column.id] = value
+
+    def ingest_archive(self, archive, contents=None):
+        # type: (fidia.Archive, List[str]) -> None
+        """Overrides :meth:`OptimizedIngestionMixin.ingest_archive` to seal the bundles once complete."""
+        super(RowBundleStore, self).ingest_archive(archive, contents=contents)
+        self.flush()
+
+    def flush(self):
+        """Write out any pending scalar values, and seal all bundles written since the last flush."""
+        pending = self._pending
+        self._pending = dict()
+        for path, records in pending.items():
+            self._append_records(path, records)
+
+        for path in self._unsealed:
+            with exclusive_file_lock(path):
+                _seal_bundle(path)
+        self._unsealed = set()
+
+    def _append_records(self, path, records):
+        # type: (str, Dict[str, Any]) -> None
+
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with exclusive_file_lock(path):
+            with open(path, 'a+b') as fh:
+                fh.seek(0, os.SEEK_END)
+                if fh.tell() == 0:
+                    fh.write(BUNDLE_MAGIC)
+                    n_records = 0
+                    keys = set()
+                else:
+                    index_offset = _index_offset(fh)
+                    existing = list(_iter_records(fh, index_offset))
+                    n_records = len(existing)
+                    keys = {key for key, _, _ in existing}
+                    if index_offset is not None:
+                        # Drop the existing index: it will be rewritten when sealed.
+                        fh.truncate(index_offset)
+                fh.seek(0, os.SEEK_END)
+
+                for key, value in records.items():
+                    _write_record(fh, key, _encode_value(value))
+                n_records += len(records)
+                keys.update(records)
+
+            if n_records - len(keys) > self.max_superseded_fraction * n_records:
+                _compact_bundle(path)
+
+        self._unsealed.add(path)
+        self._data_changed()
+
+
+def _index_offset(fh):
+    """Return the offset of the index of a sealed bundle, or None if the bundle is not sealed."""
+    fh.seek(0, os.SEEK_END)
+    size = fh.tell()
+    if size < len(BUNDLE_MAGIC) + _FOOTER.size:
+        return None
+    fh.seek(size - _FOOTER.size)
+    offset, magic = _FOOTER.unpack(fh.read(_FOOTER.size))
+    if magic != INDEX_MAGIC:
+        return None
+    return offset
+
+def _encode_value(value):
+    # type: (Any) -> bytes
+    buffer = io.BytesIO()
+    np.save(buffer, value, allow_pickle=False)
+    return buffer.getvalue()
+
+def _write_record(fh, key, payload):
+    # type: (Any, str, bytes) -> None
+    key_bytes = key.encode('utf-8')
+    fh.write(_RECORD.pack(len(key_bytes), len(payload)))
+    fh.write(key_bytes)
+    fh.write(payload)
+
+def _iter_records(fh, end=None):
+    # type: (Any, int) -> Iterable[Tuple[str, int, int]]
+    """Walk the record headers of a bundle, yielding the key, payload offset and payload length of each record."""
+    fh.seek(0)
+    if fh.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+        raise DALException("File %s is not a FIDIA row bundle" % getattr(fh, 'name', fh))
+    position = fh.tell()
+    while end is None or position < end:
+        header = fh.read(_RECORD.size)
+        if len(header) < _RECORD.size:
+            break
+        key_length, payload_length = _RECORD.unpack(header)
+        key = fh.read(key_length).decode('utf-8')
+        position = fh.tell()
+        yield key, position, payload_length
+        position += payload_length
+        fh.seek(position)
+
+def _scan_records(fh, end=None):
+    # type: (Any, int) -> Dict[str, Tuple[int, int]]
+    """Build an index of the payloads in a bundle by walking the record headers."""
+    index = dict()
+    for key, offset, length in _iter_records(fh, end):
+        index[key] = (offset, length)
+    return index
+
+def _read_index(fh):
+    # type: (Any) -> Dict[str, Tuple[int, int]]
+    index_offset = _index_offset(fh)
+    if index_offset is None:
+        return _scan_records(fh)
+    fh.seek(0, os.SEEK_END)
+    index_length = fh.tell() - _FOOTER.size - index_offset
+    fh.seek(index_offset)
+    return {key: tuple(value) for key, value in json.loads(fh.read(index_length).decode('utf-8')).items()}
+
+def _write_index(fh, index):
+    # type: (Any, Dict[str, Tuple[int, int]]) -> None
+    """Seal a bundle by writing `index` at the current position of `fh` (the end of the records)."""
+    end = fh.tell()
+    fh.write(json.dumps(index).encode('utf-8'))
+    fh.write(_FOOTER.pack(end, INDEX_MAGIC))
+
+def _seal_bundle(path):
+    # type: (str) -> None
+    """Append an index to the bundle at `path` (if not already present).
+
+    If the bundle contains superseded records, it is compacted instead.
+
+    """
+    with open(path, 'r+b') as fh:
+        if _index_offset(fh) is not None:
+            return
+        fh.seek(0, os.SEEK_END)
+        end = fh.tell()
+        records = list(_iter_records(fh, end))
+        index = {key: (offset, length) for key, offset, length in records}
+        if len(records) == len(index):
+            fh.seek(end)
+            _write_index(fh, index)
+            return
+    _compact_bundle(path)
+
+def _compact_bundle(path):
+    # type: (str) -> None
+    """Rewrite the bundle at `path` with only the current record for each column, and seal it."""
+    with open(path, 'rb') as fh:
+        index = _read_index(fh)
+        payloads = []
+        for key, (offset, length) in index.items():
+            fh.seek(offset)
+            payloads.append((key, fh.read(length)))
+
+    def write(temporary_path):
+        with open(temporary_path, 'wb') as fh:
+            fh.write(BUNDLE_MAGIC)
+            new_index = dict()
+            for key, payload in payloads:
+                _write_record(fh, key, payload)
+                new_index[key] = (fh.tell() - len(payload), len(payload))
+            _write_index(fh, new_index)
+    write_atomically(write, path)
+    log.debug("Compacted row bundle %s to %d records", path, len(payloads))
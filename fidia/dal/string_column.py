@@ -0,0 +1,233 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from typing import Any, List, Union
+import fidia
+
+# Python Standard Library Imports
+import mmap
+import struct
+
+# Other Library Imports
+import numpy as np
+import pandas as pd
+
+# FIDIA Imports
+
+# Set up logging
+import fidia.slogging as slogging
+log = slogging.getLogger(__name__)
+log.setLevel(slogging.WARNING)
+log.enable_console_logging()
+
+__all__ = ['StringColumn', 'write_string_column', 'is_string_series']
+
+STRING_COLUMN_MAGIC = b"FIDIASTR"
+STRING_COLUMN_VERSION = 1
+
+# Flags
+DICTIONARY_ENCODED = 1
+
+# Header: magic, version, flags, number of rows, number of dictionary entries
+_HEADER = struct.Struct("<8sIIQQ")
+# Followed by the (offset, length) of each section, in the order below.
+_SECTIONS = ('key_offsets', 'keys', 'value_offsets', 'values', 'codes', 'nulls')
+_SECTION_TABLE = struct.Struct("<" + "QQ" * len(_SECTIONS))
+
+
+def is_string_series(series):
+    # type: (pd.Series) -> bool
+    """True if the non-null values of `series` are all Python strings (and there is at least one)."""
+    if series.dtype != object:
+        return False
+    values = series[series.notnull()]
+    if len(values) == 0:
+        return False
+    return all(isinstance(value, str) for value in values)
+
+
+def _concatenate(strings):
+    # type: (List[bytes]) -> (np.ndarray, bytes)
+    """Return the offsets and concatenated buffer for a list of byte strings."""
+    offsets = np.zeros(len(strings) + 1, dtype='<u8')
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    return offsets, b"".join(strings)
+
+
+def write_string_column(series, path, dictionary_threshold=0.5):
+    # type: (pd.Series, str, float) -> None
+    """Write a series of strings (indexed by object ID) to `path` in the compact string column format.
+
+    The object IDs are sorted and stored as a byte buffer with an array of
+    offsets, so that they can be binary searched in place. The values are
+    stored either in the same way (in the order of the sorted object IDs), or,
+    if the number of distinct values is no more than `dictionary_threshold`
+    times the number of values, as an array of codes into a dictionary of
+    the distinct values stored in the same way. Null values are recorded in a
+    bitmap.
+
+    All sections are aligned to 8 bytes so that they can be used directly
+    from a memory map.
+
+    """
+
+    series = series[~series.index.duplicated(keep='last')]
+    keys = [str(object_id).encode('utf-8') for object_id in series.index]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    keys = [keys[i] for i in order]
+    values = series.values[order]
+
+    nulls = pd.isnull(values)
+    non_null_values = [value.encode('utf-8') for value in values[~nulls]]
+
+    distinct = sorted(set(non_null_values))
+    flags = 0
+    if len(non_null_values) > 0 and len(distinct) <= dictionary_threshold * len(non_null_values):
+        flags |= DICTIONARY_ENCODED
+        lookup = {value: code for code, value in enumerate(distinct)}
+        codes = np.zeros(len(values), dtype='<i4')
+        codes[~nulls] = [lookup[value] for value in non_null_values]
+        value_offsets, value_bytes = _concatenate(distinct)
+        n_dictionary = len(distinct)
+    else:
+        codes = np.zeros(0, dtype='<i4')
+        all_values = iter(non_null_values)
+        value_offsets, value_bytes = _concatenate([b"" if null else next(all_values) for null in nulls])
+        n_dictionary = 0
+
+    key_offsets, key_bytes = _concatenate(keys)
+
+    sections = {
+        'key_offsets': key_offsets.tobytes(),
+        'keys': key_bytes,
+        'value_offsets': value_offsets.tobytes(),
+        'values': value_bytes,
+        'codes': codes.tobytes(),
+        'nulls': np.packbits(nulls).tobytes()
+    }
+
+    def write(temporary_path):
+        with open(temporary_path, 'wb') as f:
+            f.write(_HEADER.pack(STRING_COLUMN_MAGIC, STRING_COLUMN_VERSION, flags, len(keys), n_dictionary))
+            position = _HEADER.size + _SECTION_TABLE.size
+            table = []
+            for name in _SECTIONS:
+                position += -position % 8
+                table.extend((position, len(sections[name])))
+                position += len(sections[name])
+            f.write(_SECTION_TABLE.pack(*table))
+            for name in _SECTIONS:
+                f.write(b"\0" * (-f.tell() % 8))
+                f.write(sections[name])
+
+    from .numpy_file_store import write_atomically
+    write_atomically(write, path)
+
+
+class StringColumn(object):
+    """Read-only access to a column of strings written by :func:`write_string_column`.
+
+    Values are decoded only as they are requested, so a large column can be
+    opened (see :meth:`open`) and individual values looked up without
+    creating a Python object for every value.
+
+    Parameters
+    ----------
+    buffer:
+        The contents of the file, e.g. `bytes` or an `mmap.mmap`.
+
+    """
+
+    def __init__(self, buffer):
+
+        self._buffer = buffer
+
+        magic, version, flags, self.n_rows, n_dictionary = _HEADER.unpack(bytes(buffer[:_HEADER.size]))
+        if magic != STRING_COLUMN_MAGIC:
+            raise ValueError("Buffer does not contain a FIDIA string column")
+        if version != STRING_COLUMN_VERSION:
+            raise ValueError("Unsupported string column version %s" % version)
+        self.dictionary_encoded = bool(flags & DICTIONARY_ENCODED)
+
+        table = _SECTION_TABLE.unpack(bytes(buffer[_HEADER.size:_HEADER.size + _SECTION_TABLE.size]))
+        self._sections = {name: (table[2 * i], table[2 * i + 1]) for i, name in enumerate(_SECTIONS)}
+
+        self._key_offsets = self._array('key_offsets', '<u8')
+        self._value_offsets = self._array('value_offsets', '<u8')
+        self._codes = self._array('codes', '<i4')
+        self._nulls = self._array('nulls', 'u1')
+
+    @classmethod
+    def open(cls, path):
+        # type: (str) -> StringColumn
+        """Memory map the file at `path`."""
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _array(self, section, dtype):
+        offset, length = self._sections[section]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._buffer, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+    def _string(self, section, offsets, index):
+        # type: (str, np.ndarray, int) -> bytes
+        base = self._sections[section][0]
+        return self._buffer[base + int(offsets[index]):base + int(offsets[index + 1])]
+
+    def __len__(self):
+        return self.n_rows
+
+    def _position(self, object_id):
+        # type: (str) -> Union[int, None]
+        """Binary search for the row of `object_id`."""
+        key = object_id.encode('utf-8')
+        low, high = 0, self.n_rows
+        while low < high:
+            middle = (low + high) // 2
+            if self._string('keys', self._key_offsets, middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.n_rows and self._string('keys', self._key_offsets, low) == key:
+            return low
+        return None
+
+    def _value(self, position):
+        # type: (int) -> Any
+        if self._nulls[position >> 3] & (0x80 >> (position & 7)):
+            return np.nan
+        if self.dictionary_encoded:
+            position = self._codes[position]
+        return self._string('values', self._value_offsets, position).decode('utf-8')
+
+    def __contains__(self, object_id):
+        return self._position(object_id) is not None
+
+    def __getitem__(self, object_id):
+        # type: (str) -> Any
+        position = self._position(object_id)
+        if position is None:
+            raise KeyError(object_id)
+        return self._value(position)
+
+    def object_ids(self):
+        # type: () -> List[str]
+        return [self._string('keys', self._key_offsets, i).decode('utf-8') for i in range(self.n_rows)]
+
+    def to_series(self):
+        # type: () -> pd.Series
+        """Decode the whole column into a `pandas.Series`."""
+        return pd.Series([self._value(i) for i in range(self.n_rows)], index=self.object_ids(), dtype=object)
@@ -35,8 +35,10 @@ from typing import Union, List, Dict
 import fidia
 
 # Python Standard Library Imports
+import re
 
 # Other Library Imports
+import numpy as np
 import pandas as pd
 from cached_property import cached_property
 
@@ -55,7 +57,103 @@ log.enable_console_logging()
 __all__ = ['Sample']
 
 
+# One element of a trait path, e.g. `dmu['StellarMasses']` or `stellar_mass`.
+_TRAIT_PATH_ELEMENT = re.compile(r"""^(?P<name>\w+)(?:\[['"]?(?P<key>[^'"\]]+)['"]?\])?$""")
+
+
 class SampleLikeMixin(object):
+
+    def column_id_for_trait_path(self, trait_path):
+        # type: (str) -> str
+        """Find the ColumnID of the column providing the trait property at `trait_path`.
+
+        The trait path is written as it would be to access the property from
+        an object, e.g. `"dmu['StellarMasses'].table['StellarMasses'].stellar_mass"`.
+
+        """
+
+        from fidia.traits.trait_utilities import TraitKey
+
+        elements = trait_path.split(".")
+        mappings = self.trait_mappings
+        mapping = None
+        for i, element in enumerate(elements):
+            match = _TRAIT_PATH_ELEMENT.match(element)
+            if match is None:
+                raise FIDIAException("Invalid element '%s' in trait path '%s'" % (element, trait_path))
+            name, key = match.group('name'), match.group('key')
+            try:
+                if key is not None:
+                    mapping = mappings[name, str(TraitKey.as_traitkey(key))]
+                    mappings = getattr(mapping, 'named_sub_mappings', dict())
+                elif mapping is None:
+                    raise KeyError(name)
+                elif i == len(elements) - 1:
+                    if name not in mapping.trait_property_mappings:
+                        raise KeyError(name)
+                    return mapping.trait_property_mappings[name].id
+                else:
+                    mapping = mapping.sub_trait_mappings[name]
+                    mappings = dict()
+            except KeyError:
+                raise FIDIAException("Trait path '%s' not found: no '%s'" % (trait_path, element))
+        raise FIDIAException("Trait path '%s' does not end with a trait property" % trait_path)
+
+    def filter(self, *predicates):
+        # type: (*tuple) -> Sample
+        """Return a new Sample of the objects for which all of the predicates are true.
+
+        Each predicate is a tuple `(column, operator, value)`, where `column`
+        is a ColumnID or a trait path (see :meth:`column_id_for_trait_path`)
+        of a (non-array) column, and `operator` is one of `'<'`, `'<='`,
+        `'>'`, `'>='`, `'=='` or `'!='`, e.g.::
+
+            massive = sample.filter(
+                ("dmu['StellarMasses'].table['StellarMasses'].stellar_mass", '>', 1e10),
+                ("dmu['StellarMasses'].table['StarFormationRates'].sfr_err", '<', 0.1))
+
+        Objects with no value in a column never satisfy a predicate on it.
+
+        Each predicate is evaluated for all objects at once from the whole
+        column (see :meth:`FIDIAColumn.get_array`), without creating any
+        `AstronomicalObject`. If the statistics recorded by the DAL for a column
+        (see :meth:`FIDIAColumn.statistics`) show that no value can satisfy a
+        predicate, the column is not read at all.
+
+        """
+
+        from .column.column_statistics import COMPARISON_OPERATORS
+
+        selected = pd.Series(True, index=pd.Index(list(self.contents)))
+
+        for column_ref, op, value in predicates:
+            if op not in COMPARISON_OPERATORS:
+                raise ValueError("Unknown comparison operator '%s'" % op)
+
+            column_id = fidia.column.ColumnID.as_column_id(column_ref)
+            if column_id.type != 'full':
+                column_id = self.column_id_for_trait_path(column_ref)
+            column = self.find_column(column_id)
+            if isinstance(column, fidia.column.FIDIAArrayColumn):
+                raise ValueError("Column %s contains arrays, which can't be compared to a value" % column.id)
+
+            try:
+                statistics = fidia.dal_host.search_for_statistics(column)
+            except fidia.dal.DALCantRespond:
+                statistics = None
+            if statistics is not None and not statistics.may_match(op, value):
+                log.debug("Statistics show no value in column %s is %s %s", column.id, op, value)
+                selected[:] = False
+                break
+
+            archive_ids = self._object_ids_in_archive(self.archive_for_column(column.id))[selected.values]
+            values = column.get_array().reindex(archive_ids.values)
+            with np.errstate(invalid='ignore'):
+                matches = COMPARISON_OPERATORS[op](values, value).values & values.notnull().values
+            selected[archive_ids.index[~matches]] = False
+
+        return self._sub_sample(list(selected.index[selected.values]))
+
     def _update_trait_pointers(self):
 
         if not hasattr(self, '_trait_pointers'):
@@ -395,6 +493,22 @@ class Sample(SampleLikeMixin, MappingMixin, bases.Sample):
 
         return self._id_cross_matches.loc[sample_id][archive.archive_id]
 
+    def _object_ids_in_archive(self, archive):
+        # type: (fidia.Archive) -> pd.Series
+        """The IDs in `archive` of the objects in this sample, indexed by their ID in this sample."""
+        # Part of the sample-like interface.
+        return self._id_cross_matches[archive.archive_id]
+
+    def _sub_sample(self, sample_ids):
+        # type: (List[str]) -> Sample
+        """A new Sample of the given objects of this sample, with the same archives."""
+        # Part of the sample-like interface.
+        sample = type(self)()
+        sample._id_cross_matches = self._id_cross_matches.loc[sample_ids]
+        for archive in self._archives:
+            sample.link_archive(archive, index=len(sample._archives))
+        return sample
+
     def _repr_pretty_(self, p, cycle):
         # p.text(self.__str__())
         if cycle:
@@ -0,0 +1,69 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+import numpy as np
+import pandas as pd
+
+import fidia
+from fidia.archive.example_archive import ExampleArchive
+from fidia.column.column_cache import ColumnDataCache
+
+MASS_COLUMN = "ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"
+
+
+def test_column_data_cache_evicts_least_recently_used():
+    cache = ColumnDataCache(max_bytes=200)
+    data = np.zeros(10)
+
+    assert cache.put(("col1", 0), data)
+    assert cache.put(("col2", 0), data)
+    assert cache.get(("col1", 0)) is data
+    assert cache.put(("col3", 0), data)
+
+    assert cache.current_bytes == 160
+    assert ("col2", 0) not in cache
+    assert cache.get(("col2", 0)) is None
+
+    stats = cache.stats()
+    assert stats.loc["col1", 'hits'] == 1
+    assert stats.loc["col2", 'misses'] == 1
+    assert stats.loc["col2", 'evictions'] == 1
+    assert stats.loc["col3", 'bytes'] == 80
+
+    # Data larger than the cache is not stored.
+    assert not cache.put(("col4", 0), np.zeros(100))
+
+    cache.resize(100)
+    assert len(cache) == 1
+    assert cache.current_bytes == 80
+
+
+def test_catalog_column_data_held_in_column_cache(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns[MASS_COLUMN]
+
+    original_max_bytes = fidia.column_cache.max_bytes
+    try:
+        value = column.get_value("Gal1", provenance='definition')
+        assert isinstance(column._data, pd.Series)
+        assert fidia.column_cache.stats().loc[MASS_COLUMN, 'bytes'] > 0
+
+        # Data discarded from the cache is retrieved again when required.
+        fidia.column_cache.resize(0)
+        assert column._data is None
+        assert column.get_value("Gal1", provenance='definition') == value
+    finally:
+        fidia.column_cache.resize(original_max_bytes)
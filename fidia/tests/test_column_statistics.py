@@ -0,0 +1,89 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import fidia
+from fidia.archive.example_archive import ExampleArchive
+from fidia.column.column_statistics import ColumnStatistics, estimate_distinct
+from fidia.dal import NumpyFileStore
+
+MASS_COLUMN = "ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"
+
+
+def test_statistics_of_numeric_series():
+    series = pd.Series([3.0, np.nan, 1.0, 7.0, 5.0, np.nan], index=["a", "b", "c", "d", "e", "f"])
+    stats = ColumnStatistics.from_series(series, chunk_size=2, bins=3)
+
+    assert stats.count == 6
+    assert stats.null_count == 2
+    assert (stats.min, stats.max) == (1.0, 7.0)
+    assert stats.distinct == 4
+    assert stats.histogram['counts'] == [1, 1, 2]
+    assert [(c['min'], c['max'], c['null_count']) for c in stats.chunks] == [
+        (3.0, 3.0, 1), (1.0, 7.0, 0), (5.0, 5.0, 1)]
+
+    assert stats.may_match('>', 6)
+    assert not stats.may_match('>', 7)
+    assert not stats.may_match('==', 0)
+    assert stats.may_match('!=', 0)
+    assert [c['start'] for c in stats.matching_chunks('>=', 4)] == [2, 4]
+
+    # All null columns can't match anything.
+    assert not ColumnStatistics.from_series(pd.Series([np.nan, np.nan])).may_match('!=', 0)
+
+
+def test_statistics_of_string_series():
+    stats = ColumnStatistics.from_series(pd.Series(["b", "a", None, "c"]))
+    assert (stats.min, stats.max) == ("a", "c")
+    assert stats.histogram is None
+    assert not stats.may_match('<', "a")
+
+
+def test_distinct_estimate():
+    values = pd.Series(np.arange(100000) % 20000)
+    estimate = estimate_distinct(values)
+    assert abs(estimate - 20000) / 20000 < 0.15
+    assert estimate_distinct(pd.Series(np.arange(50))) == 50
+
+
+def test_statistics_recorded_at_ingestion(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns[MASS_COLUMN]
+    expected = column.get_array(provenance='definition')
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_column(column)
+        assert os.path.exists(os.path.join(file_store.get_directory_for_column_id(column.id),
+                                           file_store.statistics_file_name))
+
+        fidia.dal_host.layers.insert(0, file_store)
+        try:
+            stats = column.statistics()
+        finally:
+            fidia.dal_host.layers.remove(file_store)
+
+    assert stats.count == len(expected)
+    assert stats.min == pytest.approx(expected.min())
+    assert stats.max == pytest.approx(expected.max())
+
+    # Without the DAL, the statistics are computed from the data.
+    assert column.statistics().max == pytest.approx(stats.max)
@@ -0,0 +1,147 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# noinspection PyUnresolvedReferences
+import pytest
+
+import os
+import tempfile
+
+import numpy as np
+
+import fidia
+from fidia.archive.example_archive import ExampleArchive
+from fidia.dal import DataAccessLayerHost, MemoryCache, AccessLog, replay_access_log, DALDataNotAvailable
+from fidia.dal.access_log import read_access_log, access_counts
+
+IMAGE_COLUMN = "ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"
+CUBE_COLUMN = "ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"
+
+
+@pytest.yield_fixture
+def log_path():
+    with tempfile.TemporaryDirectory() as tempdir:
+        yield os.path.join(tempdir, "access.log")
+
+
+def test_access_log_round_trip(log_path):
+    access_log = AccessLog(log_path)
+    access_log.record(IMAGE_COLUMN, "Gal1")
+    access_log.record(CUBE_COLUMN, "Gal2")
+    access_log.record(IMAGE_COLUMN, "Gal2")
+    access_log.close()
+
+    # A second session appends to the same log.
+    access_log = AccessLog(log_path)
+    access_log.record(CUBE_COLUMN, "Gal1")
+    access_log.close()
+
+    assert list(read_access_log(log_path)) == [
+        (IMAGE_COLUMN, "Gal1"), (CUBE_COLUMN, "Gal2"), (IMAGE_COLUMN, "Gal2"), (CUBE_COLUMN, "Gal1")]
+
+    # Each ColumnID is only written once per session.
+    with open(log_path) as f:
+        assert f.read().count(IMAGE_COLUMN) == 1
+
+
+def test_memory_cache_evicts_least_recently_used(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns[IMAGE_COLUMN]
+
+    cache = MemoryCache(max_bytes=200)
+    assert cache.cache_value(column, "Gal1", np.zeros(10))
+    assert cache.cache_value(column, "Gal2", np.zeros(10))
+    cache.get_value(column, "Gal1")
+    assert cache.cache_value(column, "Gal3", np.zeros(10))
+
+    assert cache.current_bytes == 160
+    cache.get_value(column, "Gal1")
+    with pytest.raises(DALDataNotAvailable):
+        cache.get_value(column, "Gal2")
+
+    # Data larger than the cache is not added.
+    assert not cache.cache_value(column, "Gal4", np.zeros(100))
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_warm_up_from_access_log(test_data_dir, log_path, background):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    host = DataAccessLayerHost({})
+    host.layers = [MemoryCache(max_bytes=10 * 1024 ** 2)]
+    host.enable_access_log(log_path)
+    try:
+        for object_id in ["Gal1", "Gal2", "Gal2", "Gal2", "Gal4", "Gal4"]:
+            with pytest.raises(DALDataNotAvailable):
+                host.search_for_cell(ar.columns[IMAGE_COLUMN], object_id)
+        host.access_log.flush()
+    finally:
+        host.disable_access_log()
+
+    counts = access_counts(log_path)
+    assert counts[(IMAGE_COLUMN, "Gal2")] == 3
+
+    # After a "restart", warm the cache with up to two images.
+    image_bytes = ar.columns[IMAGE_COLUMN].get_value("Gal1").nbytes
+    cache = MemoryCache(max_bytes=10 * 1024 ** 2)
+    new_host = DataAccessLayerHost({})
+    new_host.layers = [cache]
+    thread = new_host.warm_up(log_path, max_bytes=2 * image_bytes, columns=ar.columns, background=background)
+    if background:
+        thread.join()
+
+    assert len(cache) == 2
+    for object_id in ["Gal2", "Gal4"]:
+        assert np.array_equal(new_host.search_for_cell(ar.columns[IMAGE_COLUMN], object_id),
+                              ar.columns[IMAGE_COLUMN].get_value(object_id))
+
+
+def test_replay_access_log(test_data_dir, log_path):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    access_log = AccessLog(log_path)
+    for object_id in ar.contents:
+        access_log.record(CUBE_COLUMN, object_id)
+    access_log.close()
+
+    result = replay_access_log(log_path, columns=ar.columns)
+    assert result['requests'] == len(ar.contents)
+    # Gal3 has no spectral cube in the test data.
+    assert result['not_available'] == 1
+    assert result['seconds'] > 0
+
+
+def test_requests_logged_when_dal_skipped(test_data_dir, log_path):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    image_column = ar.columns[IMAGE_COLUMN]
+    mass_column = ar.columns["ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"]
+
+    layers = fidia.dal_host.layers
+    fidia.dal_host.layers = []
+    fidia.dal_host.enable_access_log(log_path)
+    try:
+        # The DAL can't respond, so it is skipped after the first request
+        # for each column, but all requests are still logged.
+        for _ in range(3):
+            image_column.get_value("Gal1")
+            mass_column.get_array()
+        fidia.dal_host.access_log.flush()
+    finally:
+        fidia.dal_host.disable_access_log()
+        fidia.dal_host.layers = layers
+
+    counts = access_counts(log_path)
+    assert counts[(IMAGE_COLUMN, "Gal1")] == 3
+    for object_id in mass_column.contents:
+        assert counts[(mass_column.id, object_id)] == 3
@@ -212,3 +212,512 @@ def test_data_volumne(test_data_dir):
     # warnings.warn(UserWarning("NumpyFileStore disk usage ratio original:ingest = %s" % (original_size/ingest_size)))
 
 
+
+def test_shard_contents_partitions_objects():
+    from fidia.dal import shard_contents
+
+    contents = ["Gal{}".format(i) for i in range(50)]
+    shards = [shard_contents(contents, 4, i) for i in range(4)]
+
+    assert sorted(sum(shards, [])) == sorted(contents)
+    for i, shard in enumerate(shards):
+        for j, other in enumerate(shards):
+            if i != j:
+                assert set(shard).isdisjoint(other)
+
+    # Assignment does not depend on the order of the contents.
+    assert set(shard_contents(list(reversed(contents)), 4, 2)) == set(shards[2])
+
+
+def test_sharded_ingestion_matches_full_ingestion(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as sharded_dir:
+        NumpyFileStore(full_dir).ingest_archive(ar)
+
+        sharded_store = NumpyFileStore(sharded_dir)
+        staging_paths = [sharded_store.ingest_archive_shard(ar, 3, i) for i in range(3)]
+        for path in staging_paths:
+            assert os.path.isdir(path)
+
+        # Lock files and leftover temporary files are not merged.
+        cube_dir = os.path.join(staging_paths[0], os.path.relpath(
+            sharded_store.get_directory_for_column_id(
+                ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"].id),
+            sharded_dir))
+        for filename in ("cell.npy.LOCK", "cell.npy.tmp-1-2"):
+            open(os.path.join(cube_dir, filename), 'w').close()
+
+        sharded_store.merge_staged_shards()
+        for path in staging_paths:
+            assert not os.path.exists(path)
+        for dirpath, dirnames, filenames in os.walk(sharded_dir):
+            assert not any(filename.startswith("cell.npy.") for filename in filenames)
+
+        full_store = NumpyFileStore(full_dir)
+        for column in ar.columns.values():
+            for object_id in ar.contents:
+                try:
+                    expected = full_store.get_value(column, object_id)
+                except Exception:
+                    continue
+                actual = sharded_store.get_value(column, object_id)
+                if isinstance(expected, np.ndarray):
+                    assert np.array_equal(actual, expected)
+                elif expected == expected:
+                    # (skip NaN entries, which never compare equal)
+                    assert actual == expected
+
+
+def test_availability_index_records_missing_data(test_data_dir, monkeypatch):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    cube_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+    sfr_column = ar.columns["ExampleArchive:FITSBinaryTableColumn:sfr_table.fits[1].data[ID->SFR]:1"]
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_archive(ar)
+
+        # The test data has no spectral cube or SFR for Gal3.
+        for column in (cube_column, sfr_column):
+            assert file_store.has_data(column, "Gal1") is True
+            assert file_store.has_data(column, "Gal3") is False
+            assert file_store.has_data(column, "NotAGalaxy") is None
+
+        # A new instance reads the index back from disk.
+        assert NumpyFileStore(dal_data_dir).has_data(cube_column, "Gal3") is False
+
+        fidia.dal_host.layers.append(file_store)
+        try:
+            # The original definition must not be consulted for data known to be missing.
+            def fail(*args, **kwargs):
+                raise AssertionError("Original data should not be read")
+            monkeypatch.setattr(cube_column, '_object_getter', fail)
+            with pytest.raises(fidia.exceptions.DataNotAvailable):
+                cube_column.get_value("Gal3")
+            with pytest.raises(fidia.dal.DALDataMissing):
+                fidia.dal_host.search_for_cell(sfr_column, "Gal3")
+        finally:
+            fidia.dal_host.layers.remove(file_store)
+
+
+def test_ingest_column_reads_only_contents(test_data_dir, monkeypatch):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    requested = []
+    keyword_values = fidia.column.column_definitions.keyword_values
+
+    def recording_keyword_values(paths, *args, **kwargs):
+        requested.append(list(paths))
+        return keyword_values(paths, *args, **kwargs)
+    monkeypatch.setattr(fidia.column.column_definitions, 'keyword_values', recording_keyword_values)
+
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[NAXIS]:1"]
+    shard = fidia.dal.shard_contents(ar.contents, 3, 0)
+
+    with tempfile.TemporaryDirectory() as sharded_dir:
+        file_store = NumpyFileStore(sharded_dir)
+        file_store.ingest_column(column, contents=shard)
+
+        assert requested == [shard]
+        for object_id in shard:
+            assert file_store.get_value(column, object_id) == 2
+
+
+def test_sharded_ingestion_merges_availability(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    cube_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+
+    with tempfile.TemporaryDirectory() as sharded_dir:
+        sharded_store = NumpyFileStore(sharded_dir)
+        for i in range(3):
+            sharded_store.ingest_archive_shard(ar, 3, i)
+        sharded_store.merge_staged_shards()
+
+        store = NumpyFileStore(sharded_dir)
+        for object_id in ar.contents:
+            assert store.has_data(cube_column, object_id) is (object_id != "Gal3")
+
+
+def test_write_back_populates_store(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    image_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+    mass_column = ar.columns["ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"]
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        fidia.dal_host.enable_write_back(file_store)
+        try:
+            image = image_column.get_value("Gal1")
+            mass = mass_column.get_value("Gal2")
+            fidia.dal_host.flush_write_back()
+        finally:
+            fidia.dal_host.disable_write_back()
+
+        assert np.array_equal(file_store.get_value(image_column, "Gal1"), image)
+        assert file_store.get_value(mass_column, "Gal2") == mass
+
+        # Only the data requested was written back for array columns.
+        with pytest.raises(fidia.dal.DALDataNotAvailable):
+            file_store.get_value(image_column, "Gal2")
+
+        # Written-back data is recorded as it is written, not held until the
+        # end of an ingestion.
+        assert file_store.has_data(image_column, "Gal1") is True
+        assert file_store.has_data(mass_column, "Gal2") is True
+        assert not file_store._ingested_objects
+        assert not file_store._ingested_cells
+
+
+def test_write_back_collects_scalar_values(test_data_dir, monkeypatch):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[NAXIS]:1"]
+    monkeypatch.setattr(fidia.dal_host, 'write_back_batch_size', 2)
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_column_with_data(column, [2] * len(column.contents))
+        fidia.dal_host.enable_write_back(file_store)
+        try:
+            generation = fidia.dal_host.generation
+            fidia.dal_host.write_back(column, "Gal1", 3)
+            fidia.dal_host.flush_write_back(timeout=0)
+            # Not written until the batch is complete (or flushed).
+            assert fidia.dal_host.generation == generation
+            fidia.dal_host.write_back(column, "Gal2", 4)
+            fidia.dal_host.write_back(column, "Extra", 5)
+            fidia.dal_host.flush_write_back()
+            # One change for the complete batch, and one for the remainder.
+            assert fidia.dal_host.generation == generation + 2
+        finally:
+            fidia.dal_host.disable_write_back()
+
+        assert file_store.get_value(column, "Gal1") == 3
+        assert file_store.get_value(column, "Gal2") == 4
+        assert file_store.get_value(column, "Extra") == 5
+        assert file_store.get_value(column, "Gal3") == 2
+        assert file_store.read_series(file_store.get_directory_for_column_id(column.id)).dtype == np.int64
+
+        # Written-back objects are recorded in the availability index.
+        assert file_store.has_data(column, "Extra") is True
+        assert NumpyFileStore(dal_data_dir).has_data(column, "Gal1") is True
+
+
+def test_ingest_object_with_data_updates_scalar_column(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[NAXIS]:1"]
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_object_with_data(column, "Gal1", 2)
+        file_store.ingest_object_with_data(column, "Gal2", 3)
+
+        assert file_store.get_value(column, "Gal1") == 2
+        assert file_store.get_value(column, "Gal2") == 3
+
+
+def _assert_stores_match(ar, expected_store, actual_store):
+    for column in ar.columns.values():
+        for object_id in ar.contents:
+            try:
+                expected = expected_store.get_value(column, object_id)
+            except (fidia.dal.DALCantRespond, fidia.dal.DALDataNotAvailable):
+                continue
+            actual = actual_store.get_value(column, object_id)
+            if isinstance(expected, np.ndarray):
+                assert np.array_equal(actual, expected)
+            elif expected == expected:
+                assert actual == expected
+
+
+def test_fan_out_layout(test_data_dir):
+    from fidia.dal.numpy_file_store import hash_prefixes
+
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    image_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+
+    with tempfile.TemporaryDirectory() as flat_dir, tempfile.TemporaryDirectory() as fan_out_dir:
+        flat_store = NumpyFileStore(flat_dir)
+        flat_store.ingest_archive(ar)
+
+        fan_out_store = NumpyFileStore(fan_out_dir, fan_out=2)
+        fan_out_store.ingest_archive(ar)
+
+        data_dir = fan_out_store.get_directory_for_column_id(image_column.id)
+        assert os.path.exists(os.path.join(data_dir, *(hash_prefixes("Gal1", 2) + ["Gal1.npy"])))
+        assert not os.path.exists(os.path.join(data_dir, "Gal1.npy"))
+
+        # The layout is recorded, and used by later instances.
+        assert NumpyFileStore(fan_out_dir).fan_out == 2
+        with pytest.raises(fidia.dal.DALException):
+            NumpyFileStore(fan_out_dir, fan_out=1)
+
+        _assert_stores_match(ar, flat_store, NumpyFileStore(fan_out_dir))
+        assert (sorted(str(c) for c, _ in fan_out_store.stored_columns()) ==
+                sorted(str(c) for c, _ in flat_store.stored_columns()))
+
+
+def test_migrate_layout(test_data_dir):
+    from fidia.dal.numpy_file_store import main
+
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    image_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+
+    with tempfile.TemporaryDirectory() as reference_dir, tempfile.TemporaryDirectory() as dal_data_dir:
+        reference_store = NumpyFileStore(reference_dir)
+        reference_store.ingest_archive(ar)
+        NumpyFileStore(dal_data_dir).ingest_archive(ar)
+
+        # Adding fan-out to a store with data requires a migration.
+        with pytest.raises(fidia.dal.DALException):
+            NumpyFileStore(dal_data_dir, fan_out=2)
+
+        main([dal_data_dir, "2"])
+        store = NumpyFileStore(dal_data_dir)
+        assert store.fan_out == 2
+        assert store.previous_fan_out is None
+        data_dir = store.get_directory_for_column_id(image_column.id)
+        assert not any(f.endswith(".npy") for f in os.listdir(data_dir))
+        _assert_stores_match(ar, reference_store, store)
+
+        store.migrate_layout(0)
+        assert os.path.exists(os.path.join(data_dir, "Gal1.npy"))
+        assert sorted(os.listdir(data_dir)) == sorted(os.listdir(reference_store.get_directory_for_column_id(image_column.id)))
+        _assert_stores_match(ar, reference_store, NumpyFileStore(dal_data_dir))
+
+
+@pytest.mark.parametrize('dictionary_threshold', [0, 1])
+def test_string_column_round_trip(dictionary_threshold):
+    import pandas as pd
+    from fidia.dal.string_column import StringColumn, write_string_column
+
+    series = pd.Series(["RA---TAN", np.nan, "DEC--TAN", "RA---TAN", "", "été"],
+                       index=["Gal5", "Gal2", "Gal10", "Gal1", "Gal3", "Gal4"])
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, "strings.strcol")
+        write_string_column(series, path, dictionary_threshold=dictionary_threshold)
+
+        strings = StringColumn.open(path)
+        assert strings.dictionary_encoded is (dictionary_threshold == 1)
+        assert len(strings) == len(series)
+        for object_id, value in series.items():
+            if isinstance(value, str):
+                assert strings[object_id] == value
+            else:
+                assert np.isnan(strings[object_id])
+        assert "Gal6" not in strings
+        with pytest.raises(KeyError):
+            strings["Gal6"]
+
+        assert strings.to_series().sort_index().equals(series.sort_index())
+
+
+def test_string_columns_stored_compactly(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[CTYPE1]:1"]
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        import pandas as pd
+        original = pd.Series({object_id: column.get_value(object_id, provenance='definition')
+                              for object_id in ar.contents})
+
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_column_with_data(column, original)
+
+        data_dir = file_store.get_directory_for_column_id(column.id)
+        assert os.listdir(data_dir).count("string_series.strcol") == 1
+        assert "pandas_series.pkl" not in os.listdir(data_dir)
+
+        for object_id in ar.contents:
+            assert file_store.get_value(column, object_id) == original[object_id]
+
+
+def test_preview_pyramid(test_data_dir):
+    from fidia.utilities import downsample_to_size
+
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    image_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+    cube_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir, preview_levels=2)
+        file_store.ingest_archive(ar)
+
+        data_dir = file_store.get_directory_for_column_id(image_column.id)
+        assert os.path.exists(os.path.join(file_store.preview_directory(data_dir, 2), "Gal1.npy"))
+        assert all(".npy" not in str(column_id) for column_id, _ in file_store.stored_columns())
+        assert {object_id for object_id, _ in file_store.iter_cells(data_dir)} == set(ar.contents)
+
+        full = image_column.get_value("Gal1", provenance='definition')
+        for max_size in (200, 100, 50, 30):
+            preview = file_store.get_preview(image_column, "Gal1", max_size)
+            assert max(preview.shape) <= max_size
+            assert np.allclose(preview, downsample_to_size(full, max_size))
+
+        # Only the spatial axes of the cube are reduced.
+        assert file_store.get_preview(cube_column, "Gal1", 10).shape == (149, 7, 5)
+
+        # The column uses the pyramid when available, and otherwise downsamples the full data.
+        without_dal = image_column.get_preview("Gal2", 50)
+        fidia.dal_host.layers.append(file_store)
+        try:
+            with_dal = image_column.get_preview("Gal2", 50)
+        finally:
+            fidia.dal_host.layers.remove(file_store)
+        assert with_dal.shape == without_dal.shape == (50, 50)
+        assert np.allclose(with_dal, without_dal)
+
+        # The levels stored are recorded, so other instances use the pyramid too.
+        reader = NumpyFileStore(dal_data_dir)
+        assert reader.stored_preview_levels == 2
+        read_directories = []
+        read_cell = reader._read_cell
+
+        def recording_read_cell(data_dir, *args, **kwargs):
+            read_directories.append(data_dir)
+            return read_cell(data_dir, *args, **kwargs)
+        reader._read_cell = recording_read_cell
+        assert np.allclose(reader.get_preview(image_column, "Gal1", 50),
+                           file_store.get_preview(image_column, "Gal1", 50))
+        assert read_directories[-1] == reader.preview_directory(data_dir, 2)
+
+
+def test_search_for_cell_cant_respond(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+
+    host = fidia.dal.DataAccessLayerHost({})
+    host.layers = []
+    with pytest.raises(fidia.dal.DALCantRespond):
+        host.search_for_cell(column, "Gal1")
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        host.layers.append(NumpyFileStore(dal_data_dir))
+        with pytest.raises(fidia.dal.DALCantRespond):
+            host.search_for_cell(column, "Gal1")
+
+
+def test_column_caches_dal_routing(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+
+    class CountingStore(NumpyFileStore):
+        requests = 0
+
+        def get_value(self, column, object_id):
+            CountingStore.requests += 1
+            return super().get_value(column, object_id)
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = CountingStore(dal_data_dir)
+        fidia.dal_host.layers.insert(0, file_store)
+        try:
+            # The store can't respond for the column, so it is asked only once.
+            expected = column.get_value("Gal1")
+            column.get_value("Gal2")
+            assert CountingStore.requests == 1
+
+            # Adding data to the store invalidates the cached routing.
+            file_store.ingest_column(column)
+            assert np.array_equal(column.get_value("Gal1"), expected)
+            assert CountingStore.requests == 2
+        finally:
+            fidia.dal_host.layers.remove(file_store)
+
+    # As does changing the layers of the DAL.
+    generation = fidia.dal_host.generation
+    fidia.dal_host.layers = list(fidia.dal_host.layers)
+    assert fidia.dal_host.generation > generation
+
+
+def test_get_array_uses_dal(test_data_dir, monkeypatch):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    mass_column = ar.columns["ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"]
+    cube_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+    sfr_column = ar.columns["ExampleArchive:FITSBinaryTableColumn:sfr_table.fits[1].data[ID->SFR]:1"]
+
+    expected_masses = mass_column.get_array(provenance='definition')
+    expected_cubes = cube_column.get_array(provenance='definition')
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_column(mass_column)
+        # Only some objects of the array column are ingested.
+        file_store.ingest_column(cube_column, contents=["Gal1", "Gal2", "Gal3"])
+
+        def original_array_getter(**kwargs):
+            raise AssertionError("Original data should not be used")
+
+        original_object_getter = cube_column._object_getter
+        requested = []
+
+        def counting_object_getter(object_id, **kwargs):
+            requested.append(object_id)
+            return original_object_getter(object_id, **kwargs)
+
+        monkeypatch.setattr(mass_column, '_array_getter', original_array_getter)
+        monkeypatch.setattr(cube_column, '_object_getter', counting_object_getter)
+
+        fidia.dal_host.layers.insert(0, file_store)
+        try:
+            # The patched getters can't be saved to the mapping database.
+            with fidia.mappingdb_session.no_autoflush:
+                masses = mass_column.get_array()
+                assert list(masses.index) == list(expected_masses.index)
+                assert np.allclose(masses.values, expected_masses.values)
+
+                cubes = cube_column.get_array(workers=1)
+                # Gal3 is recorded as having no data, so only Gal4 and Gal5 are read from the original data.
+                assert sorted(requested) == ["Gal4", "Gal5"]
+                assert list(cubes.index) == list(expected_cubes.index)
+                for object_id in cubes.index:
+                    assert np.array_equal(cubes[object_id], expected_cubes[object_id])
+
+                with pytest.raises(fidia.exceptions.DataNotAvailable):
+                    sfr_column.get_array(provenance='dal')
+        finally:
+            fidia.dal_host.layers.remove(file_store)
+
+
+def test_cell_index_describes_array_cells(test_data_dir, monkeypatch):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+    expected = {object_id: column.get_value(object_id) for object_id in ["Gal1", "Gal2", "Gal4"]}
+
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_column(column, contents=["Gal1", "Gal2"])
+        assert os.path.exists(os.path.join(file_store.get_directory_for_column_id(column.id),
+                                           file_store.cell_index_file_name))
+        # Cells added outside of a complete ingestion are described from their file header.
+        file_store.ingest_object_with_data(column, "Gal4", expected["Gal4"])
+
+        metadata = NumpyFileStore(dal_data_dir).get_cell_metadata(column, ["Gal4", "Gal1", "Gal5", "Gal2"])
+        assert list(metadata.index) == ["Gal4", "Gal1", "Gal2"]
+        for object_id, row in metadata.iterrows():
+            assert row['shape'] == expected[object_id].shape
+            assert row['dtype'] == expected[object_id].dtype.str
+            assert row['nbytes'] == expected[object_id].nbytes
+
+        def original_object_getter(object_id, **kwargs):
+            raise AssertionError("Original data should not be used")
+
+        monkeypatch.setattr(column, '_object_getter', original_object_getter)
+        fidia.dal_host.layers.insert(0, file_store)
+        try:
+            # The patched getter can't be saved to the mapping database.
+            with fidia.mappingdb_session.no_autoflush:
+                metadata = column.cell_metadata(["Gal2", "Gal1"])
+                assert list(metadata.index) == ["Gal2", "Gal1"]
+                assert column.stack(["Gal2", "Gal1"]).shape == (2,) + expected["Gal1"].shape
+        finally:
+            fidia.dal_host.layers.remove(file_store)
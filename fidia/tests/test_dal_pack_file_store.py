@@ -0,0 +1,108 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# noinspection PyUnresolvedReferences
+import pytest
+
+import os
+import mmap
+import tempfile
+import configparser
+
+import numpy as np
+
+import fidia
+import fidia.local_config
+from fidia.archive.example_archive import ExampleArchive
+from fidia.utilities import deindent_tripple_quoted_string
+from fidia.dal import NumpyFileStore, PackFileStore, DataAccessLayerHost, DALCantRespond
+
+
+@pytest.yield_fixture(scope='module', params=[False, True], ids=["uncompressed", "compressed"])
+def packed_store(request, test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir, use_compression=request.param)
+        file_store.ingest_archive(ar)
+
+        pack_path = os.path.join(dal_data_dir, "example.fidiapack")
+        file_store.export_pack(pack_path)
+
+        yield ar, file_store, pack_path
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_pack_file_matches_file_store(packed_store, use_mmap):
+    ar, file_store, pack_path = packed_store
+
+    pack_store = PackFileStore(pack_path, use_mmap=use_mmap)
+
+    for column in ar.columns.values():
+        for object_id in ar.contents:
+            try:
+                expected = file_store.get_value(column, object_id)
+            except Exception:
+                continue
+            actual = pack_store.get_value(column, object_id)
+            if isinstance(expected, np.ndarray):
+                assert actual.dtype == expected.dtype
+                assert np.array_equal(actual, expected)
+            elif expected == expected:
+                assert actual == expected
+
+
+def test_pack_file_arrays_are_read_only_views(packed_store):
+    ar, file_store, pack_path = packed_store
+    column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_red_image.fits[0]:1"]
+
+    pack_store = PackFileStore(pack_path)
+    image = pack_store.get_value(column, "Gal1")
+    assert not image.flags.writeable
+    with pytest.raises(ValueError):
+        image[0, 0] = 0
+    if not pack_store._compressed:
+        # The data is not copied out of the memory mapped file.
+        assert isinstance(image.base, mmap.mmap)
+
+    # Arrays remain usable after the store is discarded.
+    expected = image.copy()
+    del pack_store
+    assert np.array_equal(image, expected)
+
+
+def test_pack_file_unknown_column(packed_store):
+    ar, file_store, pack_path = packed_store
+
+    class UnknownColumn:
+        id = "ExampleArchive:FITSDataColumn:unknown[0]:1"
+
+    with pytest.raises(DALCantRespond):
+        PackFileStore(pack_path).get_value(UnknownColumn(), "Gal1")
+
+
+def test_pack_file_store_from_config(packed_store):
+    ar, file_store, pack_path = packed_store
+
+    config = configparser.ConfigParser()
+    config.read_string(fidia.local_config.DEFAULT_CONFIG + deindent_tripple_quoted_string("""
+    [DAL-PackFileStore]
+    pack_path = {pack_path}
+    use_mmap = False
+    """.format(pack_path=pack_path)))
+
+    dal_host = DataAccessLayerHost(config)
+
+    assert len(dal_host.layers) == 1
+    assert isinstance(dal_host.layers[0], PackFileStore)
+    assert dal_host.layers[0].use_mmap is False
@@ -0,0 +1,157 @@
+# Copyright (c) Australian Astronomical Observatory (AAO), 2018.
+#
+# The Format Independent Data Interface for Astronomy (FIDIA), including this
+# file, is free software: you can redistribute it and/or modify it under the terms
+# of the GNU Affero General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# noinspection PyUnresolvedReferences
+import pytest
+
+import io
+import tempfile
+
+import numpy as np
+
+import fidia
+from fidia.archive.example_archive import ExampleArchive
+from fidia.dal import NumpyFileStore, RowBundleStore, DataAccessLayerHost, DALDataNotAvailable
+
+
+@pytest.yield_fixture(scope='module')
+def ingested_stores(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    with tempfile.TemporaryDirectory() as file_store_dir, tempfile.TemporaryDirectory() as bundle_dir:
+        file_store = NumpyFileStore(file_store_dir)
+        file_store.ingest_archive(ar)
+
+        bundle_store = RowBundleStore(bundle_dir)
+        bundle_store.ingest_archive(ar)
+
+        yield ar, file_store, bundle_store
+
+
+def assert_same_value(actual, expected):
+    if isinstance(expected, np.ndarray):
+        assert np.array_equal(actual, expected)
+    elif expected == expected:
+        # (NaN never compares equal)
+        assert actual == expected
+
+
+def test_row_bundle_store_matches_file_store(ingested_stores):
+    ar, file_store, bundle_store = ingested_stores
+
+    for column in ar.columns.values():
+        for object_id in ar.contents:
+            try:
+                expected = file_store.get_value(column, object_id)
+            except Exception:
+                continue
+            if not isinstance(expected, np.ndarray) and expected != expected:
+                with pytest.raises(DALDataNotAvailable):
+                    bundle_store.get_value(column, object_id)
+            else:
+                assert_same_value(bundle_store.get_value(column, object_id), expected)
+
+
+def test_row_bundle_get_values(ingested_stores):
+    ar, file_store, bundle_store = ingested_stores
+
+    columns = list(ar.columns.values())
+    values = bundle_store.get_values(columns, "Gal1")
+
+    assert len(values) == len(columns)
+    for column in columns:
+        assert_same_value(values[column.id], file_store.get_value(column, "Gal1"))
+
+
+def test_row_bundle_reingestion_replaces_values(ingested_stores):
+    ar, file_store, bundle_store = ingested_stores
+
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[NAXIS]:1"]
+    bundle_store.ingest_object_with_data(column, "Gal1", 7)
+    bundle_store.flush()
+    assert bundle_store.get_value(column, "Gal1") == 7
+
+    bundle_store.ingest_column(column)
+    assert bundle_store.get_value(column, "Gal1") == 2
+
+
+def test_host_search_for_cells(ingested_stores):
+    ar, file_store, bundle_store = ingested_stores
+
+    dal_host = DataAccessLayerHost({})
+    dal_host.layers = [bundle_store, file_store]
+
+    columns = list(ar.columns.values())
+    values = dal_host.search_for_cells(columns, "Gal2")
+    assert set(values.keys()) == {column.id for column in columns}
+
+
+def _count_records(path):
+    from fidia.dal.row_bundle_store import _iter_records, _index_offset
+    with open(path, 'rb') as fh:
+        return len(list(_iter_records(fh, _index_offset(fh))))
+
+
+def test_row_bundle_reingestion_compacts(ingested_stores):
+    ar, file_store, bundle_store = ingested_stores
+
+    path = bundle_store.bundle_path(ar.archive_id, "Gal1")
+    n_records = _count_records(path)
+
+    bundle_store.ingest_archive(ar)
+    assert _count_records(path) == n_records
+    test_row_bundle_get_values(ingested_stores)
+
+
+def test_row_bundle_repeated_updates_compact(test_data_dir):
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[NAXIS]:1"]
+
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        bundle_store = RowBundleStore(bundle_dir)
+        for value in range(20):
+            bundle_store.ingest_object_with_data(column, "Gal1", value)
+            assert _count_records(bundle_store.bundle_path(ar.archive_id, "Gal1")) <= 2
+        bundle_store.flush()
+
+        assert _count_records(bundle_store.bundle_path(ar.archive_id, "Gal1")) == 1
+        value = bundle_store.get_value(column, "Gal1")
+        assert value == 19
+        # Values are returned as Python scalars.
+        assert type(value) is int
+
+
+def test_row_bundle_concurrent_appends(test_data_dir):
+    from concurrent.futures import ThreadPoolExecutor
+    from fidia.utilities import exclusive_file_lock
+    from fidia.dal.row_bundle_store import _read_index, _seal_bundle
+
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        bundle_store = RowBundleStore(bundle_dir)
+        path = bundle_store.bundle_path("Archive", "Gal1")
+
+        def append(i):
+            bundle_store._append_records(path, {"column-%d" % i: np.arange(1000) + i})
+            with exclusive_file_lock(path):
+                _seal_bundle(path)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(append, range(32)))
+
+        with open(path, 'rb') as fh:
+            index = _read_index(fh)
+            assert len(index) == 32
+            for i in range(32):
+                offset, length = index["column-%d" % i]
+                fh.seek(offset)
+                assert np.array_equal(np.load(io.BytesIO(fh.read(length))), np.arange(1000) + i)
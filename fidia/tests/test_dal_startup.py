@@ -50,4 +50,49 @@ def test_dal_creation_single_layer(dal_data_dir):
 
     print(dal_host)
 
-    # assert False
\ No newline at end of file
+    # assert False
+
+def test_dal_creation_with_write_back(dal_data_dir):
+    """Test that a layer can be designated for write-back in the configuration."""
+
+    config_text = fidia.local_config.DEFAULT_CONFIG + deindent_tripple_quoted_string("""
+    [DAL-NumpyFileStore]
+    base_path = {base_path}
+    write_back = True
+    """.format(base_path=dal_data_dir))
+
+    config = configparser.ConfigParser()
+    config.read_string(config_text)
+
+    dal_host = DataAccessLayerHost(config)
+
+    try:
+        assert len(dal_host.layers) == 1
+        assert dal_host.write_back_layer is dal_host.layers[0]
+    finally:
+        dal_host.disable_write_back()
+
+
+def test_dal_creation_with_host_options(dal_data_dir):
+    """Test the optional DALHost section of the configuration."""
+
+    log_path = os.path.join(dal_data_dir, "access.log")
+
+    config_text = fidia.local_config.DEFAULT_CONFIG + deindent_tripple_quoted_string("""
+    [DAL-MemoryCache]
+    max_bytes = 1000000
+
+    [DALHost]
+    access_log = {log_path}
+    """.format(log_path=log_path))
+
+    config = configparser.ConfigParser()
+    config.read_string(config_text)
+
+    dal_host = DataAccessLayerHost(config)
+
+    try:
+        assert dal_host.layers[0].max_bytes == 1000000
+        assert dal_host.access_log.path == log_path
+    finally:
+        dal_host.disable_access_log()
@@ -14,17 +14,23 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
 import tempfile
+import pickle
 
 import re
 
 # from . import generate_test_data as testdata
 import pytest
 
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
 import fidia
 from fidia.column.column_definitions import ColumnDefinition, FITSDataColumn, FITSBinaryTableColumn, CSVTableColumn, \
-    FITSHeaderColumn
-from fidia.column.columns import FIDIAColumn, ColumnID
+    FITSHeaderColumn, SQLColumn
+from fidia.column.columns import FIDIAColumn, ColumnID, ColumnIDDict
 from fidia import ArchiveDefinition
 
 # Pytest fixture 'test_data_dir' now session wide and stored in conftest.py
@@ -71,6 +77,44 @@ class TestColumnIDs:
         assert col1.replace(timestamp='latest') == col2
         assert col1 == col2.replace(timestamp='latest')
 
+    def test_column_ids_are_interned(self):
+        col1 = ColumnID.as_column_id("testArchive:FITSDataColumn:red_image:1")
+        col2 = ColumnID("testArchive:FITSDataColumn:red_image:1")
+        assert col1 is col2
+        assert ColumnID.as_column_id(col1) is col1
+        assert ColumnID.as_column_id(("testArchive", "FITSDataColumn", "red_image", "1")) is col1
+        assert pickle.loads(pickle.dumps(col1)) is col1
+
+    def test_column_id_replace(self):
+        col = ColumnID.as_column_id("testArchive:FITSDataColumn:red_image:1")
+        assert col.replace(timestamp='2') == "testArchive:FITSDataColumn:red_image:2"
+        assert col.replace(timestamp='2').timestamp == '2'
+        assert col.replace(archive_id=None, timestamp=None) == "FITSDataColumn:red_image"
+        with pytest.raises(ValueError):
+            col.replace(colour='red')
+
+    def test_column_id_dict_latest(self):
+        d = ColumnIDDict()
+        d["testArchive:FITSDataColumn:red_image:1"] = 1
+        d["testArchive:FITSDataColumn:red_image:10"] = 10
+        d["testArchive:FITSDataColumn:red_image:2"] = 2
+        d["testArchive:FITSDataColumn:blue_image:5"] = 5
+
+        assert d.latest_timestamp("testArchive:FITSDataColumn:red_image:latest") == '10'
+        assert list(d.timestamps("testArchive:FITSDataColumn:red_image:1")) == ['1', '2', '10']
+        assert d["testArchive:FITSDataColumn:red_image:latest"] == 10
+        assert d["testArchive:FITSDataColumn:blue_image:latest"] == 5
+        assert all(isinstance(key, ColumnID) for key in d)
+
+        del d["testArchive:FITSDataColumn:red_image:10"]
+        assert d["testArchive:FITSDataColumn:red_image:latest"] == 2
+        d.pop("testArchive:FITSDataColumn:blue_image:5")
+        with pytest.raises(KeyError):
+            d["testArchive:FITSDataColumn:blue_image:latest"]
+        d.clear()
+        with pytest.raises(KeyError):
+            d["testArchive:FITSDataColumn:red_image:latest"]
+
 
 class TestColumnDefs:
 
@@ -179,6 +223,48 @@ class TestFITSBinaryTableColumn:
         data = fits_binary_table_column.get_value('Gal1')
         assert isinstance(data, (int, float))
 
+    def test_columns_share_table(self, test_data_dir):
+        from astropy.io import fits
+        from fidia.column.fits_tables import read_table
+
+        path = os.path.join(test_data_dir, "stellar_masses.fits")
+        mass = FITSBinaryTableColumn("stellar_masses.fits", 1, 'StellarMass', 'ID').array_getter(test_data_dir)
+        error = FITSBinaryTableColumn("stellar_masses.fits", 1, 'StellarMassError', 'ID').array_getter(test_data_dir)
+
+        table = read_table(path, 1)
+        assert read_table(path, "1") is table
+        assert mass.index is error.index
+        assert list(mass.index) == ["Gal1", "Gal2", "Gal3", "Gal4", "Gal5"]
+        assert mass.dtype.isnative
+        # The data is not copied from the table, which can't be modified.
+        assert np.shares_memory(mass.values, table.column('StellarMass'))
+        assert not table.column('StellarMass').flags.writeable
+        assert np.array_equal(mass.values, fits.getdata(path, 1)['StellarMass'])
+
+    def test_table_cache_limited_by_size(self, test_data_dir, tmpdir, monkeypatch):
+        import shutil
+        from fidia.column import fits_tables
+
+        fits_tables.clear_table_cache()
+        path = os.path.join(test_data_dir, "stellar_masses.fits")
+        copy = str(tmpdir.join("stellar_masses.fits"))
+        shutil.copy(path, copy)
+
+        table = fits_tables.read_table(path, 1)
+        table.column('StellarMass')
+        monkeypatch.setattr(fits_tables, 'TABLE_CACHE_BYTES', table.nbytes)
+        assert fits_tables.read_table(path, 1) is table
+
+        # Reading another table exceeds the limit, so the least recently used is discarded.
+        other = fits_tables.read_table(copy, 1)
+        assert fits_tables.read_table(copy, 1) is other
+        assert fits_tables.read_table(path, 1) is not table
+
+        # The table most recently read is kept even if larger than the limit.
+        monkeypatch.setattr(fits_tables, 'TABLE_CACHE_BYTES', 0)
+        assert fits_tables.read_table(copy, 1) is fits_tables.read_table(copy, 1)
+        fits_tables.clear_table_cache()
+
 class TestFITSHeaderColumn:
 
     @pytest.fixture
@@ -208,6 +294,142 @@ class TestCSVTableColumn:
         data = csv_table_column.get_value('Gal1')
         assert isinstance(data, (int, float))
 
+    def test_columns_share_parse(self, test_data_dir):
+        from astropy.io import ascii
+        from fidia.column.csv_tables import read_csv_table
+
+        sfr = CSVTableColumn("sfr_table.csv", 'SFR', 'ID', "#").array_getter(test_data_dir)
+        sfr_err = CSVTableColumn("sfr_table.csv", 'SFR_ERR', 'ID', "#").array_getter(test_data_dir)
+        path = os.path.join(test_data_dir, "sfr_table.csv")
+        assert read_csv_table(path, "#") is read_csv_table(path, "#")
+        assert sfr.index is sfr_err.index
+
+        expected = ascii.read(path, format="csv", comment="#")
+        assert list(sfr.index) == list(expected['ID'])
+        assert np.array_equal(sfr.values, expected['SFR'].data)
+        assert np.array_equal(sfr_err.values, expected['SFR_ERR'].data)
+
+    def test_parse_csv_matches_astropy(self, tmpdir):
+        from astropy.io import ascii
+        from fidia.column.csv_tables import parse_csv
+
+        path = str(tmpdir.join("table.csv"))
+        with open(path, "w") as f:
+            f.write("# A comment\nID,count,value,name\n1,3,0.5,\"a, b\"\n# Another comment\n2,4,1e-3,c\n")
+        expected = ascii.read(path, format="csv", comment="#")
+        for comment in ("#", "^#"):
+            table = parse_csv(path, comment)
+            assert list(table.columns) == expected.colnames
+            for name in expected.colnames:
+                assert list(table[name]) == list(expected[name])
+            assert table['count'].dtype.kind == expected['count'].dtype.kind
+
+
+@pytest.mark.parametrize('reader', ['per_column', 'shared'])
+def test_csv_column_benchmark(benchmark, tmpdir, reader):
+    """Compare parsing a catalog for each of its columns (as before) with one shared parse.
+
+    Both use the same reader, so the difference is only the number of parses.
+
+    """
+    from astropy.io import ascii
+    from fidia.column.csv_tables import clear_csv_cache
+
+    n_rows = 20000
+    rows = np.random.RandomState(1).rand(n_rows, 4)
+    with open(str(tmpdir.join("catalog.csv")), "w") as f:
+        f.write("# Benchmark catalog\nID,A,B,C,D\n")
+        for i, row in enumerate(rows):
+            f.write("Gal%d,%r,%r,%r,%r\n" % ((i,) + tuple(row)))
+    columns = [CSVTableColumn("catalog.csv", name, 'ID', "#") for name in "ABCD"]
+
+    def per_column():
+        path = str(tmpdir.join("catalog.csv"))
+        result = []
+        for column in columns:
+            table = ascii.read(path, format="csv", comment="#")
+            result.append(pd.Series(table[column.column_name].data, index=table['ID'].data, copy=True))
+        return result
+
+    def shared():
+        clear_csv_cache()
+        return [column.array_getter(str(tmpdir)) for column in columns]
+
+    benchmark.group = "CSVTableColumn"
+    result = benchmark(per_column if reader == 'per_column' else shared)
+    for i, series in enumerate(result):
+        assert np.array_equal(series.values, rows[:, i])
+
+
+class TestSQLColumn:
+
+    @pytest.fixture
+    def sql_archive(self, tmpdir):
+        import sqlite3
+        database_path = str(tmpdir.join("catalog.sqlite"))
+        with sqlite3.connect(database_path) as connection:
+            connection.execute("CREATE TABLE masses (name TEXT, mass REAL, n_spectra INTEGER)")
+            connection.executemany("INSERT INTO masses VALUES (?, ?, ?)",
+                                   [("Gal%d" % i, float(i), i if i != 3 else None) for i in range(1, 6)])
+
+        class SQLArchive(ArchiveDefinition):
+            archive_type = fidia.DatabaseArchive
+            is_persisted = False
+
+            def __init__(self, **kwargs):
+                super(SQLArchive, self).__init__(**kwargs)
+                self.contents = ["Gal1", "Gal2", "Gal3", "Gal6"]
+                self.archive_id = 'SQLArchive'
+                self.column_definitions = fidia.ColumnDefinitionList([
+                    ("mass", SQLColumn("SELECT name AS id, mass AS data FROM masses")),
+                    ("n_spectra", SQLColumn("SELECT name AS id, n_spectra AS data FROM masses", dtype="int64"))
+                ])
+
+        yield SQLArchive(database_url="sqlite:///" + database_path)
+        fidia.DatabaseArchive.dispose_engines()
+
+    def test_column_has_data(self, sql_archive):
+        column = sql_archive.columns[[column_id for column_id in sql_archive.columns if "mass AS" in column_id][0]]
+        assert column.get_value("Gal2") == 2.0
+        with pytest.raises(fidia.exceptions.DataNotAvailable):
+            column.get_value("Gal6")
+
+        # Objects with no row (Gal6) are omitted.
+        array = column.get_array(provenance='definition')
+        assert list(array.index) == [object_id for object_id in column.contents if object_id != "Gal6"]
+        assert list(array[["Gal1", "Gal2", "Gal3"]]) == [1.0, 2.0, 3.0]
+
+    def test_integer_column_with_missing_rows(self, sql_archive):
+        column = sql_archive.columns[[column_id for column_id in sql_archive.columns if "n_spectra" in column_id][0]]
+        # Gal3 has a null value and Gal6 has no row: both are omitted, and the type is preserved.
+        array = column.get_array(provenance='definition')
+        assert list(array.index) == [object_id for object_id in column.contents if object_id in ("Gal1", "Gal2")]
+        assert array.dtype.name == "int64"
+        assert dict(array) == {"Gal1": 1, "Gal2": 2}
+        with pytest.raises(fidia.exceptions.DataNotAvailable):
+            column.get_value("Gal3", provenance='definition')
+
+    def test_array_getter_queries(self, sql_archive, monkeypatch):
+        column_def = SQLColumn("SELECT name AS id, mass AS data FROM masses")
+        database_url = sql_archive.database_url
+        assert sql_archive.engine is fidia.DatabaseArchive.get_engine(database_url)
+
+        # The whole result set in one query:
+        everything = column_def.array_getter(database_url)
+        assert list(everything.index) == ["Gal1", "Gal2", "Gal3", "Gal4", "Gal5"]
+
+        # Selected objects, in IN queries of at most two IDs:
+        monkeypatch.setattr(column_def, 'sql_in_chunk_size', 2)
+        statements = []
+        # (The engine is discarded with its listeners by the fixture.)
+        sqlalchemy.event.listen(sql_archive.engine, "before_cursor_execute",
+                                lambda conn, cursor, statement, *args: statements.append(statement))
+        selected = column_def.array_getter(database_url, object_ids=["Gal5", "Gal1", "Gal6", "Gal3", "Gal4"])
+        assert dict(selected) == {"Gal1": 1.0, "Gal3": 3.0, "Gal4": 4.0, "Gal5": 5.0}
+        assert len(statements) == 3
+        assert all(" IN " in statement for statement in statements)
+
+
 def test_archive_column_relationship(test_data_dir):
     """Test to check for the bug fixed in commit 8633b1ca959a8dd23925d7fbd02f7e490e264733."""
     class MyArchive(ArchiveDefinition):
@@ -227,3 +449,293 @@ def test_archive_column_relationship(test_data_dir):
     for col in ar.columns.values():
         print(col)
         assert col._archive is not None
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_get_array_from_object_getter(test_data_dir, workers):
+    from fidia.archive.example_archive import ExampleArchive
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    # EXPOSED has integer values, but the column is declared float64
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[EXPOSED]:1"]
+    array = column.get_array(workers=workers)
+    assert list(array.index) == list(column.contents)
+    assert array.dtype.name == "float64"
+    for object_id in column.contents:
+        assert array[object_id] == column.get_value(object_id)
+
+    # Gal3 has no spectral cube, so is omitted.
+    cube_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+    array = cube_column.get_array(workers=workers)
+    assert list(array.index) == [object_id for object_id in cube_column.contents if object_id != "Gal3"]
+
+
+def test_get_array_workers(test_data_dir):
+    from fidia.archive.example_archive import ExampleArchive
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    # Threads are used only for definitions known to be safe to call from several threads.
+    cube_column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+    mass_column = ar.columns["ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"]
+    assert cube_column.get_array_workers == FITSDataColumn.get_array_workers > 1
+    assert mass_column.get_array_workers == 1
+
+
+def test_fits_header_scanner(test_data_dir, tmpdir):
+    from astropy.io import fits
+    from fidia.column.fits_headers import read_header, header_table, clear_header_cache
+
+    clear_header_cache()
+    path = os.path.join(test_data_dir, "Gal1", "Gal1_red_image.fits")
+    expected = fits.getheader(path, 0)
+    header = read_header(path, 0)
+    for keyword in ("BITPIX", "NAXIS1", "EXPOSED", "CRVAL1", "CTYPE1", "TELESCOP", "EXTEND"):
+        assert header[keyword] == expected[keyword]
+        assert type(header[keyword]) == type(expected[keyword])
+    # Parsed headers are cached until the file changes.
+    assert read_header(path, "0") is header
+
+    # Extensions after the data of earlier ones, found by index or name:
+    path = str(tmpdir.join("extensions.fits"))
+    extension = fits.ImageHDU(np.zeros((3, 7), dtype=np.int16), name="EXTRA")
+    extension.header['QUOTED'] = "it's"
+    extension.header['FLAG'] = False
+    extension.header['LONG'] = "a long string value " * 6
+    fits.HDUList([fits.PrimaryHDU(np.ones((5, 5))), extension]).writeto(path)
+    for ext in (1, "EXTRA", "extra"):
+        header = read_header(path, ext)
+        assert header['QUOTED'] == "it's"
+        assert header['FLAG'] is False
+        assert header['LONG'] == fits.getheader(path, 1)['LONG']
+    with pytest.raises(KeyError):
+        read_header(path, 2)
+
+    table = header_table({"a": path, "missing": str(tmpdir.join("missing.fits"))}, 1, keywords=["NAXIS1", "FLAG"])
+    assert list(table.index) == ["a", "missing"]
+    assert table.loc["a", "NAXIS1"] == 7
+    assert np.isnan(table.loc["missing", "NAXIS1"])
+
+
+def test_fits_header_column_array_getter(test_data_dir):
+    from fidia.archive.example_archive import ExampleArchive
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    for keyword in ("CRVAL1", "CDELT2", "EXPOSED", "NAXIS"):
+        column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[%s]:1" % keyword]
+        array = column.get_array(provenance='definition')
+        assert list(array.index) == list(column.contents)
+        assert array.dtype.name == column._dtype
+        for object_id in column.contents:
+            assert array[object_id] == column.get_value(object_id, provenance='definition')
+
+    # A subset of the objects reads only their files.
+    column = ar.columns["ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[CTYPE1]:1"]
+    subset = column._array_getter(object_ids=["Gal2"], **column._array_getter_args)
+    assert list(subset.index) == ["Gal2"]
+    assert subset["Gal2"] == column.get_value("Gal2")
+
+
+def test_fits_header_column_missing_file(tmpdir):
+    from fidia.tests.generate_test_data import generate_simple_dataset
+
+    class HeaderArchive(ArchiveDefinition):
+        archive_type = fidia.BasePathArchive
+        is_persisted = False
+
+        def __init__(self, **kwargs):
+            super(HeaderArchive, self).__init__(**kwargs)
+            self.contents = ["Gal1", "Gal2", "Gal3"]
+            self.archive_id = 'HeaderArchive'
+            self.column_definitions = fidia.ColumnDefinitionList([
+                ("naxis", FITSHeaderColumn("{object_id}/{object_id}_red_image.fits", 0, "NAXIS", dtype="int64"))
+            ])
+
+    generate_simple_dataset(str(tmpdir), 3)
+    os.remove(str(tmpdir.join("Gal2", "Gal2_red_image.fits")))
+    ar = HeaderArchive(basepath=str(tmpdir))
+
+    # Objects without the file are omitted, so integer columns stay integer.
+    column = list(ar.columns.values())[0]
+    array = column.get_array(provenance='definition')
+    assert list(array.index) == [object_id for object_id in column.contents if object_id != "Gal2"]
+    assert array.dtype.name == "int64"
+    assert (array == 2).all()
+
+def test_fits_header_column_keyword_forms(tmpdir):
+    from astropy.io import fits
+
+    for object_id, n_pixels in (("Gal1", 2048), ("Gal2", 4096)):
+        header = fits.Header()
+        header['EXPTIME'] = 30
+        header['HIERARCH ESO DET CHIP NX'] = n_pixels
+        tmpdir.mkdir(object_id)
+        fits.PrimaryHDU(np.zeros((2, 2)), header=header).writeto(str(tmpdir.join(object_id, "image.fits")))
+
+    keywords = ("exptime", "ESO DET CHIP NX", "hierarch eso det chip nx")
+
+    class KeywordArchive(ArchiveDefinition):
+        archive_type = fidia.BasePathArchive
+        is_persisted = False
+
+        def __init__(self, **kwargs):
+            super(KeywordArchive, self).__init__(**kwargs)
+            self.contents = ["Gal1", "Gal2"]
+            self.archive_id = 'KeywordArchive'
+            self.column_definitions = fidia.ColumnDefinitionList([
+                (keyword, FITSHeaderColumn("{object_id}/image.fits", 0, keyword, dtype="int64")) for keyword in keywords
+            ])
+
+    ar = KeywordArchive(basepath=str(tmpdir))
+    assert len(ar.columns) == len(keywords)
+    for column in ar.columns.values():
+        array = column.get_array(provenance='definition')
+        assert set(array.index) == {"Gal1", "Gal2"}
+        assert array["Gal2"] == (30 if column.id.column_name.endswith("[exptime]") else 4096)
+        for object_id in column.contents:
+            assert array[object_id] == column.get_value(object_id, provenance='definition')
+
+
+def test_directory_snapshot(tmpdir):
+    from fidia.column.directory_snapshot import DirectorySnapshot
+
+    for name in ("a", "b"):
+        tmpdir.mkdir(name).join("data.txt").write("x")
+    paths = [str(tmpdir.join(name, "data.txt")) for name in ("a", "b", "c")]
+    os.utime(paths[0], (1000, 1000))
+    os.utime(paths[1], (2000, 2000))
+
+    snapshot = DirectorySnapshot(workers=2, max_age=0)
+    assert snapshot.modification_times(paths) == [1000, 2000, None]
+    assert snapshot.latest_modification_time(paths[::2]) == 1000
+
+    # Creating a file changes the modification time of its directory, so it is listed again.
+    tmpdir.mkdir("c").join("data.txt").write("x")
+    os.utime(paths[2], (3000, 3000))
+    assert snapshot.latest_modification_time(paths) == 3000
+
+    # Listings checked recently are reused without checking the directory.
+    snapshot.max_age = 3600
+    tmpdir.join("a", "data.txt").remove()
+    assert snapshot.modification_times(paths[:1]) == [1000]
+    snapshot.clear()
+    assert snapshot.modification_times(paths[:1]) == [None]
+
+
+def test_array_column_stack(test_data_dir, tmpdir, monkeypatch):
+    from fidia.archive.example_archive import ExampleArchive
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+    monkeypatch.setattr(column, 'stack_chunk_size', 2)
+
+    stacked = column.stack(workers=3)
+    assert stacked.shape[0] == len(column.contents)
+    for i, object_id in enumerate(column.contents):
+        if object_id == "Gal3":
+            # The test data has no spectral cube for Gal3
+            assert np.all(np.isnan(stacked[i]))
+        else:
+            assert np.array_equal(stacked[i], column.get_value(object_id))
+
+    path = str(tmpdir.join("stack.npy"))
+    subset = ["Gal5", "Gal1"]
+    stacked = column.stack(subset, path=path)
+    assert isinstance(stacked, np.memmap)
+    reloaded = np.load(path, mmap_mode='r')
+    assert reloaded.shape == (2,) + column.get_value("Gal1").shape
+    assert np.array_equal(reloaded[0], column.get_value("Gal5"))
+    assert np.array_equal(reloaded[1], column.get_value("Gal1"))
+
+
+def test_array_column_get_section(test_data_dir):
+    from fidia.archive.example_archive import ExampleArchive
+    from fidia.dal import NumpyFileStore
+    ar = ExampleArchive(basepath=test_data_dir)  # type: fidia.Archive
+
+    column = ar.columns["ExampleArchive:FITSDataColumn:{object_id}/{object_id}_spec_cube.fits[0]:1"]
+    section = np.s_[1, 2:5, :3]
+
+    full = column.get_value("Gal1", provenance='definition')
+    # Data from FITS files is a read-only view of the memory mapped file.
+    assert not full.flags.writeable
+    expected = np.array(full[section])
+
+    # From the original data:
+    assert np.array_equal(column.get_section("Gal1", section), expected)
+    with pytest.raises(fidia.exceptions.DataNotAvailable):
+        column.get_section("Gal3", section)
+
+    # From the DAL:
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = NumpyFileStore(dal_data_dir)
+        file_store.ingest_column(column, contents=["Gal1"])
+        assert np.array_equal(file_store.get_section(column, "Gal1", section), expected)
+        fidia.dal_host.layers.insert(0, file_store)
+        try:
+            assert np.array_equal(column.get_section("Gal1", section), expected)
+        finally:
+            fidia.dal_host.layers.remove(file_store)
+
+
+derived_column_calls = []
+
+
+def signal_to_noise(value, error):
+    derived_column_calls.append(1)
+    return value / error
+
+
+def test_derived_column(test_data_dir):
+    import os
+    from fidia.column.column_definitions import DerivedColumn
+    from fidia.column.columns import FIDIADerivedColumn
+
+    class DerivedArchive(ArchiveDefinition):
+        archive_id = 'DerivedArchive'
+        archive_type = fidia.BasePathArchive
+
+        def __init__(self, **kwargs):
+            with open(os.path.join(kwargs["basepath"], "object_list.txt")) as f:
+                self.contents = [t.strip() for t in f.readlines()]
+
+        column_definitions = fidia.ColumnDefinitionList([
+            FITSBinaryTableColumn("stellar_masses.fits", 1, 'StellarMass', 'ID', timestamp=1),
+            FITSBinaryTableColumn("stellar_masses.fits", 1, 'StellarMassError', 'ID', timestamp=2),
+            DerivedColumn("StellarMassSN",
+                          ["FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]",
+                           "DerivedArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMassError]:2"],
+                          signal_to_noise)
+        ])
+
+    ar = DerivedArchive(basepath=test_data_dir)
+    column = ar.columns["DerivedArchive:DerivedColumn:StellarMassSN:2"]
+    assert isinstance(column, FIDIADerivedColumn)
+
+    mass = ar.columns["DerivedArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"]
+    error = ar.columns["DerivedArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMassError]:2"]
+
+    del derived_column_calls[:]
+    array = column.get_array()
+    assert list(array.index) == list(ar.contents)
+    for object_id in ar.contents:
+        expected = mass.get_value(object_id) / error.get_value(object_id)
+        assert array[object_id] == pytest.approx(expected)
+        assert column.get_value(object_id) == pytest.approx(expected)
+
+    # The function is evaluated once over whole columns, and the result memoized.
+    assert len(derived_column_calls) == 1
+
+    # Derived columns can be ingested like any other.
+    with tempfile.TemporaryDirectory() as dal_data_dir:
+        file_store = fidia.dal.NumpyFileStore(dal_data_dir)
+        file_store.ingest_archive(ar)
+        for object_id in ar.contents:
+            assert file_store.get_value(column, object_id) == pytest.approx(array[object_id])
+
+    # Inputs must be defined before the derived column
+    with pytest.raises(fidia.exceptions.FIDIAException):
+        DerivedColumn("Unknown", ["FITSBinaryTableColumn:missing.fits[1].data[ID->X]"], signal_to_noise).associate(ar)
+
+    # Functions must be pickleable so that the column can be persisted
+    with pytest.raises(ValueError):
+        DerivedColumn("Lambda", [], lambda x: x)
@@ -77,6 +77,20 @@ class TestSample:
             cube = example_archive_sample['Gal3'].spectral_cube["red"].data
             print(cube)
 
+    def test_sub_sample_keeps_archive_order(self, example_archive_sample, test_data_dir):
+        class SecondArchive(fidia.ArchiveDefinition):
+            archive_id = "SubSampleOrderArchive"
+            archive_type = fidia.BasePathArchive
+            contents = ["Gal1", "Gal2"]
+            column_definitions = fidia.ColumnDefinitionList([])
+            trait_mappings = []
+
+        example_archive_sample.link_archive(SecondArchive(basepath=test_data_dir),
+                                            index=len(example_archive_sample.archives))
+        sub_sample = example_archive_sample._sub_sample(["Gal1"])
+        assert ([archive.archive_id for archive in sub_sample.archives] ==
+                [archive.archive_id for archive in example_archive_sample.archives])
+
                     # Tests for a writeable Sample
     #   Commented out as writeable samples are not currently required.
 
@@ -99,3 +113,81 @@ class TestSample:
     #     writeable_sample['gal1'].redshift = 0.532
     #     assert writeable_sample['gal1'].redshift == 0.532
 
+
+
+class TestSampleFilter:
+
+    MASS_COLUMN = "ExampleArchive:FITSBinaryTableColumn:stellar_masses.fits[1].data[ID->StellarMass]:1"
+    MASS_PATH = "dmu['StellarMasses'].table['StellarMasses'].stellar_mass"
+    SFR_PATH = "dmu['StellarMasses'].table['StarFormationRates'].sfr"
+
+    @pytest.fixture
+    def example_archive(self, test_data_dir):
+        return ExampleArchive(basepath=test_data_dir)
+
+    def test_trait_path_resolves_to_column(self, example_archive):
+        assert example_archive.column_id_for_trait_path(self.MASS_PATH) == self.MASS_COLUMN
+        assert (example_archive.column_id_for_trait_path("image['red'].wcs.crpix1") ==
+                "ExampleArchive:FITSHeaderColumn:{object_id}/{object_id}_red_image.fits[0].header[CRVAL1]:1")
+        with pytest.raises(fidia.exceptions.FIDIAException):
+            example_archive.column_id_for_trait_path("dmu['StellarMasses'].table['StellarMasses'].colour")
+
+    def test_filter_archive_and_sample(self, example_archive):
+        masses = example_archive.columns[self.MASS_COLUMN].get_array()
+        threshold = masses.median()
+        expected = sorted(masses.index[masses > threshold])
+
+        by_path = example_archive.filter((self.MASS_PATH, '>', threshold))
+        assert isinstance(by_path, Sample)
+        assert sorted(by_path.keys()) == expected
+        assert sorted(example_archive.filter((self.MASS_COLUMN, '>', threshold)).keys()) == expected
+
+        # Filtering a sample, and combining predicates
+        sample = Sample.new_from_archive(example_archive)
+        both = sample.filter((self.MASS_PATH, '>', threshold), (self.MASS_PATH, '<=', masses.max()))
+        assert sorted(both.keys()) == expected
+        assert sorted(both.filter((self.MASS_PATH, '<', masses.max())).keys()) == \
+            sorted(masses.index[(masses > threshold) & (masses < masses.max())])
+
+        # Objects without a value (Gal3 has no SFR) never match.
+        assert "Gal3" not in example_archive.filter((self.SFR_PATH, '>', -1e300)).keys()
+
+        with pytest.raises(ValueError):
+            sample.filter((self.MASS_PATH, '~', 1))
+
+    def test_filter_skips_columns_using_statistics(self, example_archive, monkeypatch):
+        from fidia.dal import NumpyFileStore
+        column = example_archive.columns[self.MASS_COLUMN]
+        maximum = column.get_array().max()
+
+        with tempfile.TemporaryDirectory() as dal_data_dir:
+            file_store = NumpyFileStore(dal_data_dir)
+            file_store.ingest_column(column)
+
+            def get_array(*args, **kwargs):
+                raise AssertionError("Column should not be read")
+
+            monkeypatch.setattr(type(column), 'get_array', get_array)
+            fidia.dal_host.layers.insert(0, file_store)
+            try:
+                assert len(example_archive.filter((self.MASS_COLUMN, '>', maximum))) == 0
+            finally:
+                fidia.dal_host.layers.remove(file_store)
+
+    def test_filter_ignores_statistics_of_written_back_subset(self, example_archive):
+        from fidia.dal import NumpyFileStore
+        column = example_archive.columns[self.MASS_COLUMN]
+        masses = column.get_array().sort_values()
+        subset = masses.iloc[:2]
+
+        with tempfile.TemporaryDirectory() as dal_data_dir:
+            file_store = NumpyFileStore(dal_data_dir)
+            # As written back to the DAL when only these objects have been used.
+            file_store.ingest_column_with_data(column, subset, update=True)
+            fidia.dal_host.layers.insert(0, file_store)
+            try:
+                matches = example_archive.filter((self.MASS_COLUMN, '>', subset.max()))
+            finally:
+                fidia.dal_host.layers.remove(file_store)
+
+        assert set(matches.contents) == set(masses.index[2:])
@@ -28,8 +28,10 @@ import fcntl
 import functools
 import textwrap
 from time import sleep
+import warnings
 
 # Other Library Imports
+import numpy as np
 from sortedcontainers import SortedDict
 import sqlalchemy.orm.collections as sa_collections
 
@@ -44,7 +46,8 @@ __all__ = [
     'none_at_indices', 'camel_case', 'fidia_classname', 'snake_case', 'is_list_or_set',
     'WildcardDictionary', 'SchemaDictionary', 'MultiDexDict',
     'Inherit', 'Default',
-    'RegexpGroup', 'exclusive_file_lock', 'classorinstancemethod', 'reset_cached_property'
+    'RegexpGroup', 'exclusive_file_lock', 'classorinstancemethod', 'reset_cached_property',
+    'downsample_by_two', 'downsample_to_size', 'describe_array'
 ]
 
 def log_to_list(list_log, item):
@@ -553,6 +556,53 @@ class exclusive_file_lock:
         self.f.close()
 
 
+def downsample_by_two(array):
+    # type: (np.ndarray) -> np.ndarray
+    """Halve the size of the last two axes of `array` by averaging 2x2 blocks.
+
+    Axes of length one are left unchanged, and a trailing odd row or column is
+    dropped. NaN values are ignored in the averages. Integer data is converted
+    to floating point.
+
+    >>> downsample_by_two(np.arange(16).reshape(4, 4))
+    array([[ 2.5,  4.5],
+           [10.5, 12.5]])
+
+    """
+    array = np.asanyarray(array)
+    if array.ndim < 2:
+        return array
+    factors = [2 if size > 1 else 1 for size in array.shape[-2:]]
+    new_y, new_x = (size // factor for size, factor in zip(array.shape[-2:], factors))
+    blocks = array[..., :new_y * factors[0], :new_x * factors[1]].reshape(
+        array.shape[:-2] + (new_y, factors[0], new_x, factors[1]))
+    with warnings.catch_warnings():
+        # All-NaN blocks give NaN, which is what we want.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        result = np.nanmean(blocks, axis=(-3, -1))
+    return result.astype(np.result_type(array.dtype, np.float32), copy=False)
+
+def downsample_to_size(array, max_size):
+    # type: (np.ndarray, int) -> np.ndarray
+    """Repeatedly apply :func:`downsample_by_two` until the last two axes are no longer than `max_size`."""
+    array = np.asanyarray(array)
+    while array.ndim >= 2 and max(array.shape[-2:]) > max(max_size, 1):
+        array = downsample_by_two(array)
+    return array
+
+def downsampled_shape(shape):
+    # type: (tuple) -> tuple
+    """The shape of an array of shape `shape` after :func:`downsample_by_two`."""
+    if len(shape) < 2:
+        return shape
+    return tuple(shape[:-2]) + tuple(size // 2 if size > 1 else 1 for size in shape[-2:])
+
+def describe_array(data):
+    # type: (np.ndarray) -> tuple
+    """The (shape, dtype string, size in bytes) of `data` as an array."""
+    data = np.asarray(data)
+    return tuple(data.shape), data.dtype.str, int(data.nbytes)
+
 class classorinstancemethod(object):
     """Define a method which will work as both a class or an instance method.
 